@@ -0,0 +1,155 @@
+import math
+
+import matplotlib.dates as mdates
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
+
+class ChartView:
+    # One Figure and canvas for the lifetime of a chart frame. Reports update
+    # the existing artists and redraw with draw_idle instead of building a
+    # new figure per click, and nothing is registered with pyplot, so the
+    # figure is freed together with its frame.
+    def __init__(self, master, figsize=(8, 5), metrics=None):
+        self.figure = Figure(figsize=figsize)
+        self.axes = self.figure.add_subplot()
+        self.canvas = FigureCanvasTkAgg(self.figure, master=master)
+        self.widget = self.canvas.get_tk_widget()
+        self.metrics = metrics
+        if metrics is not None:
+            # draw_idle ends up in canvas.draw, so this times every redraw
+            self.draw_canvas = self.canvas.draw
+            self.canvas.draw = self.timed_draw
+        self.kind = None
+        self.artists = {}
+    
+    def timed_draw(self):
+        with self.metrics.timer("ui chart_draw"):
+            self.draw_canvas()
+    
+    def reset(self, kind):
+        # Only needed when the chart type or the number of artists changes.
+        # A fresh Axes is cheaper than undoing what pie() sets on the old one.
+        self.figure.clear()
+        self.axes = self.figure.add_subplot()
+        self.figure.subplots_adjust(bottom=0.11)
+        self.kind = kind
+        self.artists = {}
+    
+    def show_message(self, text):
+        if self.kind != "message":
+            self.reset("message")
+            self.axes.set_axis_off()
+            self.artists["text"] = self.axes.text(0.5, 0.5, "", ha='center', va='center', transform=self.axes.transAxes)
+        self.artists["text"].set_text(text)
+        self.canvas.draw_idle()
+    
+    def show_pie(self, sizes, labels, colors, title):
+        total = float(sum(sizes))
+        fractions = [float(size) / total for size in sizes]
+        
+        if self.kind != "pie" or len(self.artists["wedges"]) != len(fractions):
+            self.reset("pie")
+            wedges, label_texts, percent_texts = self.axes.pie(
+                fractions, labels=labels, colors=colors, autopct='%1.1f%%', startangle=90
+            )
+            self.axes.axis('equal')  # Equal aspect ratio ensures pie is drawn as a circle
+            self.artists = {"wedges": wedges, "labels": label_texts, "percents": percent_texts}
+        else:
+            # Move the existing wedges and their texts the way Axes.pie lays them out
+            theta1 = 90.0
+            artists = zip(self.artists["wedges"], self.artists["labels"], self.artists["percents"])
+            for (wedge, label_text, percent_text), fraction, label, color in zip(artists, fractions, labels, colors):
+                theta2 = theta1 + 360.0 * fraction
+                wedge.set_theta1(theta1)
+                wedge.set_theta2(theta2)
+                wedge.set_facecolor(color)
+                
+                middle = math.radians((theta1 + theta2) / 2)
+                x, y = math.cos(middle), math.sin(middle)
+                label_text.set_position((1.1 * x, 1.1 * y))
+                label_text.set_horizontalalignment('left' if x > 0 else 'right')
+                label_text.set_text(label)
+                percent_text.set_position((0.6 * x, 0.6 * y))
+                percent_text.set_text(f"{fraction * 100:.1f}%")
+                theta1 = theta2
+        
+        self.axes.set_title(title)
+        self.canvas.draw_idle()
+    
+    def show_bars(self, labels, values, color, title, xlabel, ylabel):
+        values = [float(value) for value in values]
+        
+        if self.kind != "bar" or len(self.artists["bars"]) != len(values):
+            self.reset("bar")
+            self.figure.subplots_adjust(bottom=0.25)  # Room for the rotated labels
+            bars = self.axes.bar(range(len(values)), values, color=color)
+            value_labels = [self.axes.text(0, 0, "", ha='center', va='bottom') for _ in values]
+            self.artists = {"bars": bars, "value_labels": value_labels}
+        
+        for bar, value_label, value in zip(self.artists["bars"], self.artists["value_labels"], values):
+            bar.set_height(value)
+            bar.set_color(color)
+            value_label.set_position((bar.get_x() + bar.get_width() / 2, value))
+            value_label.set_text(f"${value:.2f}")
+        
+        self.axes.set_xticks(range(len(labels)))
+        self.axes.set_xticklabels(labels, rotation=45, ha='right')
+        self.axes.set_ylim(0, max(values) * 1.1 if values and max(values) > 0 else 1)
+        self.axes.set_xlabel(xlabel)
+        self.axes.set_ylabel(ylabel)
+        self.axes.set_title(title)
+        self.canvas.draw_idle()
+    
+    def show_budget(self, labels, budgets, spent, title):
+        # Budget and spent bars side by side per category, spending over
+        # its budget drawn in red
+        budgets = [float(value) for value in budgets]
+        spent = [float(value) for value in spent]
+        width = 0.4
+        
+        if self.kind != "budget" or len(self.artists["budget_bars"]) != len(budgets):
+            self.reset("budget")
+            self.figure.subplots_adjust(bottom=0.25)  # Room for the rotated labels
+            positions = range(len(budgets))
+            budget_bars = self.axes.bar([x - width / 2 for x in positions], budgets, width, color='#9E9E9E', label='Budget')
+            spent_bars = self.axes.bar([x + width / 2 for x in positions], spent, width, color='#4CAF50', label='Spent')
+            self.axes.legend(loc='upper right')
+            self.artists = {"budget_bars": budget_bars, "spent_bars": spent_bars}
+        
+        for budget_bar, spent_bar, budget, value in zip(self.artists["budget_bars"], self.artists["spent_bars"], budgets, spent):
+            budget_bar.set_height(budget)
+            spent_bar.set_height(value)
+            spent_bar.set_color('#F44336' if value > budget else '#4CAF50')
+        
+        self.axes.set_xticks(range(len(labels)))
+        self.axes.set_xticklabels(labels, rotation=45, ha='right')
+        top = max(budgets + spent) if budgets else 0
+        self.axes.set_ylim(0, top * 1.1 if top > 0 else 1)
+        self.axes.set_xlabel('Category')
+        self.axes.set_ylabel('Amount ($)')
+        self.axes.set_title(title)
+        self.canvas.draw_idle()
+    
+    def show_lines(self, lines, title, ylabel):
+        # lines: [(label, dates, values, color)]; callers downsample long
+        # series first, the Line2D objects only get their data replaced
+        if self.kind != "line" or len(self.artists["lines"]) != len(lines):
+            self.reset("line")
+            self.figure.subplots_adjust(bottom=0.2)  # Room for the rotated dates
+            self.artists = {"lines": [self.axes.plot([], [])[0] for _ in lines]}
+            self.axes.xaxis_date()
+            self.axes.tick_params(axis='x', labelrotation=30)
+            self.axes.grid(True, alpha=0.3)
+        
+        for line, (label, dates, values, color) in zip(self.artists["lines"], lines):
+            line.set_data(mdates.date2num(dates), [float(value) for value in values])
+            line.set_label(label)
+            line.set_color(color)
+        
+        self.axes.relim()
+        self.axes.autoscale_view()
+        self.axes.legend(loc='upper left')
+        self.axes.set_ylabel(ylabel)
+        self.axes.set_title(title)
+        self.canvas.draw_idle()
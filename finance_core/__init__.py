@@ -0,0 +1,69 @@
+# GUI-free core of the Personal Finance Manager: configuration, database
+# access, schema migrations, validation, reports, import and export. The
+# NumPy analytics snapshot lives in finance_core.analytics and is only
+# imported by callers that use it.
+from .config import DEFAULT_ACCOUNT, TRANSACTION_TYPES, load_db_config
+from . import db
+from .db import BackendUnavailable, ConnectionManager, create_connection_manager
+from .instrumentation import Metrics
+from .money import format_amount, parse_amount, to_units
+from .schema import MIGRATIONS, migrate, open_database, partition_transactions
+from .transactions import (
+    ValidationError,
+    validate_date,
+    validate_transaction,
+    build_transaction_filter,
+    fetch_transaction,
+    fetch_transaction_page,
+    iter_transactions,
+    insert_transaction,
+    update_transaction,
+    remove_transaction,
+    update_transactions,
+    remove_transactions
+)
+from .accounts import add_account, add_user, fetch_accounts, grant_access, resolve_account
+from .archive import ArchivedYear, archive_year, fetch_archived_years, restore_year
+from .balances import balance_as_of, running_balances
+from .reports import Aggregate, aggregate_transactions, rebuild_rollup
+from .trends import TrendSeries, downsample_lttb, trend_series
+from .categories import CategoryCache
+from .budgets import BudgetStatus, budget_alert, budget_status, remove_budget, set_budget
+from .recurring import FREQUENCIES, add_rule, fetch_rules, post_due_occurrences, remove_rule
+from .transfer import (
+    OperationCancelled,
+    Progress,
+    ImportMapping,
+    ImportResult,
+    export_transactions,
+    import_transactions
+)
+
+
+__all__ = [
+    "DEFAULT_ACCOUNT", "TRANSACTION_TYPES", "load_db_config",
+    "BackendUnavailable", "ConnectionManager", "DatabaseError", "IntegrityError", "create_connection_manager",
+    "Metrics",
+    "format_amount", "parse_amount", "to_units",
+    "MIGRATIONS", "migrate", "open_database", "partition_transactions",
+    "ValidationError", "validate_date", "validate_transaction", "build_transaction_filter", "fetch_transaction",
+    "fetch_transaction_page", "iter_transactions", "insert_transaction", "update_transaction", "remove_transaction",
+    "update_transactions", "remove_transactions",
+    "add_account", "add_user", "fetch_accounts", "grant_access", "resolve_account",
+    "ArchivedYear", "archive_year", "fetch_archived_years", "restore_year",
+    "balance_as_of", "running_balances",
+    "Aggregate", "aggregate_transactions", "rebuild_rollup",
+    "TrendSeries", "downsample_lttb", "trend_series",
+    "CategoryCache",
+    "BudgetStatus", "budget_alert", "budget_status", "remove_budget", "set_budget",
+    "FREQUENCIES", "add_rule", "fetch_rules", "post_due_occurrences", "remove_rule",
+    "OperationCancelled", "Progress", "ImportMapping", "ImportResult", "export_transactions", "import_transactions"
+]
+
+
+def __getattr__(name):
+    # The error tuples gain the MySQL types when the driver is loaded, so
+    # they are read from db on every access rather than copied here
+    if name in ("DatabaseError", "IntegrityError"):
+        return getattr(db, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
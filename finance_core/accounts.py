@@ -0,0 +1,110 @@
+from . import db
+from .schema import DEFAULT_CATEGORIES
+from .transactions import ValidationError
+
+# Accounts are separate ledgers in one database: transactions, categories,
+# budgets, recurring rules and every derived total belong to exactly one
+# of them, and every query names the account it works on. Users are the
+# people who may open an account; a household account can have several
+# members and a user can belong to several accounts.
+
+NAME_MAX_LENGTH = 50
+
+
+def validate_name(name, label):
+    if not name or not name.strip():
+        raise ValidationError(f"{label} name cannot be empty")
+    if len(name) > NAME_MAX_LENGTH:
+        raise ValidationError(f"{label} name is longer than {NAME_MAX_LENGTH} characters")
+
+
+def find_id(cursor, table, name, label):
+    cursor.execute(f"SELECT id FROM {table} WHERE name = %s", (name,))
+    row = cursor.fetchone()
+    if row is None:
+        raise ValidationError(f"Unknown {label.lower()} '{name}'")
+    return row[0]
+
+
+def add_user(connection, name):
+    validate_name(name, "User")
+    cursor = connection.cursor()
+    try:
+        cursor.execute("INSERT INTO users (name) VALUES (%s)", (name,))
+    except db.IntegrityError:
+        raise ValidationError(f"User '{name}' already exists")
+    user_id = cursor.lastrowid
+    connection.commit()
+    cursor.close()
+    return user_id
+
+
+def add_account(connection, name, owner=None):
+    # New, empty ledger with the default categories; owner (a user name)
+    # becomes its first member
+    validate_name(name, "Account")
+    cursor = connection.cursor()
+    try:
+        cursor.execute("INSERT INTO accounts (name) VALUES (%s)", (name,))
+    except db.IntegrityError:
+        raise ValidationError(f"Account '{name}' already exists")
+    account_id = cursor.lastrowid
+    
+    cursor.executemany(
+        "INSERT INTO categories (account_id, name, type) VALUES (%s, %s, %s)",
+        [(account_id, category, trans_type) for category, trans_type in DEFAULT_CATEGORIES]
+    )
+    if owner:
+        user_id = find_id(cursor, "users", owner, "User")
+        cursor.execute("INSERT INTO account_members (account_id, user_id) VALUES (%s, %s)", (account_id, user_id))
+    
+    connection.commit()
+    cursor.close()
+    return account_id
+
+
+def grant_access(connection, account, user):
+    # Makes the named user a member of the named account
+    cursor = connection.cursor()
+    account_id = find_id(cursor, "accounts", account, "Account")
+    user_id = find_id(cursor, "users", user, "User")
+    cursor.execute("INSERT IGNORE INTO account_members (account_id, user_id) VALUES (%s, %s)", (account_id, user_id))
+    connection.commit()
+    cursor.close()
+
+
+def fetch_accounts(connection, user=None):
+    # [(id, name)] of every account, or only of those user is a member of
+    cursor = connection.cursor()
+    if user:
+        cursor.execute("""
+            SELECT accounts.id, accounts.name
+            FROM users
+            JOIN account_members ON account_members.user_id = users.id
+            JOIN accounts ON accounts.id = account_members.account_id
+            WHERE users.name = %s
+            ORDER BY accounts.name
+        """, (user,))
+    else:
+        cursor.execute("SELECT id, name FROM accounts ORDER BY name")
+    accounts = cursor.fetchall()
+    cursor.close()
+    return accounts
+
+
+def resolve_account(connection, name, user=None):
+    # Id of the named account; with user set, only if they are a member
+    cursor = connection.cursor()
+    try:
+        account_id = find_id(cursor, "accounts", name, "Account")
+        if user:
+            user_id = find_id(cursor, "users", user, "User")
+            cursor.execute(
+                "SELECT 1 FROM account_members WHERE account_id = %s AND user_id = %s",
+                (account_id, user_id)
+            )
+            if cursor.fetchone() is None:
+                raise ValidationError(f"User '{user}' is not a member of account '{name}'")
+    finally:
+        cursor.close()
+    return account_id
@@ -0,0 +1,268 @@
+import threading
+import time
+from datetime import datetime
+
+try:
+    import numpy as np
+except ImportError:
+    # The columnar analytics snapshot is optional
+    np = None
+
+from .config import TRANSACTION_TYPES
+from .reports import Aggregate
+from .trends import build_trend_series
+
+SNAPSHOT_MAX_AGE = 60  # seconds before the snapshot re-checks the database
+SNAPSHOT_BATCH_SIZE = 20000
+EPOCH_ORDINAL = datetime(1970, 1, 1).toordinal()
+
+
+def available():
+    return np is not None
+
+
+class ColumnarSnapshot:
+    # Column arrays of every transaction of one account: date as days since
+    # 1970-01-01, amount as integer cents, type and category
+    # dictionary-encoded. Reports, filters and ad-hoc group-bys run as
+    # vectorised NumPy operations on it. New ids are appended incrementally;
+    # edits and deletes force a reload. Archived years are not loaded, only
+    # their yearly summaries: callers check covers() and fall back to the
+    # rollup for ranges that reach into them.
+    def __init__(self, account_id):
+        self.account_id = account_id
+        self.lock = threading.Lock()
+        self.clear()
+    
+    def clear(self):
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.days = np.zeros(0, dtype=np.int32)
+        self.cents = np.zeros(0, dtype=np.int64)
+        self.types = np.zeros(0, dtype=np.int8)
+        self.category_codes = np.zeros(0, dtype=np.int32)
+        self.categories = []
+        self.category_index = {}
+        self.archived = {}  # year -> (count, net cents, total cents)
+        self.last_id = 0
+        self.refreshed_at = None
+        self.needs_reload = True
+        self.needs_refresh = True
+    
+    def mark_inserted(self):
+        self.needs_refresh = True
+    
+    def invalidate(self):
+        self.needs_reload = True
+    
+    def ensure_current(self, connection):
+        with self.lock:
+            expired = self.refreshed_at is None or time.monotonic() - self.refreshed_at > SNAPSHOT_MAX_AGE
+            if self.needs_reload:
+                self.clear()
+                self.needs_reload = False
+                self.load_archived(connection)
+                self.load_new_rows(connection)
+            elif self.needs_refresh or expired:
+                self.load_new_rows(connection)
+                # Changes made by other processes only show up in the rollup
+                if expired and not self.matches_rollup(connection):
+                    self.clear()
+                    self.needs_reload = False
+                    self.load_archived(connection)
+                    self.load_new_rows(connection)
+            
+            self.needs_refresh = False
+            self.refreshed_at = time.monotonic()
+    
+    def load_archived(self, connection):
+        cursor = connection.cursor()
+        cursor.execute("""
+            SELECT year, count, income_cents, expense_cents
+            FROM archived_years
+            WHERE account_id = %s
+        """, (self.account_id,))
+        self.archived = {
+            year: (count, int(income) - int(expense), int(income) + int(expense))
+            for year, count, income, expense in cursor.fetchall()
+        }
+        cursor.close()
+    
+    def covers(self, date_from=None, date_to=None):
+        # Whether the range lies outside every archived year
+        first = int(date_from[:4]) if date_from else None
+        last = int(date_to[:4]) if date_to else None
+        return not any(
+            (first is None or year >= first) and (last is None or year <= last)
+            for year in self.archived
+        )
+    
+    def load_new_rows(self, connection):
+        cursor = connection.cursor(buffered=False)
+        cursor.execute("""
+            SELECT id, type, category, amount_cents, date
+            FROM transactions
+            WHERE account_id = %s AND id > %s
+            ORDER BY id
+        """, (self.account_id, self.last_id))
+        
+        ids = []
+        days = []
+        cents = []
+        types = []
+        category_codes = []
+        while True:
+            rows = cursor.fetchmany(SNAPSHOT_BATCH_SIZE)
+            if not rows:
+                break
+            for trans_id, trans_type, category, amount_cents, row_date in rows:
+                ids.append(trans_id)
+                days.append(row_date.toordinal() - EPOCH_ORDINAL)
+                cents.append(amount_cents)
+                types.append(TRANSACTION_TYPES.index(trans_type))
+                category_codes.append(self.encode_category(category))
+        cursor.close()
+        
+        if ids:
+            self.ids = np.concatenate((self.ids, np.array(ids, dtype=np.int64)))
+            self.days = np.concatenate((self.days, np.array(days, dtype=np.int32)))
+            self.cents = np.concatenate((self.cents, np.array(cents, dtype=np.int64)))
+            self.types = np.concatenate((self.types, np.array(types, dtype=np.int8)))
+            self.category_codes = np.concatenate((self.category_codes, np.array(category_codes, dtype=np.int32)))
+            self.last_id = ids[-1]
+    
+    def matches_rollup(self, connection):
+        # Compares the snapshot with the rollup group by group, so an edit
+        # that moves a row to another day, type or category is caught even
+        # when the overall count and total stay the same
+        cursor = connection.cursor()
+        cursor.execute("""
+            SELECT day, type, category, total_cents, count
+            FROM transaction_rollup
+            WHERE account_id = %s
+        """, (self.account_id,))
+        rollup = {}
+        for day, row_type, category, total, count in cursor.fetchall():
+            day = str(day)
+            # The rollup also covers the archived years
+            if int(day[:4]) not in self.archived:
+                rollup[(day, row_type, category)] = (int(total), int(count))
+        cursor.close()
+        return rollup == self.grouped(("day", "type", "category"))
+    
+    def encode_category(self, category):
+        code = self.category_index.get(category)
+        if code is None:
+            code = len(self.categories)
+            self.categories.append(category)
+            self.category_index[category] = code
+        return code
+    
+    def mask(self, date_from=None, date_to=None, trans_type=None):
+        mask = np.ones(len(self.ids), dtype=bool)
+        if date_from:
+            mask &= self.days >= datetime.strptime(date_from, '%Y-%m-%d').toordinal() - EPOCH_ORDINAL
+        if date_to:
+            mask &= self.days <= datetime.strptime(date_to, '%Y-%m-%d').toordinal() - EPOCH_ORDINAL
+        if trans_type:
+            mask &= self.types == TRANSACTION_TYPES.index(trans_type)
+        return mask
+    
+    def field(self, name):
+        # Integer key column for a group-by field
+        if name == "day":
+            return self.days.astype(np.int64)
+        if name == "month":
+            return self.days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+        if name == "year":
+            return self.days.astype("datetime64[D]").astype("datetime64[Y]").astype(np.int64)
+        if name == "week":
+            return (self.days.astype(np.int64) + 3) // 7  # weeks since Monday 1969-12-29
+        if name == "weekday":
+            return ((self.days.astype(np.int64) + 3) % 7)  # 1970-01-01 was a Thursday
+        if name == "type":
+            return self.types.astype(np.int64)
+        if name == "category":
+            return self.category_codes.astype(np.int64)
+        raise ValueError(f"Unknown group-by field '{name}'")
+    
+    def decode(self, name, value):
+        if name == "day":
+            return datetime.fromordinal(int(value) + EPOCH_ORDINAL).strftime('%Y-%m-%d')
+        if name == "week":
+            return datetime.fromordinal(int(value) * 7 - 3 + EPOCH_ORDINAL).strftime('%Y-%m-%d')
+        if name == "month":
+            return f"{1970 + int(value) // 12:04d}-{int(value) % 12 + 1:02d}"
+        if name == "year":
+            return 1970 + int(value)
+        if name == "type":
+            return TRANSACTION_TYPES[int(value)]
+        if name == "category":
+            return self.categories[int(value)]
+        return int(value)
+    
+    def group_by(self, fields, date_from=None, date_to=None, trans_type=None, cents=None):
+        # {(field values...): (total cents, count)} over the filtered rows;
+        # cents overrides the amount column, e.g. for what-if scenarios
+        with self.lock:
+            return self.grouped(fields, date_from, date_to, trans_type, cents)
+    
+    def grouped(self, fields, date_from=None, date_to=None, trans_type=None, cents=None):
+        # group_by for callers already holding the lock
+        mask = self.mask(date_from, date_to, trans_type)
+        amounts = (self.cents if cents is None else cents)[mask]
+        if not len(amounts):
+            return {}
+        
+        keys = np.stack([self.field(name)[mask] for name in fields], axis=1)
+        unique_keys, inverse, counts = np.unique(keys, axis=0, return_inverse=True, return_counts=True)
+        
+        # Sum exactly in int64 by sorting rows into their groups
+        order = np.argsort(inverse.reshape(-1), kind="stable")
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        totals = np.add.reduceat(amounts[order], starts)
+        
+        groups = {}
+        for key, total, count in zip(unique_keys, totals, counts):
+            decoded = tuple(self.decode(name, value) for name, value in zip(fields, key))
+            groups[decoded] = (int(total), int(count))
+        return groups
+    
+    def aggregate(self, date_from=None, date_to=None, trans_type=None, cents=None):
+        # Same result as aggregate_transactions, without a database round trip
+        aggregate = Aggregate()
+        groups = self.group_by(("month", "type", "category"), date_from, date_to, trans_type, cents)
+        for (month, row_type, category), (total, count) in groups.items():
+            aggregate.add(month, row_type, category, total, count)
+        return aggregate
+    
+    def what_if(self, factors, date_from=None, date_to=None):
+        # Aggregate with each category's amounts scaled by factors[category],
+        # e.g. {"Food": 0.8} for "what if I spent 20% less on food"
+        with self.lock:
+            scale = np.ones(len(self.categories))
+            for category, factor in factors.items():
+                if category in self.category_index:
+                    scale[self.category_index[category]] = factor
+            cents = np.rint(self.cents * scale[self.category_codes]).astype(np.int64)
+        return self.aggregate(date_from, date_to, cents=cents)
+    
+    def trend_series(self, granularity, date_from=None, date_to=None):
+        # Same result as trends.trend_series, bucketed from the arrays
+        field = {"daily": "day", "weekly": "week", "monthly": "month"}[granularity]
+        totals = {}
+        for (period, row_type), (total, count) in self.group_by((field, "type"), date_from, date_to).items():
+            if field == "month":
+                period += "-01"
+            totals.setdefault(period, {})[row_type] = total
+        
+        opening_cents = 0
+        if date_from:
+            with self.lock:
+                before = self.days < datetime.strptime(date_from, '%Y-%m-%d').toordinal() - EPOCH_ORDINAL
+                signs = np.where(self.types[before] == TRANSACTION_TYPES.index("income"), 1, -1)
+                opening_cents = int((self.cents[before] * signs).sum())
+                # Archived years before a covered range lie wholly before it
+                opening_cents += sum(
+                    summary[1] for year, summary in self.archived.items() if year < int(date_from[:4])
+                )
+        return build_trend_series(granularity, totals, opening_cents)
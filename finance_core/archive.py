@@ -0,0 +1,129 @@
+from datetime import date
+
+from .recurring import post_due_occurrences
+from .transactions import ValidationError, archived_years
+
+# Archiving moves every transaction of a closed year out of the live
+# transactions table into transactions_archive, so paging, search, export
+# and the analytics snapshot only work on recent years and the live
+# indexes stay small. Nothing else changes: the daily rollup, the balance
+# checkpoints and the spending counters keep covering archived years, and
+# reports, trends, budgets and balances read those, so they span archived
+# ranges without touching the archive. archived_years holds one summary
+# row per archived year.
+#
+# An archived year is closed: writes dated in it are refused until it is
+# restored, so a year's rows are never split between the two tables.
+
+COLUMNS = "id, account_id, type, category, amount_cents, description, date, rule_id, occurrence_date"
+
+
+class ArchivedYear:
+    # Summary of one archived year, in cents
+    def __init__(self, year, count, income, expense, archived_at):
+        self.year = year
+        self.count = count
+        self.income = income
+        self.expense = expense
+        self.archived_at = archived_at
+    
+    @property
+    def balance(self):
+        return self.income - self.expense
+
+
+def year_range(year):
+    return date(year, 1, 1), date(year + 1, 1, 1)
+
+
+def archive_year(connection, account_id, year, today=None):
+    # Moves the account's transactions dated in year to the archive, in one
+    # transaction. Only years before the current one are closed. Returns
+    # the number of transactions archived.
+    today = today or date.today()
+    if not isinstance(year, int) or year >= today.year:
+        raise ValidationError(f"Only years before {today.year} can be archived")
+    
+    # Recurring rules must not have occurrences left to post into the year
+    post_due_occurrences(connection, account_id, today)
+    
+    cursor = connection.cursor()
+    if archived_years(cursor, account_id, [year]):
+        cursor.close()
+        raise ValidationError(f"{year} is already archived")
+    
+    first, after = year_range(year)
+    cursor.execute("""
+        SELECT COUNT(*),
+               COALESCE(SUM(CASE WHEN type = 'income' THEN amount_cents ELSE 0 END), 0),
+               COALESCE(SUM(CASE WHEN type = 'expense' THEN amount_cents ELSE 0 END), 0)
+        FROM transactions
+        WHERE account_id = %s AND date >= %s AND date < %s
+        FOR UPDATE
+    """, (account_id, first, after))
+    count, income, expense = cursor.fetchone()
+    
+    cursor.execute(f"""
+        INSERT INTO transactions_archive ({COLUMNS})
+        SELECT {COLUMNS} FROM transactions
+        WHERE account_id = %s AND date >= %s AND date < %s
+    """, (account_id, first, after))
+    cursor.execute(
+        "DELETE FROM transactions WHERE account_id = %s AND date >= %s AND date < %s",
+        (account_id, first, after)
+    )
+    cursor.execute("""
+        INSERT INTO archived_years (account_id, year, count, income_cents, expense_cents)
+        VALUES (%s, %s, %s, %s, %s)
+    """, (account_id, year, count, int(income), int(expense)))
+    
+    connection.commit()
+    cursor.close()
+    return count
+
+
+def restore_year(connection, account_id, year):
+    # Moves an archived year back into transactions and reopens it.
+    # Returns the number of transactions restored.
+    cursor = connection.cursor()
+    cursor.execute(
+        "SELECT count FROM archived_years WHERE account_id = %s AND year = %s FOR UPDATE",
+        (account_id, year)
+    )
+    if cursor.fetchone() is None:
+        cursor.close()
+        raise ValidationError(f"{year} is not archived")
+    
+    first, after = year_range(year)
+    cursor.execute(f"""
+        INSERT INTO transactions ({COLUMNS})
+        SELECT {COLUMNS} FROM transactions_archive
+        WHERE account_id = %s AND date >= %s AND date < %s
+    """, (account_id, first, after))
+    restored = cursor.rowcount
+    cursor.execute(
+        "DELETE FROM transactions_archive WHERE account_id = %s AND date >= %s AND date < %s",
+        (account_id, first, after)
+    )
+    cursor.execute("DELETE FROM archived_years WHERE account_id = %s AND year = %s", (account_id, year))
+    
+    connection.commit()
+    cursor.close()
+    return restored
+
+
+def fetch_archived_years(connection, account_id):
+    # [ArchivedYear] of the account, oldest first
+    cursor = connection.cursor()
+    cursor.execute("""
+        SELECT year, count, income_cents, expense_cents, archived_at
+        FROM archived_years
+        WHERE account_id = %s
+        ORDER BY year
+    """, (account_id,))
+    years = [
+        ArchivedYear(year, count, int(income), int(expense), archived_at)
+        for year, count, income, expense, archived_at in cursor.fetchall()
+    ]
+    cursor.close()
+    return years
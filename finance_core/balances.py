@@ -0,0 +1,162 @@
+from datetime import datetime, timedelta
+
+# Signed rollup total in cents: income adds to the balance, expenses subtract
+NET_TOTAL = "CASE WHEN type = 'income' THEN total_cents ELSE -total_cents END"
+NET_AMOUNT = "CASE WHEN type = 'income' THEN amount_cents ELSE -amount_cents END"
+
+
+def to_date(day):
+    if isinstance(day, str):
+        return datetime.strptime(day, '%Y-%m-%d').date()
+    return day
+
+
+def month_start(day):
+    return to_date(day).replace(day=1)
+
+
+def next_month(month):
+    # First day of the month after month, itself a first day
+    return month.replace(year=month.year + month.month // 12, month=month.month % 12 + 1)
+
+
+def month_range(start, stop):
+    # First days of the months from start up to, not including, stop
+    month = start
+    while month < stop:
+        yield month
+        month = next_month(month)
+
+
+# balance_checkpoints holds, for each account and the first day of a
+# month, the balance of everything dated before it. Every month from the
+# account's first written month to its last has one, empty months
+# included, and checkpoints are never removed. A balance for any date is
+# then the nearest checkpoint (one primary key lookup) plus at most a
+# month of rollup rows, instead of a sum over the whole history.
+
+def balance_before(cursor, account_id, day):
+    # Balance in cents of the account's transactions dated strictly before day
+    cursor.execute("""
+        SELECT month, balance_cents FROM balance_checkpoints
+        WHERE account_id = %s AND month <= %s
+        ORDER BY month DESC
+        LIMIT 1
+    """, (account_id, day))
+    checkpoint = cursor.fetchone()
+    
+    if checkpoint is None:
+        cursor.execute(f"SELECT SUM({NET_TOTAL}) FROM transaction_rollup WHERE account_id = %s AND day < %s", (account_id, day))
+        return int(cursor.fetchone()[0] or 0)
+    
+    month, balance = checkpoint
+    cursor.execute(f"""
+        SELECT SUM({NET_TOTAL}) FROM transaction_rollup
+        WHERE account_id = %s AND day >= %s AND day < %s
+    """, (account_id, month, day))
+    return balance + int(cursor.fetchone()[0] or 0)
+
+
+def ensure_checkpoint(cursor, account_id, day):
+    # Adds the checkpoint for day's month the first time the month is
+    # written to, with those of the empty months between it and the
+    # account's other checkpoints. Checkpoints only cover earlier days, so
+    # they are unaffected by the write that triggered this.
+    month = month_start(day)
+    cursor.execute("SELECT MIN(month), MAX(month) FROM balance_checkpoints WHERE account_id = %s", (account_id,))
+    first, last = cursor.fetchone()
+    
+    if first is None:
+        added = [(month, balance_before(cursor, account_id, month))]
+    elif month > to_date(last):
+        # The months after the last checkpoint are empty, so they all
+        # carry the balance at the end of its month
+        start = next_month(to_date(last))
+        balance = balance_before(cursor, account_id, start)
+        added = [(gap, balance) for gap in month_range(start, next_month(month))]
+    elif month < to_date(first):
+        # Likewise the months between this one and the first checkpoint
+        added = [(month, balance_before(cursor, account_id, month))]
+        balance = balance_before(cursor, account_id, next_month(month))
+        added.extend((gap, balance) for gap in month_range(next_month(month), to_date(first)))
+    else:
+        return
+    
+    cursor.executemany(
+        "INSERT IGNORE INTO balance_checkpoints (account_id, month, balance_cents) VALUES (%s, %s, %s)",
+        [(account_id, gap, balance) for gap, balance in added]
+    )
+
+
+def apply_balance_deltas(cursor, account_id, deltas):
+    # deltas: {day: signed cents}. Every checkpoint after the day moves by
+    # the amount; days of the same month move the same checkpoints, so one
+    # UPDATE per month is enough.
+    by_month = {}
+    for day, amount in deltas.items():
+        month = month_start(day)
+        by_month[month] = by_month.get(month, 0) + amount
+    
+    for month, amount in sorted(by_month.items()):
+        if amount:
+            cursor.execute(
+                "UPDATE balance_checkpoints SET balance_cents = balance_cents + %s WHERE account_id = %s AND month > %s",
+                (amount, account_id, month)
+            )
+        ensure_checkpoint(cursor, account_id, month)
+
+
+def balance_as_of(connection, account_id, day):
+    # Balance in cents at the end of day, including that day's transactions
+    cursor = connection.cursor()
+    balance = balance_before(cursor, account_id, to_date(day) + timedelta(days=1))
+    cursor.close()
+    return balance
+
+
+def running_balances(connection, account_id, rows):
+    # Balance after each of rows (transaction tuples with id first and date
+    # last), over the account's whole ledger in (date, id) order regardless
+    # of any filter the rows came from. Only the page's own days are read: days
+    # are chained from the checkpointed opening balance with a window over
+    # the rollup, and rows within a day with a window over that day.
+    if not rows:
+        return []
+    
+    days = sorted({row[5] for row in rows})
+    cursor = connection.cursor()
+    opening = balance_before(cursor, account_id, days[0])
+    
+    # Balance at the start of each page day
+    cursor.execute(f"""
+        SELECT day, SUM(SUM({NET_TOTAL})) OVER (ORDER BY day)
+        FROM transaction_rollup
+        WHERE account_id = %s AND day >= %s AND day < %s
+        GROUP BY day
+    """, (account_id, days[0], days[-1]))
+    cumulative = cursor.fetchall()
+    
+    day_start = {}
+    index = 0
+    carried = 0
+    for day in days:
+        while index < len(cumulative) and cumulative[index][0] < day:
+            carried = int(cumulative[index][1])
+            index += 1
+        day_start[day] = opening + carried
+    
+    # Running total of each row within its day
+    day_placeholders = ", ".join(["%s"] * len(days))
+    id_placeholders = ", ".join(["%s"] * len(rows))
+    cursor.execute(f"""
+        SELECT id, day_total FROM (
+            SELECT id, SUM({NET_AMOUNT}) OVER (PARTITION BY date ORDER BY id) AS day_total
+            FROM transactions
+            WHERE account_id = %s AND date IN ({day_placeholders})
+        ) AS day_rows
+        WHERE id IN ({id_placeholders})
+    """, [account_id] + days + [row[0] for row in rows])
+    day_totals = {trans_id: int(total) for trans_id, total in cursor.fetchall()}
+    cursor.close()
+    
+    return [day_start[row[5]] + day_totals.get(row[0], 0) for row in rows]
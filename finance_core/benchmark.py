@@ -0,0 +1,272 @@
+# Benchmark of the core operations on a synthetic history, run against a
+# scratch database next to the configured one:
+#
+#   python -m finance_core.benchmark --rows 1000000 --output results.json
+#
+#   python -m finance_core.benchmark --backend sqlite --rows 100000
+#
+#   python -m finance_core.benchmark --rows 100000 --other-rows 5000000
+#
+# The scratch database is created with the same migrations as the app,
+# filled through the CSV import path and dropped afterwards unless --keep
+# is given. --other-rows first loads a second, larger account, to check
+# that the timed account's queries do not slow down with it. Results are
+# JSON so runs can be compared across releases.
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from . import analytics, db
+from .balances import balance_as_of, running_balances
+from .config import load_db_config
+from .accounts import add_account
+from .reports import aggregate_transactions
+from .schema import DEFAULT_ACCOUNT_ID, migrate
+from .transactions import DEFAULT_PAGE_SIZE, build_transaction_filter, fetch_transaction_page
+from .transfer import ImportMapping, export_transactions, import_transactions
+from .trends import trend_series
+
+INCOME_CATEGORIES = ["Salary", "Freelance", "Investments", "Gifts"]
+EXPENSE_CATEGORIES = [
+    "Food", "Transport", "Housing", "Utilities", "Entertainment",
+    "Healthcare", "Education", "Shopping"
+]
+PAYEES = [
+    "Supermarket", "Coffee Shop", "Petrol Station", "Pharmacy", "Bookstore",
+    "Cinema", "Restaurant", "Online Store", "Electricity Co", "Water Board",
+    "Landlord", "Gym", "Bakery", "Taxi", "Airline"
+]
+INCOME_SHARE = 0.1
+# Pages walked by the deep paging benchmark
+PAGE_WALK_PAGES = 10
+
+
+def synthetic_categories(count):
+    # Default categories first, then numbered extra expense categories
+    expense = list(EXPENSE_CATEGORIES)
+    extra = max(count - len(INCOME_CATEGORIES) - len(expense), 0)
+    expense += [f"Expense {number}" for number in range(1, extra + 1)]
+    return list(INCOME_CATEGORIES), expense
+
+
+def write_synthetic_csv(csvfile, rows, categories, days, end, seed):
+    # Rows in the import format: mostly small expenses with a long tail,
+    # a few large incomes, spread uniformly over the date span
+    rng = random.Random(seed)
+    income_categories, expense_categories = synthetic_categories(categories)
+    start = end - timedelta(days=days - 1)
+    
+    csvfile.write("Type,Category,Amount,Description,Date\n")
+    for _ in range(rows):
+        day = start + timedelta(days=rng.randrange(days))
+        if rng.random() < INCOME_SHARE:
+            category = rng.choice(income_categories)
+            amount = math.exp(rng.gauss(7.0, 0.5))
+            csvfile.write(f"income,{category},{amount:.2f},{category} payment,{day}\n")
+        else:
+            category = rng.choice(expense_categories)
+            amount = math.exp(rng.gauss(3.2, 1.0))
+            payee = rng.choice(PAYEES)
+            csvfile.write(f"expense,{category},{amount:.2f},{payee} #{rng.randrange(1000)},{day}\n")
+    csvfile.seek(0)
+
+
+def time_operation(connection, operation, repeat):
+    # operation(connection) returns the number of rows it produced
+    timings = []
+    rows = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = operation(connection)
+        timings.append(time.perf_counter() - started)
+        connection.commit()  # Start the next run from a fresh snapshot
+    return {
+        "runs": repeat,
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "max": max(timings),
+        "rows": rows
+    }
+
+
+def walk_pages(connection, transaction_filter, pages):
+    key = None
+    rows_read = 0
+    for _ in range(pages):
+        rows, has_more = fetch_transaction_page(connection, transaction_filter, "below", key, DEFAULT_PAGE_SIZE)
+        rows_read += len(rows)
+        if not has_more:
+            break
+        key = (rows[-1][5], rows[-1][0])
+    return rows_read
+
+
+def core_operations(end, days, dialect, account_id):
+    # (name, operation) pairs timed after the data is loaded
+    everything = build_transaction_filter(account_id)
+    last_year = build_transaction_filter(account_id, "expense", str(end - timedelta(days=364)), str(end))
+    search = build_transaction_filter(account_id, search="Coffee", dialect=dialect)
+    middle = str(end - timedelta(days=days // 2))
+    
+    def first_page_balances(connection):
+        rows, has_more = fetch_transaction_page(connection, everything)
+        return len(running_balances(connection, account_id, rows))
+    
+    def export_to_null(connection):
+        with open(os.devnull, 'w', newline='', encoding='utf-8') as csvfile:
+            return export_transactions(connection, account_id, csvfile, everything)
+    
+    def load_snapshot(connection):
+        snapshot = analytics.ColumnarSnapshot(account_id)
+        snapshot.ensure_current(connection)
+        return len(snapshot.ids)
+    
+    operations = [
+        ("first_page", lambda connection: len(fetch_transaction_page(connection, everything)[0])),
+        ("page_walk", lambda connection: walk_pages(connection, everything, PAGE_WALK_PAGES)),
+        ("filtered_page", lambda connection: len(fetch_transaction_page(connection, last_year)[0])),
+        ("search_page", lambda connection: len(fetch_transaction_page(connection, search)[0])),
+        ("first_page_balances", first_page_balances),
+        ("balance_as_of", lambda connection: balance_as_of(connection, account_id, middle) is not None),
+        ("summary_report", lambda connection: aggregate_transactions(connection, account_id).count),
+        ("category_report", lambda connection: len(aggregate_transactions(connection, account_id, trans_type="expense").categories("expense"))),
+        ("trend_daily", lambda connection: len(trend_series(connection, account_id, "daily").periods)),
+        ("trend_monthly", lambda connection: len(trend_series(connection, account_id, "monthly").periods)),
+        ("export", export_to_null)
+    ]
+    if analytics.available():
+        operations.append(("snapshot_load", load_snapshot))
+    return operations
+
+
+def run_benchmark(connections, rows, categories, days, end, seed, repeat, other_rows=0):
+    results = {
+        "benchmark": {
+            "rows": rows,
+            "other_rows": other_rows,
+            "categories": categories,
+            "days": days,
+            "end": str(end),
+            "seed": seed,
+            "repeat": repeat,
+            "backend": connections.dialect.name
+        },
+        "environment": {
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": analytics.available()
+        },
+        "operations": {}
+    }
+    operations = results["operations"]
+    
+    with connections.connection() as connection:
+        migrate(connection)
+        results["environment"]["server"] = connection.get_server_info()
+        
+        if other_rows:
+            # Another account's history, loaded first so its rows come
+            # before and interleave with nothing of the timed account
+            other_account = add_account(connection, "Benchmark other")
+            with tempfile.TemporaryFile(mode="w+", newline="", encoding="utf-8") as csvfile:
+                write_synthetic_csv(csvfile, other_rows, categories, days, end, seed + 1)
+                import_transactions(connection, other_account, csvfile, ImportMapping())
+        
+        with tempfile.TemporaryFile(mode="w+", newline="", encoding="utf-8") as csvfile:
+            write_synthetic_csv(csvfile, rows, categories, days, end, seed)
+            
+            # Loaded once: it is both the data set and the bulk insert timing
+            started = time.perf_counter()
+            result = import_transactions(connection, DEFAULT_ACCOUNT_ID, csvfile, ImportMapping())
+            elapsed = time.perf_counter() - started
+            operations["bulk_insert"] = {
+                "runs": 1,
+                "min": elapsed,
+                "median": elapsed,
+                "max": elapsed,
+                "rows": result.imported,
+                "rows_per_second": result.imported / elapsed if elapsed > 0 else 0.0
+            }
+        
+        for name, operation in core_operations(end, days, connections.dialect, DEFAULT_ACCOUNT_ID):
+            print(f"Timing {name}...", file=sys.stderr)
+            operations[name] = time_operation(connection, operation, repeat)
+    
+    return results
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="finance_core.benchmark", description="Time the core operations on synthetic data")
+    parser.add_argument("--rows", type=int, default=100000, help="transactions to generate")
+    parser.add_argument("--categories", type=int, default=20, help="distinct categories")
+    parser.add_argument("--days", type=int, default=3650, help="date span of the history")
+    parser.add_argument("--end", default="2024-12-31", help="last date of the history, YYYY-MM-DD")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--other-rows", type=int, default=0, help="transactions of a second account loaded alongside")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per timed operation")
+    parser.add_argument("--backend", choices=["mysql", "sqlite"], help="storage backend, defaults to the configured one")
+    parser.add_argument("--database", help="scratch database, defaults to <configured database>_bench")
+    parser.add_argument("--path", help="scratch SQLite file, defaults to <database>.db in the config directory")
+    parser.add_argument("--output", help="write the JSON results here instead of stdout")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch database afterwards")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    
+    config = load_db_config()
+    configured_path = config["path"]
+    database = args.database or f"{config['database']}_bench"
+    if database == config["database"]:
+        print("Error: the scratch database must not be the configured database", file=sys.stderr)
+        return 2
+    config["database"] = database
+    config["pool_size"] = 1
+    if args.backend:
+        config["backend"] = args.backend
+    # The configured SQLite file is never the scratch one
+    config["path"] = args.path or ""
+    if args.path and configured_path and os.path.abspath(args.path) == os.path.abspath(configured_path):
+        print("Error: the scratch database must not be the configured database", file=sys.stderr)
+        return 2
+    
+    try:
+        end = datetime.strptime(args.end, '%Y-%m-%d').date()
+    except ValueError:
+        print("Error: Invalid end date format. Use YYYY-MM-DD", file=sys.stderr)
+        return 2
+    
+    try:
+        connections = db.create_connection_manager(config)
+        # Always start from an empty scratch database
+        connections.drop_database()
+        connections.ensure_database()
+        connections.create_pool()
+        results = run_benchmark(connections, args.rows, args.categories, args.days, end, args.seed, args.repeat, args.other_rows)
+        if not args.keep:
+            connections.drop_database()
+    except db.DatabaseError + (OSError, ValueError) as err:
+        print(f"Error: {err}", file=sys.stderr)
+        return 1
+    
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as outfile:
+            outfile.write(output + "\n")
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+from datetime import date
+
+from .balances import month_start, to_date
+from .money import MAX_AMOUNT_CENTS, format_amount
+from .transactions import ValidationError, check_category_types
+
+
+class BudgetStatus:
+    # Budget and spending in cents for one category and month
+    def __init__(self, category, month, budget, spent):
+        self.category = category
+        self.month = month
+        self.budget = budget
+        self.spent = spent
+    
+    @property
+    def remaining(self):
+        return self.budget - self.spent
+    
+    @property
+    def over(self):
+        return self.spent > self.budget
+
+
+def validate_budget(category, amount):
+    if not category:
+        raise ValidationError("Please select a category")
+    
+    if not isinstance(amount, int) or isinstance(amount, bool) or amount <= 0:
+        raise ValidationError("Budget must be positive")
+    
+    if amount > MAX_AMOUNT_CENTS:
+        raise ValidationError(f"Budget must not exceed {format_amount(MAX_AMOUNT_CENTS)}")
+
+
+def set_budget(connection, account_id, category, amount):
+    # Monthly budget in cents for an expense category, replacing any earlier one
+    validate_budget(category, amount)
+    cursor = connection.cursor()
+    # Only expenses are counted against a budget
+    try:
+        check_category_types(cursor, account_id, category, ["expense"])
+    except ValidationError:
+        cursor.close()
+        raise
+    cursor.execute("""
+        INSERT INTO budgets (account_id, category, amount_cents)
+        VALUES (%s, %s, %s)
+        ON DUPLICATE KEY UPDATE amount_cents = VALUES(amount_cents)
+    """, (account_id, category, amount))
+    connection.commit()
+    cursor.close()
+
+
+def remove_budget(connection, account_id, category):
+    cursor = connection.cursor()
+    cursor.execute("DELETE FROM budgets WHERE account_id = %s AND category = %s", (account_id, category))
+    removed = cursor.rowcount
+    connection.commit()
+    cursor.close()
+    return removed
+
+
+def budget_status(connection, account_id, month=None):
+    # [BudgetStatus] for every budgeted category in month (any day of it,
+    # defaults to the current month), from one join of the budgets with
+    # the maintained spending counters
+    month = month_start(month or date.today())
+    cursor = connection.cursor()
+    cursor.execute("""
+        SELECT budgets.category, budgets.amount_cents, COALESCE(monthly_spending.spent_cents, 0)
+        FROM budgets
+        LEFT JOIN monthly_spending
+            ON monthly_spending.account_id = budgets.account_id
+            AND monthly_spending.month = %s
+            AND monthly_spending.category = budgets.category
+        WHERE budgets.account_id = %s
+        ORDER BY budgets.category
+    """, (month, account_id))
+    statuses = [BudgetStatus(category, month, int(budget), int(spent)) for category, budget, spent in cursor.fetchall()]
+    cursor.close()
+    return statuses
+
+
+def budget_alert(connection, account_id, category, day):
+    # BudgetStatus of category in day's month if it is over budget, else
+    # None. Checked after a write to that (category, month) only, with one
+    # primary key lookup per table.
+    month = month_start(to_date(day))
+    cursor = connection.cursor()
+    cursor.execute("""
+        SELECT budgets.amount_cents, COALESCE(monthly_spending.spent_cents, 0)
+        FROM budgets
+        LEFT JOIN monthly_spending
+            ON monthly_spending.account_id = budgets.account_id
+            AND monthly_spending.month = %s
+            AND monthly_spending.category = budgets.category
+        WHERE budgets.account_id = %s AND budgets.category = %s
+    """, (month, account_id, category))
+    row = cursor.fetchone()
+    cursor.close()
+    
+    if row is None:
+        return None
+    status = BudgetStatus(category, month, int(row[0]), int(row[1]))
+    return status if status.over else None
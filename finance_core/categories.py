@@ -0,0 +1,41 @@
+import threading
+
+
+class CategoryCache:
+    # Category names per type of one account, loaded with one query and
+    # shared by the add form, the edit dialog and the reports until
+    # invalidate() is called
+    def __init__(self, account_id):
+        self.account_id = account_id
+        self.lock = threading.Lock()
+        self.by_type = None
+        self.generation = 0
+    
+    def get(self, trans_type):
+        # None means the cache is cold and load() has to run first
+        with self.lock:
+            if self.by_type is None:
+                return None
+            return list(self.by_type.get(trans_type, []))
+    
+    def load(self, connection):
+        with self.lock:
+            generation = self.generation
+        
+        cursor = connection.cursor()
+        cursor.execute("SELECT name, type FROM categories WHERE account_id = %s ORDER BY name", (self.account_id,))
+        by_type = {}
+        for name, trans_type in cursor.fetchall():
+            by_type.setdefault(trans_type, []).append(name)
+        cursor.close()
+        
+        # Don't keep a result that an invalidation raced past
+        with self.lock:
+            if generation == self.generation:
+                self.by_type = by_type
+        return by_type
+    
+    def invalidate(self):
+        with self.lock:
+            self.by_type = None
+            self.generation += 1
@@ -0,0 +1,479 @@
+# Command-line entry point for cron jobs and display-less servers:
+#
+#   python -m finance_core add expense Food 12.50 --description Lunch
+#   python -m finance_core list --type expense --from 2024-01-01
+#   python -m finance_core list --search coffee
+#   python -m finance_core report summary --json
+#   python -m finance_core balance --date 2024-06-30
+#   python -m finance_core export transactions.csv
+#   python -m finance_core import statement.csv --bank --date-format %d/%m/%Y
+#   python -m finance_core recurring add expense Housing 950 --every monthly --start 2024-01-01
+#   python -m finance_core budget set Food 400
+#   python -m finance_core budget list --month 2024-06
+#   python -m finance_core --account Household --user alex list
+#   python -m finance_core account add Household --owner alex
+#   python -m finance_core partition account --count 16
+#   python -m finance_core archive year 2019
+#
+# Commands work on the configured account unless --account names another;
+# with --user (or account_user configured) the user has to be one of its
+# members. Recurring transactions of the account that have fallen due are
+# posted before every command runs.
+import argparse
+import json
+import sys
+from datetime import datetime
+
+from .accounts import add_account, add_user, fetch_accounts, grant_access, resolve_account
+from .archive import archive_year, fetch_archived_years, restore_year
+from .balances import balance_as_of
+from .budgets import budget_alert, budget_status, remove_budget, set_budget
+from .config import TRANSACTION_TYPES, load_db_config
+from . import db
+from .money import format_amount, parse_amount
+from .recurring import FREQUENCIES, add_rule, fetch_rules, post_due_occurrences, remove_rule
+from .reports import aggregate_transactions, rebuild_rollup
+from .schema import open_database, partition_transactions
+from .transactions import (
+    ValidationError,
+    build_transaction_filter,
+    insert_transaction,
+    iter_transactions,
+    validate_date,
+    validate_transaction
+)
+from .transfer import ImportMapping, export_transactions, import_transactions
+
+
+def amount_argument(value):
+    try:
+        return parse_amount(value)
+    except ValueError as err:
+        raise argparse.ArgumentTypeError(str(err))
+
+
+def add_filter_arguments(parser):
+    parser.add_argument("--type", choices=TRANSACTION_TYPES, help="only income or only expense")
+    parser.add_argument("--from", dest="date_from", help="first date, YYYY-MM-DD")
+    parser.add_argument("--to", dest="date_to", help="last date, YYYY-MM-DD")
+
+
+def command_add(connections, args):
+    date = args.date or datetime.now().strftime('%Y-%m-%d')
+    validate_transaction(args.type, args.category, args.amount, date)
+    with connections.connection() as connection:
+        transaction_id = insert_transaction(connection, args.account_id, args.type, args.category, args.amount, args.description, date)
+        alert = budget_alert(connection, args.account_id, args.category, date) if args.type == "expense" else None
+    print(f"Added transaction #{transaction_id}")
+    if alert is not None:
+        print_budget_alert(alert)
+    return 0
+
+
+def print_budget_alert(status):
+    print(
+        f"Warning: {status.category} is over budget for {status.month:%Y-%m}: "
+        f"{format_amount(status.spent)} spent of {format_amount(status.budget)}",
+        file=sys.stderr
+    )
+
+
+def command_list(connections, args):
+    transaction_filter = build_transaction_filter(
+        args.account_id, args.type, args.date_from, args.date_to, args.search, connections.dialect
+    )
+    with connections.connection() as connection:
+        for trans_id, trans_type, category, amount, description, date in iter_transactions(connection, transaction_filter, args.limit):
+            print(f"{trans_id}\t{date}\t{trans_type}\t{category}\t{format_amount(amount)}\t{description or ''}")
+    return 0
+
+
+def command_report(connections, args):
+    # Validates the dates the same way the filters do
+    build_transaction_filter(args.account_id, None, args.date_from, args.date_to)
+    with connections.connection() as connection:
+        aggregate = aggregate_transactions(connection, args.account_id, args.date_from, args.date_to, args.type)
+    
+    # Amounts are printed as decimal text, also in the JSON
+    if args.kind == "summary":
+        report = {
+            "income": format_amount(aggregate.income),
+            "expense": format_amount(aggregate.expense),
+            "balance": format_amount(aggregate.balance),
+            "count": aggregate.count
+        }
+    elif args.kind == "categories":
+        report = {
+            trans_type: {category: format_amount(total) for category, total in aggregate.categories(trans_type)}
+            for trans_type in TRANSACTION_TYPES
+            if not args.type or args.type == trans_type
+        }
+    else:
+        report = {
+            month: {
+                "income": format_amount(totals["income"]),
+                "expense": format_amount(totals["expense"]),
+                "count": totals["count"]
+            }
+            for month, totals in sorted(aggregate.by_month.items())
+        }
+    
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    return 0
+
+
+def command_balance(connections, args):
+    date = args.date or datetime.now().strftime('%Y-%m-%d')
+    validate_date(date)
+    with connections.connection() as connection:
+        balance = balance_as_of(connection, args.account_id, date)
+    print(f"Balance as of {date}: {format_amount(balance)}")
+    return 0
+
+
+def print_report(report, indent=""):
+    for key, value in report.items():
+        if isinstance(value, dict):
+            print(f"{indent}{key}:")
+            print_report(value, indent + "  ")
+        else:
+            print(f"{indent}{key}: {value}")
+
+
+def command_export(connections, args):
+    transaction_filter = build_transaction_filter(
+        args.account_id, args.type, args.date_from, args.date_to, args.search, connections.dialect
+    )
+    with connections.connection() as connection:
+        if args.path == "-":
+            rows_written = export_transactions(connection, args.account_id, sys.stdout, transaction_filter)
+        else:
+            with open(args.path, 'w', newline='', encoding='utf-8') as csvfile:
+                rows_written = export_transactions(connection, args.account_id, csvfile, transaction_filter)
+    print(f"Exported {rows_written} transactions", file=sys.stderr)
+    return 0
+
+
+def command_import(connections, args):
+    if args.bank:
+        mapping = ImportMapping(
+            type_column=None,
+            category_column=args.category_column,
+            amount_column=args.amount_column,
+            description_column=args.description_column,
+            date_column=args.date_column,
+            date_format=args.date_format,
+            default_category=args.default_category
+        )
+    else:
+        mapping = ImportMapping()
+    
+    with connections.connection() as connection:
+        with open(args.path, newline='', encoding='utf-8-sig') as csvfile:
+            result = import_transactions(connection, args.account_id, csvfile, mapping)
+    
+    print(f"Imported {result.imported} transactions")
+    if result.created_categories:
+        print(f"New categories: {', '.join(result.created_categories)}")
+    for line_number, error in result.errors:
+        print(f"line {line_number}: {error}", file=sys.stderr)
+    return 1 if result.errors else 0
+
+
+def command_recurring_add(connections, args):
+    start_date = args.start or datetime.now().strftime('%Y-%m-%d')
+    with connections.connection() as connection:
+        rule_id = add_rule(
+            connection, args.account_id, args.type, args.category, args.amount, args.description,
+            start_date, args.every, args.interval, args.end
+        )
+        posted = post_due_occurrences(connection, args.account_id)
+    print(f"Added recurring rule #{rule_id}")
+    if posted:
+        print(f"Posted {posted} transactions", file=sys.stderr)
+    return 0
+
+
+def command_recurring_list(connections, args):
+    with connections.connection() as connection:
+        rules = fetch_rules(connection, args.account_id)
+    for rule_id, trans_type, category, amount, description, frequency, interval, start, end, next_date in rules:
+        every = frequency if interval == 1 else f"every {interval} {frequency}"
+        print(f"{rule_id}\t{trans_type}\t{category}\t{format_amount(amount)}\t{every}\t"
+              f"{start}\t{end or ''}\t{next_date or 'ended'}\t{description or ''}")
+    return 0
+
+
+def command_recurring_delete(connections, args):
+    with connections.connection() as connection:
+        removed = remove_rule(connection, args.account_id, args.id)
+    if not removed:
+        print(f"Error: no recurring rule #{args.id}", file=sys.stderr)
+        return 1
+    print(f"Deleted recurring rule #{args.id}")
+    return 0
+
+
+def command_budget_set(connections, args):
+    with connections.connection() as connection:
+        set_budget(connection, args.account_id, args.category, args.amount)
+        statuses = budget_status(connection, args.account_id)
+    print(f"Monthly budget for {args.category}: {format_amount(args.amount)}")
+    for status in statuses:
+        if status.category == args.category and status.over:
+            print_budget_alert(status)
+    return 0
+
+
+def command_budget_list(connections, args):
+    month = None
+    if args.month:
+        try:
+            month = datetime.strptime(args.month, '%Y-%m').date()
+        except ValueError:
+            raise ValidationError("Invalid month format. Use YYYY-MM")
+    with connections.connection() as connection:
+        statuses = budget_status(connection, args.account_id, month)
+    for status in statuses:
+        flag = "OVER" if status.over else ""
+        print(f"{status.month:%Y-%m}\t{status.category}\t{format_amount(status.spent)}\t"
+              f"{format_amount(status.budget)}\t{format_amount(status.remaining)}\t{flag}")
+    return 0
+
+
+def command_budget_delete(connections, args):
+    with connections.connection() as connection:
+        removed = remove_budget(connection, args.account_id, args.category)
+    if not removed:
+        print(f"Error: no budget for {args.category}", file=sys.stderr)
+        return 1
+    print(f"Deleted the budget for {args.category}")
+    return 0
+
+
+def command_account_add(connections, args):
+    with connections.connection() as connection:
+        account_id = add_account(connection, args.name, args.owner)
+    print(f"Added account {args.name} (#{account_id})")
+    return 0
+
+
+def command_account_list(connections, args):
+    with connections.connection() as connection:
+        accounts = fetch_accounts(connection, args.user)
+    for account_id, name in accounts:
+        print(f"{account_id}\t{name}")
+    return 0
+
+
+def command_account_grant(connections, args):
+    with connections.connection() as connection:
+        grant_access(connection, args.name, args.member)
+    print(f"{args.member} can now open {args.name}")
+    return 0
+
+
+def command_user_add(connections, args):
+    with connections.connection() as connection:
+        user_id = add_user(connection, args.name)
+    print(f"Added user {args.name} (#{user_id})")
+    return 0
+
+
+def command_partition(connections, args):
+    with connections.connection() as connection:
+        partition_transactions(connection, args.scheme, args.count)
+    print(f"Transactions partitioned by {args.scheme}; search now scans instead of using the full-text index")
+    return 0
+
+
+def command_archive_year(connections, args):
+    with connections.connection() as connection:
+        count = archive_year(connection, args.account_id, args.year)
+    print(f"Archived {count} transactions from {args.year}")
+    return 0
+
+
+def command_archive_restore(connections, args):
+    with connections.connection() as connection:
+        count = restore_year(connection, args.account_id, args.year)
+    print(f"Restored {count} transactions to {args.year}")
+    return 0
+
+
+def command_archive_list(connections, args):
+    with connections.connection() as connection:
+        years = fetch_archived_years(connection, args.account_id)
+    for archived in years:
+        print(f"{archived.year}\t{archived.count}\t{format_amount(archived.income)}\t"
+              f"{format_amount(archived.expense)}\t{format_amount(archived.balance)}")
+    return 0
+
+
+def command_rebuild(connections, args):
+    with connections.connection() as connection:
+        rebuild_rollup(connection)
+    print("Report totals rebuilt")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="finance_core", description="Personal Finance Manager command line")
+    parser.add_argument("--account", help="account to work on, defaults to the configured one")
+    parser.add_argument("--user", help="user opening the account, who has to be a member of it")
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    add = commands.add_parser("add", help="add a transaction")
+    add.add_argument("type", choices=TRANSACTION_TYPES)
+    add.add_argument("category")
+    add.add_argument("amount", type=amount_argument)
+    add.add_argument("--description", default="")
+    add.add_argument("--date", help="YYYY-MM-DD, defaults to today")
+    add.set_defaults(handler=command_add)
+    
+    list_parser = commands.add_parser("list", help="list transactions, newest first")
+    add_filter_arguments(list_parser)
+    list_parser.add_argument("--limit", type=int)
+    list_parser.add_argument("--search", help="words to find in description or category")
+    list_parser.set_defaults(handler=command_list)
+    
+    report = commands.add_parser("report", help="print report totals")
+    report.add_argument("kind", nargs="?", choices=("summary", "categories", "monthly"), default="summary")
+    add_filter_arguments(report)
+    report.add_argument("--json", action="store_true", help="print JSON instead of text")
+    report.set_defaults(handler=command_report)
+    
+    balance = commands.add_parser("balance", help="print the balance at the end of a date")
+    balance.add_argument("--date", help="YYYY-MM-DD, defaults to today")
+    balance.set_defaults(handler=command_balance)
+    
+    export = commands.add_parser("export", help="export transactions as CSV")
+    export.add_argument("path", help="output file, or - for stdout")
+    add_filter_arguments(export)
+    export.add_argument("--search", help="words to find in description or category")
+    export.set_defaults(handler=command_export)
+    
+    import_parser = commands.add_parser("import", help="import transactions from CSV")
+    import_parser.add_argument("path")
+    import_parser.add_argument("--bank", action="store_true", help="bank statement: negative amounts are expenses")
+    import_parser.add_argument("--date-column", default="Date")
+    import_parser.add_argument("--date-format", default="%Y-%m-%d")
+    import_parser.add_argument("--amount-column", default="Amount")
+    import_parser.add_argument("--description-column", default="Description")
+    import_parser.add_argument("--category-column")
+    import_parser.add_argument("--default-category", default="Other")
+    import_parser.set_defaults(handler=command_import)
+    
+    recurring = commands.add_parser("recurring", help="manage recurring transactions")
+    recurring_commands = recurring.add_subparsers(dest="recurring_command", required=True)
+    
+    recurring_add = recurring_commands.add_parser("add", help="add a recurring rule")
+    recurring_add.add_argument("type", choices=TRANSACTION_TYPES)
+    recurring_add.add_argument("category")
+    recurring_add.add_argument("amount", type=amount_argument)
+    recurring_add.add_argument("--every", choices=FREQUENCIES, default="monthly")
+    recurring_add.add_argument("--interval", type=int, default=1, help="post every N periods")
+    recurring_add.add_argument("--start", help="first occurrence, YYYY-MM-DD, defaults to today")
+    recurring_add.add_argument("--end", help="last possible occurrence, YYYY-MM-DD")
+    recurring_add.add_argument("--description", default="")
+    recurring_add.set_defaults(handler=command_recurring_add)
+    
+    recurring_list = recurring_commands.add_parser("list", help="list recurring rules")
+    recurring_list.set_defaults(handler=command_recurring_list)
+    
+    recurring_delete = recurring_commands.add_parser("delete", help="stop a recurring rule, keeping what it posted")
+    recurring_delete.add_argument("id", type=int)
+    recurring_delete.set_defaults(handler=command_recurring_delete)
+    
+    budget = commands.add_parser("budget", help="manage monthly category budgets")
+    budget_commands = budget.add_subparsers(dest="budget_command", required=True)
+    
+    budget_set = budget_commands.add_parser("set", help="set the monthly budget of an expense category")
+    budget_set.add_argument("category")
+    budget_set.add_argument("amount", type=amount_argument)
+    budget_set.set_defaults(handler=command_budget_set)
+    
+    budget_list = budget_commands.add_parser("list", help="spending against each budget")
+    budget_list.add_argument("--month", help="YYYY-MM, defaults to this month")
+    budget_list.set_defaults(handler=command_budget_list)
+    
+    budget_delete = budget_commands.add_parser("delete", help="remove a category's budget")
+    budget_delete.add_argument("category")
+    budget_delete.set_defaults(handler=command_budget_delete)
+    
+    # Administration works across accounts, so it needs none opened
+    account = commands.add_parser("account", help="manage accounts")
+    account_commands = account.add_subparsers(dest="account_command", required=True)
+    
+    account_add = account_commands.add_parser("add", help="add an empty account with the default categories")
+    account_add.add_argument("name")
+    account_add.add_argument("--owner", help="user to make its first member")
+    account_add.set_defaults(handler=command_account_add, scoped=False)
+    
+    account_list = account_commands.add_parser("list", help="list accounts, only the --user's if given")
+    account_list.set_defaults(handler=command_account_list, scoped=False)
+    
+    account_grant = account_commands.add_parser("grant", help="make a user a member of an account")
+    account_grant.add_argument("name")
+    account_grant.add_argument("member")
+    account_grant.set_defaults(handler=command_account_grant, scoped=False)
+    
+    user = commands.add_parser("user", help="manage users")
+    user_commands = user.add_subparsers(dest="user_command", required=True)
+    
+    user_add = user_commands.add_parser("add", help="add a user")
+    user_add.add_argument("name")
+    user_add.set_defaults(handler=command_user_add, scoped=False)
+    
+    partition = commands.add_parser("partition", help="partition the transactions table (MySQL; disables the full-text index)")
+    partition.add_argument("scheme", choices=("account", "year"))
+    partition.add_argument("--count", type=int, default=8, help="partitions when partitioning by account")
+    partition.set_defaults(handler=command_partition, scoped=False)
+    
+    archive = commands.add_parser("archive", help="move closed years out of the live transactions table")
+    archive_commands = archive.add_subparsers(dest="archive_command", required=True)
+    
+    archive_year_parser = archive_commands.add_parser("year", help="archive every transaction of a past year")
+    archive_year_parser.add_argument("year", type=int)
+    archive_year_parser.set_defaults(handler=command_archive_year)
+    
+    archive_restore = archive_commands.add_parser("restore", help="move an archived year back and reopen it")
+    archive_restore.add_argument("year", type=int)
+    archive_restore.set_defaults(handler=command_archive_restore)
+    
+    archive_list = archive_commands.add_parser("list", help="list archived years with their totals")
+    archive_list.set_defaults(handler=command_archive_list)
+    
+    rebuild = commands.add_parser("rebuild-totals", help="recompute the report rollup of every account")
+    rebuild.set_defaults(handler=command_rebuild, scoped=False)
+    
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    
+    # One connection is all a single command needs
+    config = load_db_config()
+    config["pool_size"] = 1
+    
+    args.user = args.user or config["account_user"] or None
+    
+    try:
+        connections = open_database(config)
+        if getattr(args, "scoped", True):
+            with connections.connection() as connection:
+                args.account_id = resolve_account(connection, args.account or config["account"], args.user)
+                posted = post_due_occurrences(connection, args.account_id)
+            if posted:
+                print(f"Posted {posted} recurring transactions", file=sys.stderr)
+        return args.handler(connections, args)
+    except ValidationError as err:
+        print(f"Error: {err}", file=sys.stderr)
+        return 2
+    except db.DatabaseError + (OSError,) as err:
+        print(f"Error: {err}", file=sys.stderr)
+        return 1
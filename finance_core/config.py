@@ -0,0 +1,50 @@
+import os
+
+# Connection settings, overridden by the [database] section of
+# finance_manager.ini and then by FINANCE_DB_* environment variables.
+# backend is "mysql" or "sqlite"; the SQLite file defaults to
+# <database>.db next to the configuration file. account is the ledger
+# opened, and account_user, when set, the user who has to be a member of
+# it; user and password are the database login.
+CONFIG_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONFIG_FILE = os.path.join(CONFIG_DIR, "finance_manager.ini")
+# Ledger that databases from before accounts were added are moved into
+DEFAULT_ACCOUNT = "Personal"
+DEFAULT_DB_CONFIG = {
+    "backend": "mysql",
+    "path": "",
+    "host": "localhost",
+    "port": "3306",
+    "user": "root",
+    "password": "",
+    "database": "finance_manager",
+    "pool_size": "4",
+    "account": DEFAULT_ACCOUNT,
+    "account_user": ""
+}
+
+TRANSACTION_TYPES = ("income", "expense")
+
+
+def load_db_config(path=CONFIG_FILE):
+    # Imported here: configparser is slow to load and --help never reads
+    # the configuration
+    import configparser
+    
+    config = dict(DEFAULT_DB_CONFIG)
+    
+    parser = configparser.ConfigParser()
+    if parser.read(path) and parser.has_section("database"):
+        for key in config:
+            if parser.has_option("database", key):
+                config[key] = parser.get("database", key)
+    
+    for key in config:
+        value = os.environ.get("FINANCE_DB_" + key.upper())
+        if value is not None:
+            config[key] = value
+    
+    config["port"] = int(config["port"])
+    config["pool_size"] = int(config["pool_size"])
+    return config
+
@@ -0,0 +1,173 @@
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from .dialects import MYSQL, MySQLDialect
+from .instrumentation import InstrumentedConnection
+
+# mysql.connector, imported by the first MySQL connection manager. Loading
+# it takes longer than the rest of finance_core together, and the SQLite
+# backend never needs it.
+mysql = None
+pooling = None
+
+
+class BackendUnavailable(Exception):
+    # The configured backend's driver is not installed
+    pass
+
+
+# Error types callers catch without importing the drivers themselves; both
+# are tuples, which except and isinstance accept. Tuples do not nest in an
+# except clause, so add other types with DatabaseError + (OSError,).
+# load_mysql adds the MySQL types once the driver is in use, so look them
+# up as db.DatabaseError when handling an error instead of importing the
+# names.
+DatabaseError = (BackendUnavailable, sqlite3.Error)
+IntegrityError = (sqlite3.IntegrityError,)
+
+
+def load_mysql():
+    global mysql, pooling, DatabaseError, IntegrityError
+    if mysql is not None:
+        return
+    try:
+        import mysql.connector
+        from mysql.connector import pooling
+    except ImportError:
+        raise BackendUnavailable("mysql-connector-python is not installed; use backend = sqlite")
+    DatabaseError += (mysql.connector.Error,)
+    IntegrityError += (mysql.connector.IntegrityError,)
+
+# Reconnect backoff when the server is unreachable or the pool is exhausted
+RECONNECT_ATTEMPTS = 5
+RECONNECT_INITIAL_DELAY = 0.1  # seconds, doubled after every failed attempt
+RECONNECT_MAX_DELAY = 2.0
+
+
+class ConnectionManager:
+    # Hands out pooled connections to the UI thread, the query workers and
+    # the command line. The pool pings each connection on checkout and
+    # reconnects it if the server dropped it; failures are retried with
+    # exponential backoff. With metrics set, every cursor is timed.
+    dialect = MYSQL
+    
+    def __init__(self, config, metrics=None):
+        load_mysql()
+        self.config = config
+        self.metrics = metrics
+        self.pool = None
+        self.lock = threading.Lock()
+    
+    def server_settings(self):
+        return {
+            "host": self.config["host"],
+            "port": self.config["port"],
+            "user": self.config["user"],
+            "password": self.config["password"]
+        }
+    
+    def connect_to_server(self):
+        return mysql.connector.connect(**self.server_settings())
+    
+    def ensure_database(self):
+        # The pool connects straight into the database, so create it first
+        connection = self.connect_to_server()
+        cursor = connection.cursor()
+        cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{self.config['database']}`")
+        cursor.close()
+        connection.close()
+    
+    def drop_database(self):
+        connection = self.connect_to_server()
+        cursor = connection.cursor()
+        cursor.execute(f"DROP DATABASE IF EXISTS `{self.config['database']}`")
+        cursor.close()
+        connection.close()
+    
+    def create_pool(self):
+        self.pool = pooling.MySQLConnectionPool(
+            pool_name="finance_manager",
+            pool_size=self.config["pool_size"],
+            pool_reset_session=True,
+            database=self.config["database"],
+            **self.server_settings()
+        )
+    
+    def detect_search_index(self, connection):
+        # Call once the schema is migrated: a partitioned transactions table
+        # has no FULLTEXT index, and its searches have to use LIKE
+        cursor = connection.cursor()
+        if not self.dialect.has_search_index(cursor):
+            self.dialect = MySQLDialect(fulltext=False)
+        cursor.close()
+    
+    def get_connection(self):
+        delay = RECONNECT_INITIAL_DELAY
+        last_error = None
+        
+        for attempt in range(RECONNECT_ATTEMPTS):
+            try:
+                with self.lock:
+                    if self.pool is None:
+                        self.create_pool()
+                connection = self.pool.get_connection()
+                if self.metrics is not None:
+                    return InstrumentedConnection(connection, self.metrics)
+                return connection
+            except DatabaseError as err:
+                # Covers an unreachable server as well as an exhausted pool
+                last_error = err
+            
+            if attempt < RECONNECT_ATTEMPTS - 1:
+                time.sleep(delay)
+                delay = min(delay * 2, RECONNECT_MAX_DELAY)
+        
+        raise last_error
+    
+    def release(self, connection):
+        # Returns the connection to the pool; the session reset fails on a
+        # broken connection, which is then reconnected on its next checkout
+        try:
+            connection.close()
+        except DatabaseError:
+            pass
+    
+    def interrupt(self, connection):
+        # Aborts the statement running on connection, from another thread
+        try:
+            killer = self.get_connection()
+            cursor = killer.cursor()
+            cursor.execute(f"KILL QUERY {int(connection.connection_id)}")
+            cursor.close()
+            self.release(killer)
+        except DatabaseError:
+            # The query finished before it could be killed
+            pass
+    
+    @contextmanager
+    def connection(self):
+        # Checked-out connection that is rolled back on error and always
+        # returned to the pool
+        connection = self.get_connection()
+        try:
+            yield connection
+        except BaseException:
+            try:
+                connection.rollback()
+            except DatabaseError:
+                pass
+            raise
+        finally:
+            self.release(connection)
+
+
+def create_connection_manager(config, metrics=None):
+    # Connection manager for the backend named in the configuration
+    if config["backend"] == "sqlite":
+        from .sqlite_db import SQLiteConnectionManager
+        return SQLiteConnectionManager(config, metrics)
+    if config["backend"] == "mysql":
+        return ConnectionManager(config, metrics)
+    raise ValueError(f"Unknown database backend '{config['backend']}'")
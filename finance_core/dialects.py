@@ -0,0 +1,210 @@
+# The SQL in finance_core is written for MySQL. What a backend cannot take
+# as is, or get from a mechanical rewrite in its cursor, comes from its
+# dialect: date bucketing, full-text search, DDL, migration locking and
+# bulk inserts.
+
+# Columns of the rows insert_transactions takes, in order
+TRANSACTION_COLUMNS = "account_id, type, category, amount_cents, description, date"
+
+
+class MySQLDialect:
+    name = "mysql"
+    # DDL commits implicitly, so migrations are recorded step by step
+    transactional_ddl = False
+    auto_increment_key = "INT AUTO_INCREMENT PRIMARY KEY"
+    explain_prefix = "EXPLAIN "
+    supports_partitioning = True
+    # Archived rows are rarely read, so they are stored compressed
+    compressed_table_options = "ROW_FORMAT=COMPRESSED"
+    # Rows per multi-row INSERT, well under the default max_allowed_packet
+    MULTI_ROW_INSERT_SIZE = 1000
+    
+    def __init__(self, fulltext=True):
+        # fulltext: transactions has its FULLTEXT index; a partitioned table
+        # cannot, and search falls back to LIKE
+        self.fulltext = fulltext
+    
+    def bucket_start(self, granularity, column):
+        # First day of the daily, weekly (Monday) or monthly bucket
+        if granularity == "daily":
+            return column
+        if granularity == "weekly":
+            return f"DATE_SUB({column}, INTERVAL WEEKDAY({column}) DAY)"
+        if granularity == "monthly":
+            return f"DATE_SUB({column}, INTERVAL DAYOFMONTH({column}) - 1 DAY)"
+        raise ValueError(f"Unknown granularity '{granularity}'")
+    
+    def year_month(self, column):
+        # YYYYMM as an integer
+        return f"EXTRACT(YEAR_MONTH FROM {column})"
+    
+    def search_condition(self, words):
+        # Every word must match; each is quoted as a phrase so the ngram
+        # parser looks for its n-grams in sequence, which finds partial
+        # words too
+        if not self.fulltext:
+            return like_conditions(words)
+        return (
+            ["MATCH (description, category) AGAINST (%s IN BOOLEAN MODE)"],
+            [" ".join(f'+"{word}"' for word in words)]
+        )
+    
+    def has_search_index(self, cursor):
+        cursor.execute("""
+            SELECT COUNT(*) FROM information_schema.statistics
+            WHERE table_schema = DATABASE() AND table_name = 'transactions' AND index_name = 'ft_transactions_text'
+        """)
+        return cursor.fetchone()[0] > 0
+    
+    def create_search_index(self, cursor):
+        cursor.execute("""
+            ALTER TABLE transactions
+            ADD FULLTEXT INDEX ft_transactions_text (description, category) WITH PARSER ngram
+        """)
+    
+    def drop_index(self, cursor, table, index):
+        cursor.execute(f"DROP INDEX {index} ON {table}")
+    
+    def insert_transactions(self, cursor, rows):
+        # One multi-row INSERT per batch instead of a statement per row;
+        # InnoDB applies the FULLTEXT changes once, at commit
+        placeholders = "(%s, %s, %s, %s, %s, %s)"
+        for start in range(0, len(rows), self.MULTI_ROW_INSERT_SIZE):
+            batch = rows[start:start + self.MULTI_ROW_INSERT_SIZE]
+            cursor.execute(
+                f"INSERT INTO transactions ({TRANSACTION_COLUMNS}) VALUES " + ", ".join([placeholders] * len(batch)),
+                [value for row in batch for value in row]
+            )
+    
+    def lock_migrations(self, cursor):
+        # Serialise concurrent upgrades from several app instances
+        cursor.execute("SELECT GET_LOCK('finance_manager_migrate', 30)")
+        cursor.fetchall()
+    
+    def unlock_migrations(self, cursor):
+        cursor.execute("SELECT RELEASE_LOCK('finance_manager_migrate')")
+        cursor.fetchall()
+
+
+class SQLiteDialect:
+    name = "sqlite"
+    transactional_ddl = True
+    auto_increment_key = "INTEGER PRIMARY KEY AUTOINCREMENT"
+    explain_prefix = "EXPLAIN QUERY PLAN "
+    supports_partitioning = False
+    compressed_table_options = ""
+    # The trigram tokenizer only indexes terms of three or more characters
+    FTS_MIN_TERM_LENGTH = 3
+    
+    def __init__(self, fts=True):
+        # fts: the SQLite build has FTS5; without it search falls back to LIKE
+        self.fts = fts
+    
+    def bucket_start(self, granularity, column):
+        if granularity == "daily":
+            return column
+        if granularity == "weekly":
+            return f"date({column}, 'weekday 0', '-6 days')"
+        if granularity == "monthly":
+            return f"date({column}, 'start of month')"
+        raise ValueError(f"Unknown granularity '{granularity}'")
+    
+    def year_month(self, column):
+        return f"CAST(strftime('%Y%m', {column}) AS INTEGER)"
+    
+    def search_condition(self, words):
+        conditions = []
+        params = []
+        indexed = [word for word in words if self.fts and len(word) >= self.FTS_MIN_TERM_LENGTH]
+        if indexed:
+            conditions.append("id IN (SELECT rowid FROM transactions_fts WHERE transactions_fts MATCH %s)")
+            params.append(" ".join('"' + word.replace('"', '""') + '"' for word in indexed))
+        like, like_params = like_conditions([word for word in words if word not in indexed])
+        return conditions + like, params + like_params
+    
+    def create_search_index(self, cursor):
+        if not self.fts:
+            return
+        # External-content FTS5 table over the transactions, kept in step
+        # by triggers; the trigram tokenizer matches any substring
+        cursor.execute("""
+            CREATE VIRTUAL TABLE transactions_fts USING fts5(
+                description, category, content='transactions', content_rowid='id', tokenize='trigram'
+            )
+        """)
+        self.create_insert_trigger(cursor)
+        cursor.execute("""
+            CREATE TRIGGER transactions_fts_delete AFTER DELETE ON transactions BEGIN
+                INSERT INTO transactions_fts (transactions_fts, rowid, description, category)
+                VALUES ('delete', old.id, old.description, old.category);
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER transactions_fts_update AFTER UPDATE OF description, category ON transactions BEGIN
+                INSERT INTO transactions_fts (transactions_fts, rowid, description, category)
+                VALUES ('delete', old.id, old.description, old.category);
+                INSERT INTO transactions_fts (rowid, description, category)
+                VALUES (new.id, new.description, new.category);
+            END
+        """)
+        cursor.execute("INSERT INTO transactions_fts (transactions_fts) VALUES ('rebuild')")
+    
+    def create_insert_trigger(self, cursor):
+        cursor.execute("""
+            CREATE TRIGGER transactions_fts_insert AFTER INSERT ON transactions BEGIN
+                INSERT INTO transactions_fts (rowid, description, category)
+                VALUES (new.id, new.description, new.category);
+            END
+        """)
+    
+    def insert_transactions(self, cursor, rows):
+        # The insert trigger updates the FTS index row by row, which costs
+        # more than the insert itself. A batch goes in with the trigger
+        # dropped and is indexed in one INSERT ... SELECT over its ids, then
+        # the trigger is put back. DDL is transactional here and the whole
+        # batch runs under the write lock, so no other connection ever sees
+        # the trigger missing or the rows unindexed.
+        insert = f"INSERT INTO transactions ({TRANSACTION_COLUMNS}) VALUES (%s, %s, %s, %s, %s, %s)"
+        if not self.fts:
+            cursor.executemany(insert, rows)
+            return
+        
+        # Takes the write lock; every id the batch gets is above this one
+        cursor.execute("SELECT COALESCE(MAX(id), 0) FROM transactions FOR UPDATE")
+        last_id = cursor.fetchone()[0]
+        cursor.execute("DROP TRIGGER transactions_fts_insert")
+        cursor.executemany(insert, rows)
+        cursor.execute("""
+            INSERT INTO transactions_fts (rowid, description, category)
+            SELECT id, description, category FROM transactions WHERE id > %s
+        """, (last_id,))
+        self.create_insert_trigger(cursor)
+    
+    def drop_index(self, cursor, table, index):
+        # Index names are global in SQLite
+        cursor.execute(f"DROP INDEX {index}")
+    
+    def lock_migrations(self, cursor):
+        # The whole upgrade runs in one write transaction
+        cursor.execute("BEGIN IMMEDIATE")
+    
+    def unlock_migrations(self, cursor):
+        pass
+
+
+def like_conditions(words):
+    # Unindexed search: every word somewhere in description or category
+    conditions = []
+    params = []
+    for word in words:
+        conditions.append("(description LIKE %s OR category LIKE %s)")
+        params.extend([f"%{word}%", f"%{word}%"])
+    return conditions, params
+
+
+MYSQL = MySQLDialect()
+
+
+def dialect_of(connection):
+    # Connections that are not MySQL carry their dialect
+    return getattr(connection, "dialect", MYSQL)
@@ -0,0 +1,221 @@
+import json
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from functools import lru_cache
+
+from .dialects import dialect_of
+
+# Latency histogram bucket upper bounds in milliseconds; one more open
+# bucket catches everything slower
+LATENCY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+# Statements and UI steps at least this slow go to the slow log
+SLOW_OPERATION_THRESHOLD = 0.25  # seconds
+SLOW_LOG_SIZE = 200
+
+STATEMENT_PATTERN = re.compile(
+    r"^\s*(\w+)(?:\s+(?:IGNORE\s+)?(?=\w+\s+SET\b)|.*?\b(?:FROM|INTO|TABLE)\s+(?:IF\s+NOT\s+EXISTS\s+)?)?`?(\w+)?",
+    re.IGNORECASE | re.DOTALL
+)
+
+
+@lru_cache(maxsize=512)
+def statement_name(statement):
+    # "sql SELECT transactions": verb and first table, so statements that
+    # only differ in their parameters or IN lists share one histogram
+    match = STATEMENT_PATTERN.match(statement)
+    if match is None:
+        return "sql"
+    verb, table = match.groups()
+    return f"sql {verb.upper()} {table}" if table else f"sql {verb.upper()}"
+
+
+class Histogram:
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+    
+    def add(self, seconds, rows=0):
+        milliseconds = seconds * 1000
+        index = 0
+        while index < len(LATENCY_BUCKETS) and milliseconds > LATENCY_BUCKETS[index]:
+            index += 1
+        self.buckets[index] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.rows += rows
+    
+    def percentile(self, fraction):
+        # Upper bound of the bucket holding the given fraction, in ms
+        target = fraction * self.count
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS, self.buckets):
+            seen += count
+            if seen >= target:
+                return min(bound, self.max * 1000)
+        return self.max * 1000
+    
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "total_ms": self.total * 1000,
+            "mean_ms": self.total * 1000 / self.count if self.count else 0.0,
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "max_ms": self.max * 1000,
+            "rows": self.rows,
+            "buckets_ms": dict(zip([str(bound) for bound in LATENCY_BUCKETS] + ["inf"], self.buckets))
+        }
+
+
+class Metrics:
+    # Latency histograms per operation plus a bounded slow-operation log,
+    # shared by the query workers and the Tk thread
+    def __init__(self, slow_threshold=SLOW_OPERATION_THRESHOLD, explain_slow=True):
+        self.slow_threshold = slow_threshold
+        self.explain_slow = explain_slow
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.slow_log = deque(maxlen=SLOW_LOG_SIZE)
+        self.started_at = datetime.now()
+    
+    def record(self, name, seconds, rows=0, statement=None):
+        # Returns the slow log entry when the operation was slow, so the
+        # caller can attach an EXPLAIN to it
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.add(seconds, rows)
+            
+            if seconds < self.slow_threshold:
+                return None
+            entry = {
+                "at": datetime.now().isoformat(timespec="seconds"),
+                "operation": name,
+                "ms": seconds * 1000,
+                "rows": rows,
+                "statement": " ".join(statement.split()) if statement else None,
+                "explain": None
+            }
+            self.slow_log.append(entry)
+            return entry
+    
+    @contextmanager
+    def timer(self, name):
+        # with metrics.timer("ui step") as timing: ... timing["rows"] = n
+        timing = {"rows": 0}
+        started = time.perf_counter()
+        try:
+            yield timing
+        finally:
+            self.record(name, time.perf_counter() - started, timing["rows"])
+    
+    def snapshot(self):
+        with self.lock:
+            return {
+                "since": self.started_at.isoformat(timespec="seconds"),
+                "slow_threshold_ms": self.slow_threshold * 1000,
+                "operations": {name: histogram.as_dict() for name, histogram in sorted(self.histograms.items())},
+                "slow_log": [dict(entry) for entry in self.slow_log]
+            }
+    
+    def reset(self):
+        with self.lock:
+            self.histograms = {}
+            self.slow_log.clear()
+            self.started_at = datetime.now()
+    
+    def export(self, path):
+        with open(path, 'w', encoding='utf-8') as outfile:
+            json.dump(self.snapshot(), outfile, indent=2)
+            outfile.write("\n")
+
+
+class InstrumentedCursor:
+    # Times execute and the fetch calls of a driver cursor; everything else
+    # is passed through
+    def __init__(self, cursor, connection, metrics):
+        self.cursor = cursor
+        self.connection = connection
+        self.metrics = metrics
+        self.statement = None
+        self.params = None
+        self.name = "sql"
+        self.pending_explain = None
+    
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+    
+    def __iter__(self):
+        return iter(self.cursor)
+    
+    def execute(self, statement, params=None):
+        self.statement = statement
+        self.params = params
+        self.name = statement_name(statement)
+        started = time.perf_counter()
+        result = self.cursor.execute(statement, params)
+        entry = self.metrics.record(self.name, time.perf_counter() - started, max(self.cursor.rowcount, 0), statement)
+        if entry is not None and self.name.startswith("sql SELECT"):
+            # The result may still be streaming, so EXPLAIN once it is read
+            self.pending_explain = (entry, statement, params)
+        return result
+    
+    def executemany(self, statement, seq_params):
+        self.name = statement_name(statement)
+        started = time.perf_counter()
+        result = self.cursor.executemany(statement, seq_params)
+        self.metrics.record(self.name, time.perf_counter() - started, max(self.cursor.rowcount, 0), statement)
+        return result
+    
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = self.cursor.fetchall()
+        self.metrics.record("fetch " + self.name[4:], time.perf_counter() - started, len(rows))
+        return rows
+    
+    def fetchmany(self, size=1):
+        started = time.perf_counter()
+        rows = self.cursor.fetchmany(size)
+        self.metrics.record("fetch " + self.name[4:], time.perf_counter() - started, len(rows))
+        return rows
+    
+    def close(self):
+        result = self.cursor.close()
+        if self.pending_explain is not None and self.metrics.explain_slow:
+            self.explain(*self.pending_explain)
+        self.pending_explain = None
+        return result
+    
+    def explain(self, entry, statement, params):
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute(dialect_of(self.connection).explain_prefix + statement, params)
+            columns = [column[0] for column in cursor.description]
+            plan = [dict(zip(columns, [str(value) for value in row])) for row in cursor.fetchall()]
+            cursor.close()
+        except Exception as err:
+            plan = f"EXPLAIN failed: {err}"
+        with self.metrics.lock:
+            entry["explain"] = plan
+
+
+class InstrumentedConnection:
+    # Pooled connection whose cursors are instrumented
+    def __init__(self, connection, metrics):
+        self.connection = connection
+        self.metrics = metrics
+    
+    def __getattr__(self, name):
+        return getattr(self.connection, name)
+    
+    def cursor(self, *args, **kwargs):
+        return InstrumentedCursor(self.connection.cursor(*args, **kwargs), self.connection, self.metrics)
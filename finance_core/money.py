@@ -0,0 +1,46 @@
+# Money is held as integer cents everywhere below the UI: validation,
+# the BIGINT columns, the rollup and checkpoint totals, the analytics
+# snapshot, every aggregate and the balances. Sums of ints are exact and
+# cheap, so nothing drifts however many rows are added up. Decimal text
+# only appears at the edges, in parse_amount, to_cents and format_amount.
+from decimal import ROUND_HALF_EVEN, Decimal, InvalidOperation
+
+CENTS_PER_UNIT = 100
+# Largest single amount: 10 trillion, far below what a BIGINT sum overflows at
+MAX_AMOUNT_CENTS = 10 ** 15
+
+
+def to_cents(value):
+    # Decimal, int or decimal text in currency units -> cents, rounded to
+    # the nearest cent
+    cents = (Decimal(value) * CENTS_PER_UNIT).quantize(Decimal(1), rounding=ROUND_HALF_EVEN)
+    return int(cents)
+
+
+def parse_amount(text):
+    # Amount typed by the user, "1,234.50" or "$12" -> cents. Unlike
+    # to_cents, more than two decimal places is an error, not rounded away.
+    text = str(text).strip().replace(",", "").replace("$", "")
+    try:
+        value = Decimal(text)
+    except InvalidOperation:
+        raise ValueError(f"Invalid amount '{text}'")
+    if not value.is_finite():
+        raise ValueError(f"Invalid amount '{text}'")
+
+    cents = value * CENTS_PER_UNIT
+    if cents != cents.to_integral_value():
+        raise ValueError("Amounts can have at most two decimal places")
+    return int(cents)
+
+
+def format_amount(cents):
+    # 123450 -> "1234.50", the same text DECIMAL(10, 2) used to produce
+    sign = "-" if cents < 0 else ""
+    units, rest = divmod(abs(cents), CENTS_PER_UNIT)
+    return f"{sign}{units}.{rest:02d}"
+
+
+def to_units(cents):
+    # Float for charts and plotting only, never for arithmetic
+    return cents / CENTS_PER_UNIT
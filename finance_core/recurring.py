@@ -0,0 +1,140 @@
+import calendar
+from datetime import date, timedelta
+
+from .balances import to_date
+from .transactions import ValidationError, apply_rollup_deltas, check_years_open, validate_date, validate_transaction
+
+FREQUENCIES = ("daily", "weekly", "monthly", "yearly")
+
+
+# A recurring rule posts a transaction every interval_count periods from
+# start_date until end_date (inclusive, or forever without one). Monthly
+# and yearly occurrences keep the start day of the month, falling back to
+# the last day of shorter months, so a rule started on the 31st posts on
+# the 31st, 28th/29th, 31st, 30th, ...
+#
+# posted_count is how many occurrences have been posted and next_date the
+# date of the next one (NULL once the rule has ended), so finding what is
+# due is one index range on next_date.
+
+def occurrence_date(start, frequency, interval, index):
+    # Date of the index-th occurrence, counted from 0 at start
+    steps = interval * index
+    if frequency == "daily":
+        return start + timedelta(days=steps)
+    if frequency == "weekly":
+        return start + timedelta(weeks=steps)
+    
+    months = steps if frequency == "monthly" else steps * 12
+    month_index = start.month - 1 + months
+    year = start.year + month_index // 12
+    month = month_index % 12 + 1
+    return date(year, month, min(start.day, calendar.monthrange(year, month)[1]))
+
+
+def validate_rule(trans_type, category, amount, start_date, frequency, interval, end_date):
+    validate_transaction(trans_type, category, amount, start_date)
+    
+    if frequency not in FREQUENCIES:
+        raise ValidationError("Frequency must be daily, weekly, monthly or yearly")
+    
+    if not isinstance(interval, int) or interval < 1:
+        raise ValidationError("Interval must be a whole number of at least 1")
+    
+    if end_date:
+        validate_date(end_date, "end date")
+        if to_date(end_date) < to_date(start_date):
+            raise ValidationError("End date must not be before the start date")
+
+
+def add_rule(connection, account_id, trans_type, category, amount, description, start_date, frequency, interval=1, end_date=None):
+    validate_rule(trans_type, category, amount, start_date, frequency, interval, end_date)
+    
+    cursor = connection.cursor()
+    # Catching up must not post into an archived year
+    try:
+        check_years_open(cursor, account_id, range(to_date(start_date).year, date.today().year + 1))
+    except ValidationError:
+        cursor.close()
+        raise
+    cursor.execute("""
+        INSERT INTO recurring_rules
+            (account_id, type, category, amount_cents, description, frequency, interval_count, start_date, end_date, posted_count, next_date)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, 0, %s)
+    """, (account_id, trans_type, category, amount, description, frequency, interval, start_date, end_date or None, start_date))
+    rule_id = cursor.lastrowid
+    connection.commit()
+    cursor.close()
+    return rule_id
+
+
+def remove_rule(connection, account_id, rule_id):
+    # Stops the rule; transactions it already posted are kept
+    cursor = connection.cursor()
+    cursor.execute("DELETE FROM recurring_rules WHERE id = %s AND account_id = %s", (rule_id, account_id))
+    removed = cursor.rowcount
+    connection.commit()
+    cursor.close()
+    return removed
+
+
+def fetch_rules(connection, account_id):
+    # (id, type, category, amount, description, frequency, interval,
+    # start date, end date, next date) for every rule of the account
+    cursor = connection.cursor()
+    cursor.execute("""
+        SELECT id, type, category, amount_cents, description, frequency, interval_count, start_date, end_date, next_date
+        FROM recurring_rules
+        WHERE account_id = %s
+        ORDER BY id
+    """, (account_id,))
+    rules = cursor.fetchall()
+    cursor.close()
+    return rules
+
+
+def post_due_occurrences(connection, account_id, today=None):
+    # Posts every occurrence due up to today, for all rules of the account, as one batched
+    # insert with one rollup update in one transaction, however many
+    # periods were missed. The due rules are locked first, so concurrent
+    # runs queue up and the later ones find nothing due; the unique
+    # (rule_id, occurrence_date) key rejects a double post should one ever
+    # slip through. Returns the number of transactions posted.
+    today = to_date(today) if today else date.today()
+    
+    cursor = connection.cursor()
+    cursor.execute("""
+        SELECT id, type, category, amount_cents, description, frequency, interval_count, start_date, end_date, posted_count
+        FROM recurring_rules
+        WHERE account_id = %s AND next_date <= %s
+        FOR UPDATE
+    """, (account_id, today))
+    rules = cursor.fetchall()
+    
+    rows = []
+    deltas = {}
+    advanced = []
+    for rule_id, trans_type, category, amount, description, frequency, interval, start, end, index in rules:
+        last = min(today, end) if end else today
+        day = occurrence_date(start, frequency, interval, index)
+        while day <= last:
+            rows.append((account_id, trans_type, category, amount, description, day, rule_id, day))
+            totals = deltas.setdefault((day, trans_type, category), [0, 0])
+            totals[0] += amount
+            totals[1] += 1
+            index += 1
+            day = occurrence_date(start, frequency, interval, index)
+        advanced.append((index, None if end and day > end else day, rule_id))
+    
+    if rows:
+        cursor.executemany("""
+            INSERT INTO transactions (account_id, type, category, amount_cents, description, date, rule_id, occurrence_date)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        """, rows)
+        apply_rollup_deltas(cursor, account_id, deltas)
+    if advanced:
+        cursor.executemany("UPDATE recurring_rules SET posted_count = %s, next_date = %s WHERE id = %s", advanced)
+    
+    connection.commit()
+    cursor.close()
+    return len(rows)
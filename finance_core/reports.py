@@ -0,0 +1,90 @@
+from .dialects import dialect_of
+from .schema import fill_checkpoints, fill_rollup, fill_spending
+
+
+class Aggregate:
+    # Totals in cents for a set of transactions, with per-month and
+    # per-category breakdowns, folded from a single grouped query
+    def __init__(self):
+        self.income = 0
+        self.expense = 0
+        self.count = 0
+        self.by_month = {}  # "YYYY-MM" -> {"income", "expense", "count"}
+        self.by_category = {}  # (type, category) -> {"total", "count"}
+    
+    @property
+    def balance(self):
+        return self.income - self.expense
+    
+    def add(self, month, trans_type, category, total, count):
+        if trans_type == "income":
+            self.income += total
+        else:
+            self.expense += total
+        self.count += count
+        
+        month_totals = self.by_month.setdefault(month, {"income": 0, "expense": 0, "count": 0})
+        month_totals[trans_type] += total
+        month_totals["count"] += count
+        
+        category_totals = self.by_category.setdefault((trans_type, category), {"total": 0, "count": 0})
+        category_totals["total"] += total
+        category_totals["count"] += count
+    
+    def categories(self, trans_type):
+        # [(category, total)] for one type, largest first
+        totals = [
+            (category, values["total"])
+            for (category_type, category), values in self.by_category.items()
+            if category_type == trans_type
+        ]
+        totals.sort(key=lambda item: item[1], reverse=True)
+        return totals
+
+
+def aggregate_transactions(connection, account_id, date_from=None, date_to=None, trans_type=None):
+    # One pass over the daily rollup: every (month, type, category) group
+    # comes back once and is folded into the overall totals and both
+    # breakdowns, so the cost follows the number of days and categories
+    # rather than the number of transactions
+    query = f"""
+        SELECT {dialect_of(connection).year_month("day")} AS month, type, category, SUM(total_cents), SUM(count)
+        FROM transaction_rollup
+    """
+    conditions = ["account_id = %s"]
+    params = [account_id]
+    if trans_type:
+        conditions.append("type = %s")
+        params.append(trans_type)
+    if date_from:
+        conditions.append("day >= %s")
+        params.append(date_from)
+    if date_to:
+        conditions.append("day <= %s")
+        params.append(date_to)
+    
+    query += " WHERE " + " AND ".join(conditions)
+    query += " GROUP BY month, type, category"
+    
+    cursor = connection.cursor()
+    cursor.execute(query, params)
+    
+    aggregate = Aggregate()
+    for year_month, row_type, category, total, count in cursor.fetchall():
+        month = f"{year_month // 100:04d}-{year_month % 100:02d}"
+        aggregate.add(month, row_type, category, int(total), int(count))
+    
+    cursor.close()
+    return aggregate
+
+
+def rebuild_rollup(connection):
+    # Recomputes the rollup, the balance checkpoints and the spending
+    # counters of every account from the raw rows in case they ever drift
+    dialect = dialect_of(connection)
+    cursor = connection.cursor()
+    fill_rollup(cursor)
+    fill_checkpoints(cursor, dialect)
+    fill_spending(cursor, dialect)
+    connection.commit()
+    cursor.close()
@@ -0,0 +1,572 @@
+from datetime import datetime
+
+from .balances import month_range, next_month, to_date
+from .config import DEFAULT_ACCOUNT, load_db_config
+from . import db
+from .dialects import dialect_of
+from .transactions import ValidationError
+
+# Categories every new account starts with. A name can be used once per
+# type, so 'Other' exists for income and for expenses.
+DEFAULT_CATEGORIES = [
+    ('Salary', 'income'),
+    ('Freelance', 'income'),
+    ('Investments', 'income'),
+    ('Gifts', 'income'),
+    ('Food', 'expense'),
+    ('Transport', 'expense'),
+    ('Housing', 'expense'),
+    ('Utilities', 'expense'),
+    ('Entertainment', 'expense'),
+    ('Healthcare', 'expense'),
+    ('Education', 'expense'),
+    ('Shopping', 'expense'),
+    ('Other', 'income'),
+    ('Other', 'expense')
+]
+# Id of DEFAULT_ACCOUNT, which existing rows are moved into
+DEFAULT_ACCOUNT_ID = 1
+
+
+# Each step gets a cursor and the backend's dialect
+
+def create_base_tables(cursor, dialect):
+    # Create transactions table
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS transactions (
+            id {dialect.auto_increment_key},
+            type VARCHAR(10) NOT NULL,
+            category VARCHAR(50) NOT NULL,
+            amount DECIMAL(10, 2) NOT NULL,
+            description VARCHAR(255),
+            date DATE NOT NULL
+        )
+    """)
+    
+    # Create categories table
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS categories (
+            id {dialect.auto_increment_key},
+            name VARCHAR(50) NOT NULL UNIQUE,
+            type VARCHAR(10) NOT NULL
+        )
+    """)
+    
+    # Insert default categories if they don't exist
+    for category in DEFAULT_CATEGORIES:
+        try:
+            cursor.execute("INSERT INTO categories (name, type) VALUES (%s, %s)", category)
+        except db.IntegrityError:
+            # Category already exists
+            pass
+
+
+def add_transaction_indexes(cursor, dialect):
+    # Keyset paging and the date-ordered export walk (date, id)
+    cursor.execute("CREATE INDEX idx_transactions_date_id ON transactions (date, id)")
+    # Covers the type/date filtered reports and the per-category grouping
+    cursor.execute("CREATE INDEX idx_transactions_type_date ON transactions (type, date, category, amount)")
+
+
+def create_rollup_table(cursor, dialect):
+    # Per-day totals, kept in step with transactions by every write so the
+    # reports never have to scan the raw rows
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS transaction_rollup (
+            day DATE NOT NULL,
+            type VARCHAR(10) NOT NULL,
+            category VARCHAR(50) NOT NULL,
+            total DECIMAL(15, 2) NOT NULL,
+            count INT NOT NULL,
+            PRIMARY KEY (day, type, category)
+        )
+    """)
+    # Filled as the tables stood at this step, in DECIMAL amounts
+    cursor.execute("DELETE FROM transaction_rollup")
+    cursor.execute("""
+        INSERT INTO transaction_rollup (day, type, category, total, count)
+        SELECT date, type, category, SUM(amount), COUNT(*)
+        FROM transactions
+        GROUP BY date, type, category
+    """)
+
+
+def fill_rollup(cursor):
+    # From the live and the archived rows: the rollup keeps summarising
+    # archived years, which is what lets reports span them
+    cursor.execute("DELETE FROM transaction_rollup")
+    cursor.execute("""
+        INSERT INTO transaction_rollup (account_id, day, type, category, total_cents, count)
+        SELECT account_id, date, type, category, SUM(amount_cents), COUNT(*)
+        FROM (
+            SELECT account_id, date, type, category, amount_cents FROM transactions
+            UNION ALL
+            SELECT account_id, date, type, category, amount_cents FROM transactions_archive
+        ) AS all_rows
+        GROUP BY account_id, date, type, category
+    """)
+
+
+def create_checkpoint_table(cursor, dialect):
+    # Opening balance of each month, see balances.py
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS balance_checkpoints (
+            month DATE PRIMARY KEY,
+            balance DECIMAL(15, 2) NOT NULL
+        )
+    """)
+    # Filled as the tables stood at this step, in DECIMAL amounts
+    cursor.execute("DELETE FROM balance_checkpoints")
+    cursor.execute(f"""
+        INSERT INTO balance_checkpoints (month, balance)
+        SELECT month, COALESCE(SUM(net) OVER (ORDER BY month ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING), 0)
+        FROM (
+            SELECT {dialect.bucket_start("monthly", "day")} AS month,
+                   SUM(CASE WHEN type = 'income' THEN total ELSE -total END) AS net
+            FROM transaction_rollup
+            GROUP BY month
+        ) AS monthly
+    """)
+
+
+def fill_checkpoints(cursor, dialect):
+    # Balance before every month of each account, from the rollup, for
+    # the same months the writes keep checkpoints for (see balances.py):
+    # from its first month with transactions or a checkpoint to its last,
+    # empty months included
+    cursor.execute(f"""
+        SELECT account_id, {dialect.bucket_start("monthly", "day")} AS month,
+               SUM(CASE WHEN type = 'income' THEN total_cents ELSE -total_cents END)
+        FROM transaction_rollup
+        GROUP BY account_id, month
+    """)
+    nets = {}
+    bounds = {}
+    for account_id, month, net in cursor.fetchall():
+        month = to_date(month)
+        nets[(account_id, month)] = int(net)
+        first, last = bounds.get(account_id, (month, month))
+        bounds[account_id] = (min(first, month), max(last, month))
+    
+    cursor.execute("SELECT account_id, MIN(month), MAX(month) FROM balance_checkpoints GROUP BY account_id")
+    for account_id, first, last in cursor.fetchall():
+        first, last = to_date(first), to_date(last)
+        if account_id in bounds:
+            first, last = min(first, bounds[account_id][0]), max(last, bounds[account_id][1])
+        bounds[account_id] = (first, last)
+    
+    checkpoints = []
+    for account_id, (first, last) in bounds.items():
+        balance = 0
+        for month in month_range(first, next_month(last)):
+            checkpoints.append((account_id, month, balance))
+            balance += nets.get((account_id, month), 0)
+    
+    cursor.execute("DELETE FROM balance_checkpoints")
+    cursor.executemany(
+        "INSERT INTO balance_checkpoints (account_id, month, balance_cents) VALUES (%s, %s, %s)",
+        checkpoints
+    )
+
+
+def fill_spending(cursor, dialect):
+    # Expense total per (account, month, category), from the rollup
+    cursor.execute("DELETE FROM monthly_spending")
+    cursor.execute(f"""
+        INSERT INTO monthly_spending (account_id, month, category, spent_cents)
+        SELECT account_id, {dialect.bucket_start("monthly", "day")} AS month, category, SUM(total_cents)
+        FROM transaction_rollup
+        WHERE type = 'expense'
+        GROUP BY account_id, month, category
+    """)
+
+
+def add_search_index(cursor, dialect):
+    # Search box over description and category: a FULLTEXT ngram index on
+    # MySQL, an FTS5 trigram table on SQLite; both match partial words
+    dialect.create_search_index(cursor)
+
+
+def store_money_in_cents(cursor, dialect):
+    # Amounts and totals become BIGINT cents: exact integer sums on every
+    # backend, and no DECIMAL(10, 2) ceiling at 99,999,999.99
+    cursor.execute("ALTER TABLE transactions ADD COLUMN amount_cents BIGINT NOT NULL DEFAULT 0")
+    cursor.execute("UPDATE transactions SET amount_cents = ROUND(amount * 100)")
+    dialect.drop_index(cursor, "transactions", "idx_transactions_type_date")
+    cursor.execute("ALTER TABLE transactions DROP COLUMN amount")
+    cursor.execute("CREATE INDEX idx_transactions_type_date ON transactions (type, date, category, amount_cents)")
+    
+    # The rollup and the checkpoints are derived from the rows, so they are
+    # switched over empty and refilled
+    cursor.execute("DELETE FROM balance_checkpoints")
+    cursor.execute("ALTER TABLE balance_checkpoints ADD COLUMN balance_cents BIGINT NOT NULL DEFAULT 0")
+    cursor.execute("ALTER TABLE balance_checkpoints DROP COLUMN balance")
+    cursor.execute("DELETE FROM transaction_rollup")
+    cursor.execute("ALTER TABLE transaction_rollup ADD COLUMN total_cents BIGINT NOT NULL DEFAULT 0")
+    cursor.execute("ALTER TABLE transaction_rollup DROP COLUMN total")
+    # Filled as the tables stood at this step, before accounts
+    cursor.execute("""
+        INSERT INTO transaction_rollup (day, type, category, total_cents, count)
+        SELECT date, type, category, SUM(amount_cents), COUNT(*)
+        FROM transactions
+        GROUP BY date, type, category
+    """)
+    cursor.execute(f"""
+        INSERT INTO balance_checkpoints (month, balance_cents)
+        SELECT month, COALESCE(SUM(net) OVER (ORDER BY month ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING), 0)
+        FROM (
+            SELECT {dialect.bucket_start("monthly", "day")} AS month,
+                   SUM(CASE WHEN type = 'income' THEN total_cents ELSE -total_cents END) AS net
+            FROM transaction_rollup
+            GROUP BY month
+        ) AS monthly
+    """)
+
+
+def create_recurring_rules(cursor, dialect):
+    # Recurring transactions, see recurring.py. Posted occurrences carry
+    # their rule and scheduled date; the unique key makes posting
+    # idempotent, and rows entered by hand leave both NULL.
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS recurring_rules (
+            id {dialect.auto_increment_key},
+            type VARCHAR(10) NOT NULL,
+            category VARCHAR(50) NOT NULL,
+            amount_cents BIGINT NOT NULL,
+            description VARCHAR(255),
+            frequency VARCHAR(10) NOT NULL,
+            interval_count INT NOT NULL,
+            start_date DATE NOT NULL,
+            end_date DATE,
+            posted_count INT NOT NULL,
+            next_date DATE
+        )
+    """)
+    cursor.execute("CREATE INDEX idx_recurring_rules_next_date ON recurring_rules (next_date)")
+    cursor.execute("ALTER TABLE transactions ADD COLUMN rule_id INT")
+    cursor.execute("ALTER TABLE transactions ADD COLUMN occurrence_date DATE")
+    cursor.execute("CREATE UNIQUE INDEX idx_transactions_rule_occurrence ON transactions (rule_id, occurrence_date)")
+
+
+def create_budget_tables(cursor, dialect):
+    # Monthly budget per expense category and the spending counter they
+    # are checked against, see spending.py and budgets.py
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS budgets (
+            category VARCHAR(50) PRIMARY KEY,
+            amount_cents BIGINT NOT NULL
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS monthly_spending (
+            month DATE NOT NULL,
+            category VARCHAR(50) NOT NULL,
+            spent_cents BIGINT NOT NULL,
+            PRIMARY KEY (month, category)
+        )
+    """)
+    # Filled as the tables stood at this step, before accounts
+    cursor.execute(f"""
+        INSERT INTO monthly_spending (month, category, spent_cents)
+        SELECT {dialect.bucket_start("monthly", "day")} AS month, category, SUM(total_cents)
+        FROM transaction_rollup
+        WHERE type = 'expense'
+        GROUP BY month, category
+    """)
+
+
+def scope_by_account(cursor, dialect):
+    # Users and accounts (ledgers). Every ledger table gains an account_id
+    # that leads its indexes and primary keys, so one account's queries
+    # only ever touch that account's range of each index, however large
+    # the other accounts grow. The existing rows become the default
+    # account.
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS users (
+            id {dialect.auto_increment_key},
+            name VARCHAR(50) NOT NULL UNIQUE
+        )
+    """)
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS accounts (
+            id {dialect.auto_increment_key},
+            name VARCHAR(50) NOT NULL UNIQUE
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS account_members (
+            account_id INT NOT NULL,
+            user_id INT NOT NULL,
+            PRIMARY KEY (account_id, user_id)
+        )
+    """)
+    cursor.execute("CREATE INDEX idx_account_members_user ON account_members (user_id)")
+    cursor.execute("INSERT INTO accounts (id, name) VALUES (%s, %s)", (DEFAULT_ACCOUNT_ID, DEFAULT_ACCOUNT))
+    
+    cursor.execute(f"ALTER TABLE transactions ADD COLUMN account_id INT NOT NULL DEFAULT {DEFAULT_ACCOUNT_ID}")
+    dialect.drop_index(cursor, "transactions", "idx_transactions_date_id")
+    dialect.drop_index(cursor, "transactions", "idx_transactions_type_date")
+    cursor.execute("CREATE INDEX idx_transactions_account_date_id ON transactions (account_id, date, id)")
+    cursor.execute("CREATE INDEX idx_transactions_account_type_date ON transactions (account_id, type, date, category, amount_cents)")
+    # Incremental loads of the analytics snapshot walk one account by id
+    cursor.execute("CREATE INDEX idx_transactions_account_id ON transactions (account_id, id)")
+    
+    cursor.execute(f"ALTER TABLE recurring_rules ADD COLUMN account_id INT NOT NULL DEFAULT {DEFAULT_ACCOUNT_ID}")
+    dialect.drop_index(cursor, "recurring_rules", "idx_recurring_rules_next_date")
+    cursor.execute("CREATE INDEX idx_recurring_rules_account_next_date ON recurring_rules (account_id, next_date)")
+    
+    # Category names were unique across both types, which left the default
+    # expense category 'Other' out; they are now unique per account and
+    # type. Neither backend can change a key in place the same way, so the
+    # tables with a new key are copied.
+    cursor.execute(f"""
+        CREATE TABLE account_categories (
+            id {dialect.auto_increment_key},
+            account_id INT NOT NULL,
+            name VARCHAR(50) NOT NULL,
+            type VARCHAR(10) NOT NULL,
+            UNIQUE (account_id, type, name)
+        )
+    """)
+    cursor.execute("""
+        INSERT INTO account_categories (id, account_id, name, type)
+        SELECT id, %s, name, type FROM categories
+    """, (DEFAULT_ACCOUNT_ID,))
+    cursor.execute("DROP TABLE categories")
+    cursor.execute("ALTER TABLE account_categories RENAME TO categories")
+    cursor.executemany(
+        "INSERT IGNORE INTO categories (account_id, name, type) VALUES (%s, %s, %s)",
+        [(DEFAULT_ACCOUNT_ID, name, trans_type) for name, trans_type in DEFAULT_CATEGORIES]
+    )
+    
+    cursor.execute("""
+        CREATE TABLE account_budgets (
+            account_id INT NOT NULL,
+            category VARCHAR(50) NOT NULL,
+            amount_cents BIGINT NOT NULL,
+            PRIMARY KEY (account_id, category)
+        )
+    """)
+    cursor.execute("""
+        INSERT INTO account_budgets (account_id, category, amount_cents)
+        SELECT %s, category, amount_cents FROM budgets
+    """, (DEFAULT_ACCOUNT_ID,))
+    cursor.execute("DROP TABLE budgets")
+    cursor.execute("ALTER TABLE account_budgets RENAME TO budgets")
+    
+    # The derived tables are recreated empty and refilled
+    cursor.execute("DROP TABLE transaction_rollup")
+    cursor.execute("""
+        CREATE TABLE transaction_rollup (
+            account_id INT NOT NULL,
+            day DATE NOT NULL,
+            type VARCHAR(10) NOT NULL,
+            category VARCHAR(50) NOT NULL,
+            total_cents BIGINT NOT NULL,
+            count INT NOT NULL,
+            PRIMARY KEY (account_id, day, type, category)
+        )
+    """)
+    cursor.execute("DROP TABLE balance_checkpoints")
+    cursor.execute("""
+        CREATE TABLE balance_checkpoints (
+            account_id INT NOT NULL,
+            month DATE NOT NULL,
+            balance_cents BIGINT NOT NULL,
+            PRIMARY KEY (account_id, month)
+        )
+    """)
+    cursor.execute("DROP TABLE monthly_spending")
+    cursor.execute("""
+        CREATE TABLE monthly_spending (
+            account_id INT NOT NULL,
+            month DATE NOT NULL,
+            category VARCHAR(50) NOT NULL,
+            spent_cents BIGINT NOT NULL,
+            PRIMARY KEY (account_id, month, category)
+        )
+    """)
+    # Filled as the tables stood at this step, before the archive
+    cursor.execute("""
+        INSERT INTO transaction_rollup (account_id, day, type, category, total_cents, count)
+        SELECT account_id, date, type, category, SUM(amount_cents), COUNT(*)
+        FROM transactions
+        GROUP BY account_id, date, type, category
+    """)
+    cursor.execute(f"""
+        INSERT INTO balance_checkpoints (account_id, month, balance_cents)
+        SELECT account_id, month, COALESCE(SUM(net) OVER (
+            PARTITION BY account_id ORDER BY month ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING
+        ), 0)
+        FROM (
+            SELECT account_id, {dialect.bucket_start("monthly", "day")} AS month,
+                   SUM(CASE WHEN type = 'income' THEN total_cents ELSE -total_cents END) AS net
+            FROM transaction_rollup
+            GROUP BY account_id, month
+        ) AS monthly
+    """)
+    cursor.execute(f"""
+        INSERT INTO monthly_spending (account_id, month, category, spent_cents)
+        SELECT account_id, {dialect.bucket_start("monthly", "day")} AS month, category, SUM(total_cents)
+        FROM transaction_rollup
+        WHERE type = 'expense'
+        GROUP BY account_id, month, category
+    """)
+
+
+def create_archive_tables(cursor, dialect):
+    # Closed years moved out of transactions, see archive.py. The archive
+    # is keyed for moving a whole year of one account in or out, and has
+    # no other index. archived_years keeps one summary row per archived
+    # year.
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS transactions_archive (
+            id INT NOT NULL,
+            account_id INT NOT NULL,
+            type VARCHAR(10) NOT NULL,
+            category VARCHAR(50) NOT NULL,
+            amount_cents BIGINT NOT NULL,
+            description VARCHAR(255),
+            date DATE NOT NULL,
+            rule_id INT,
+            occurrence_date DATE,
+            PRIMARY KEY (account_id, date, id)
+        ) {dialect.compressed_table_options}
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS archived_years (
+            account_id INT NOT NULL,
+            year INT NOT NULL,
+            count INT NOT NULL,
+            income_cents BIGINT NOT NULL,
+            expense_cents BIGINT NOT NULL,
+            archived_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (account_id, year)
+        )
+    """)
+
+
+def fill_checkpoint_gaps(cursor, dialect):
+    # Checkpoints used to exist only for months that had transactions;
+    # every month between an account's first and last checkpoint now has
+    # one, see balances.py. A missing month lies in a run of empty months,
+    # so it carries the balance of the next checkpoint.
+    cursor.execute("SELECT account_id, month, balance_cents FROM balance_checkpoints ORDER BY account_id, month DESC")
+    gaps = []
+    following = None
+    for account_id, month, balance in cursor.fetchall():
+        month = to_date(month)
+        if following is not None and following[0] == account_id:
+            gaps.extend((account_id, gap, following[2]) for gap in month_range(next_month(month), following[1]))
+        following = (account_id, month, balance)
+    
+    if gaps:
+        cursor.executemany(
+            "INSERT INTO balance_checkpoints (account_id, month, balance_cents) VALUES (%s, %s, %s)",
+            gaps
+        )
+
+
+# Schema migrations, applied in order and recorded in schema_version.
+# Databases created before versioning are upgraded in place because the
+# first step only creates what is missing. Append new steps; never edit
+# one that has shipped, so every database at a version ran the same code.
+# Steps that fill derived tables carry their own SQL, written for the
+# tables as they stood at that step, instead of calling the fill_*
+# helpers, which follow the current schema.
+MIGRATIONS = [
+    (1, create_base_tables),
+    (2, add_transaction_indexes),
+    (3, create_rollup_table),
+    (4, create_checkpoint_table),
+    (5, add_search_index),
+    (6, store_money_in_cents),
+    (7, create_recurring_rules),
+    (8, create_budget_tables),
+    (9, scope_by_account),
+    (10, create_archive_tables),
+    (11, fill_checkpoint_gaps)
+]
+
+
+def migrate(connection):
+    dialect = dialect_of(connection)
+    cursor = connection.cursor()
+    
+    # Serialise concurrent upgrades from several app instances
+    dialect.lock_migrations(cursor)
+    
+    try:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INT PRIMARY KEY,
+                applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        cursor.execute("SELECT MAX(version) FROM schema_version")
+        current_version = cursor.fetchone()[0] or 0
+        
+        # DDL commits implicitly in MySQL, so each step is recorded as soon
+        # as it has been applied; SQLite applies all of them in one go
+        for version, step in MIGRATIONS:
+            if version <= current_version:
+                continue
+            step(cursor, dialect)
+            cursor.execute("INSERT INTO schema_version (version) VALUES (%s)", (version,))
+            if not dialect.transactional_ddl:
+                connection.commit()
+        connection.commit()
+    finally:
+        dialect.unlock_migrations(cursor)
+        cursor.close()
+
+
+def partition_transactions(connection, scheme, partitions=8):
+    # Optional, MySQL only: splits the transactions table by account
+    # (scheme "account", KEY partitioning into a fixed number of
+    # partitions) or by year of the date (scheme "year", one RANGE
+    # partition per year so far plus one for later years). Queries that
+    # name the account or a date range then only open the partitions they
+    # need. InnoDB does not support FULLTEXT on partitioned tables, so the
+    # search index is dropped and search falls back to LIKE; every unique
+    # key must also contain the partitioning column.
+    dialect = dialect_of(connection)
+    if not dialect.supports_partitioning:
+        raise ValidationError(f"Partitioning needs the MySQL backend, not {dialect.name}")
+    if scheme not in ("account", "year"):
+        raise ValidationError("Partition by account or by year")
+    
+    cursor = connection.cursor()
+    if scheme == "account":
+        if partitions < 1:
+            raise ValidationError("Use at least one partition")
+        column = "account_id"
+        clause = f"PARTITION BY KEY (account_id) PARTITIONS {int(partitions)}"
+    else:
+        column = "date"
+        cursor.execute("SELECT MIN(YEAR(date)), MAX(YEAR(date)) FROM transactions")
+        first, last = cursor.fetchone()
+        this_year = datetime.now().year
+        years = range(first or this_year, max(last or this_year, this_year) + 1)
+        ranges = [f"PARTITION p{year} VALUES LESS THAN ('{year + 1}-01-01')" for year in years]
+        ranges.append("PARTITION p_later VALUES LESS THAN (MAXVALUE)")
+        clause = "PARTITION BY RANGE COLUMNS (date) (" + ", ".join(ranges) + ")"
+    
+    if dialect.has_search_index(cursor):
+        dialect.drop_index(cursor, "transactions", "ft_transactions_text")
+    cursor.execute(f"ALTER TABLE transactions DROP PRIMARY KEY, ADD PRIMARY KEY (id, {column})")
+    dialect.drop_index(cursor, "transactions", "idx_transactions_rule_occurrence")
+    cursor.execute(f"CREATE UNIQUE INDEX idx_transactions_rule_occurrence ON transactions (rule_id, occurrence_date, {column})")
+    cursor.execute(f"ALTER TABLE transactions {clause}")
+    cursor.close()
+
+
+def open_database(config=None):
+    # Connection manager for a created and fully migrated database
+    connections = db.create_connection_manager(config or load_db_config())
+    connections.ensure_database()
+    connections.create_pool()
+    with connections.connection() as connection:
+        migrate(connection)
+        connections.detect_search_index(connection)
+    return connections
@@ -0,0 +1,24 @@
+from .balances import month_start
+
+
+# monthly_spending holds the expense total of each (account, month,
+# category): the counter budgets are checked against. Every write adjusts it with the
+# same deltas as the rollup, so checking a budget after a write is a
+# primary key lookup instead of a sum over the month.
+
+def apply_spending_deltas(cursor, account_id, deltas):
+    # deltas: {(day, type, category): [cents, count]}, as for the rollup;
+    # income does not count against a budget
+    by_key = {}
+    for (day, trans_type, category), (total, count) in deltas.items():
+        if trans_type == "expense":
+            key = (account_id, month_start(day), category)
+            by_key[key] = by_key.get(key, 0) + total
+    
+    changes = [key + (total,) for key, total in by_key.items() if total]
+    if changes:
+        cursor.executemany("""
+            INSERT INTO monthly_spending (account_id, month, category, spent_cents)
+            VALUES (%s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE spent_cents = spent_cents + VALUES(spent_cents)
+        """, changes)
@@ -0,0 +1,172 @@
+import os
+import re
+import sqlite3
+import threading
+from datetime import date
+from functools import lru_cache
+
+from .config import CONFIG_DIR
+from .db import ConnectionManager
+from .dialects import SQLiteDialect
+from .instrumentation import InstrumentedConnection
+
+# Seconds a connection waits for another writer before "database is locked"
+SQLITE_BUSY_TIMEOUT = 10.0
+
+# DATE columns come back as dates, like mysql.connector returns them; they
+# are stored as ISO text so they sort and compare as dates. Money is
+# integer cents, which SQLite sums exactly as it is.
+sqlite3.register_adapter(date, date.isoformat)
+sqlite3.register_converter("DATE", lambda value: date.fromisoformat(value.decode()))
+
+UPSERT_VALUES_PATTERN = re.compile(r"VALUES\((\w+)\)")
+FOR_UPDATE_PATTERN = re.compile(r"\s+FOR\s+UPDATE\b", re.IGNORECASE)
+
+
+@lru_cache(maxsize=512)
+def translate(statement):
+    # Mechanical MySQL to SQLite rewrites: placeholders, INSERT IGNORE and
+    # the increment upserts. Returns (statement, locking) where locking
+    # means the MySQL statement had FOR UPDATE.
+    statement = statement.replace("%s", "?")
+    statement = statement.replace("INSERT IGNORE", "INSERT OR IGNORE")
+    if "ON DUPLICATE KEY UPDATE" in statement:
+        head, tail = statement.split("ON DUPLICATE KEY UPDATE", 1)
+        statement = head + "ON CONFLICT DO UPDATE SET" + UPSERT_VALUES_PATTERN.sub(r"excluded.\1", tail)
+    locking = FOR_UPDATE_PATTERN.search(statement) is not None
+    if locking:
+        statement = FOR_UPDATE_PATTERN.sub("", statement)
+    return statement, locking
+
+
+class SQLiteCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.cursor = connection.connection.cursor()
+    
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+    
+    def __iter__(self):
+        return iter(self.cursor)
+    
+    def execute(self, statement, params=()):
+        statement, locking = translate(statement)
+        if locking and not self.connection.connection.in_transaction:
+            # SELECT ... FOR UPDATE: take the write lock before reading
+            self.cursor.execute("BEGIN IMMEDIATE")
+        return self.cursor.execute(statement, params or ())
+    
+    def executemany(self, statement, seq_params):
+        statement, locking = translate(statement)
+        return self.cursor.executemany(statement, seq_params)
+
+
+class SQLiteConnection:
+    # The parts of the mysql.connector connection API finance_core uses
+    def __init__(self, connection, dialect):
+        self.connection = connection
+        self.dialect = dialect
+        self.closed = False
+    
+    def cursor(self, *args, **kwargs):
+        # buffered= and friends make no difference to SQLite
+        return SQLiteCursor(self)
+    
+    def commit(self):
+        self.connection.commit()
+    
+    def rollback(self):
+        self.connection.rollback()
+    
+    def interrupt(self):
+        self.connection.interrupt()
+    
+    def disconnect(self):
+        # Used to abandon a half-read result; the pool drops the connection
+        self.closed = True
+        self.connection.close()
+    
+    def get_server_info(self):
+        return f"SQLite {sqlite3.sqlite_version}"
+
+
+class SQLiteConnectionManager(ConnectionManager):
+    # ConnectionManager for a database file instead of a server.
+    # WAL mode lets the query workers read while another connection writes.
+    # Idle connections are kept for reuse, up to pool_size of them.
+    def __init__(self, config, metrics=None):
+        self.config = config
+        self.metrics = metrics
+        self.path = config["path"] or os.path.join(CONFIG_DIR, config["database"] + ".db")
+        self.dialect = SQLiteDialect(fts=self.has_fts5())
+        self.idle = []
+        self.lock = threading.Lock()
+    
+    @staticmethod
+    def has_fts5():
+        connection = sqlite3.connect(":memory:")
+        try:
+            connection.execute("CREATE VIRTUAL TABLE probe USING fts5(text, tokenize='trigram')")
+            return True
+        except sqlite3.OperationalError:
+            return False
+        finally:
+            connection.close()
+    
+    def ensure_database(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+    
+    def drop_database(self):
+        with self.lock:
+            for connection in self.idle:
+                connection.connection.close()
+            self.idle = []
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(self.path + suffix):
+                os.remove(self.path + suffix)
+    
+    def create_pool(self):
+        # WAL is a property of the file; set it once up front
+        connection = self.connect()
+        connection.connection.execute("PRAGMA journal_mode=WAL")
+        self.release(connection)
+    
+    def connect(self):
+        connection = sqlite3.connect(
+            self.path,
+            timeout=SQLITE_BUSY_TIMEOUT,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            check_same_thread=False
+        )
+        connection.execute("PRAGMA synchronous=NORMAL")  # Durable enough with WAL
+        return SQLiteConnection(connection, self.dialect)
+    
+    def get_connection(self):
+        with self.lock:
+            connection = self.idle.pop() if self.idle else None
+        if connection is None:
+            connection = self.connect()
+        if self.metrics is not None:
+            return InstrumentedConnection(connection, self.metrics)
+        return connection
+    
+    def release(self, connection):
+        if isinstance(connection, InstrumentedConnection):
+            connection = connection.connection
+        if connection.closed:
+            return
+        connection.rollback()
+        with self.lock:
+            if len(self.idle) < self.config["pool_size"]:
+                self.idle.append(connection)
+                return
+        connection.connection.close()
+    
+    def interrupt(self, connection):
+        connection.interrupt()
+    
+    def detect_search_index(self, connection):
+        # FTS5 support was already probed, and nothing drops the FTS table
+        pass
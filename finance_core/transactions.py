@@ -0,0 +1,407 @@
+from datetime import datetime
+
+from .balances import apply_balance_deltas, to_date
+from .config import TRANSACTION_TYPES
+from .dialects import MYSQL
+from .money import MAX_AMOUNT_CENTS, format_amount
+from .spending import apply_spending_deltas
+
+# Rows per keyset page when listing transactions
+DEFAULT_PAGE_SIZE = 200
+# Shortest search term the FULLTEXT index can match (ngram_token_size)
+MIN_SEARCH_TERM_LENGTH = 2
+
+
+class ValidationError(ValueError):
+    pass
+
+
+def validate_date(value, label="date"):
+    try:
+        datetime.strptime(value, '%Y-%m-%d')
+    except (TypeError, ValueError):
+        raise ValidationError(f"Invalid {label} format. Use YYYY-MM-DD")
+
+
+def validate_transaction(trans_type, category, amount, date):
+    # amount in cents, see money.parse_amount
+    if trans_type not in TRANSACTION_TYPES:
+        raise ValidationError("Transaction type must be income or expense")
+    
+    if not category:
+        raise ValidationError("Please select a category")
+    
+    if not isinstance(amount, int) or isinstance(amount, bool):
+        raise ValidationError("Amount must be a whole number of cents")
+    
+    if amount <= 0:
+        raise ValidationError("Amount must be positive")
+    
+    if amount > MAX_AMOUNT_CENTS:
+        raise ValidationError(f"Amount must not exceed {format_amount(MAX_AMOUNT_CENTS)}")
+    
+    validate_date(date)
+
+
+def search_words(search):
+    # Every word must match. Full-text operators typed by the user are
+    # treated as spaces.
+    words = "".join(" " if char in '+-<>()~*"@' else char for char in search).split()
+    if any(len(word) < MIN_SEARCH_TERM_LENGTH for word in words):
+        raise ValidationError(f"Search terms need at least {MIN_SEARCH_TERM_LENGTH} characters")
+    return words
+
+
+def build_transaction_filter(account_id, trans_type=None, date_from=None, date_to=None, search=None, dialect=MYSQL):
+    # (conditions, params) shared by listing, paging and export. The account
+    # comes first, so every query built from a filter stays inside one
+    # account and runs on the indexes that lead with account_id.
+    conditions = ["account_id = %s"]
+    params = [account_id]
+    
+    if search and search.strip():
+        words = search_words(search)
+        if words:
+            # Answered from the backend's full-text index instead of a LIKE scan
+            search_conditions, search_params = dialect.search_condition(words)
+            conditions.extend(search_conditions)
+            params.extend(search_params)
+    
+    if trans_type and trans_type != "all":
+        conditions.append("type = %s")
+        params.append(trans_type)
+    
+    if date_from:
+        validate_date(date_from, "'From' date")
+        conditions.append("date >= %s")
+        params.append(date_from)
+    
+    if date_to:
+        validate_date(date_to, "'To' date")
+        conditions.append("date <= %s")
+        params.append(date_to)
+    
+    return conditions, params
+
+
+def fetch_transaction_page(connection, transaction_filter, direction="below", key=None, page_size=DEFAULT_PAGE_SIZE):
+    # Keyset pagination on (date, id): rows are listed newest first, so
+    # "below" means older rows than key and "above" means newer ones. One
+    # extra row is fetched to know whether another page exists.
+    conditions, params = transaction_filter
+    conditions = list(conditions)
+    params = list(params)
+    
+    if key is not None:
+        key_date, key_id = key
+        if direction == "below":
+            conditions.append("(date < %s OR (date = %s AND id < %s))")
+        else:
+            conditions.append("(date > %s OR (date = %s AND id > %s))")
+        params.extend([key_date, key_date, key_id])
+    
+    query = "SELECT id, type, category, amount_cents, description, date FROM transactions"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    
+    if direction == "below":
+        query += " ORDER BY date DESC, id DESC"
+    else:
+        query += " ORDER BY date ASC, id ASC"
+    query += " LIMIT %s"
+    params.append(page_size + 1)
+    
+    cursor = connection.cursor()
+    cursor.execute(query, params)
+    rows = cursor.fetchall()
+    cursor.close()
+    
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if direction == "above":
+        rows.reverse()
+    return rows, has_more
+
+
+def fetch_transaction(connection, trans_id, transaction_filter):
+    # The row with trans_id, or None if it does not exist or does not match
+    # the filter (and so its account)
+    conditions, params = transaction_filter
+    query = "SELECT id, type, category, amount_cents, description, date FROM transactions"
+    query += " WHERE " + " AND ".join(["id = %s"] + list(conditions))
+    
+    cursor = connection.cursor()
+    cursor.execute(query, [trans_id] + list(params))
+    row = cursor.fetchone()
+    cursor.close()
+    return row
+
+
+def iter_transactions(connection, transaction_filter, limit=None, page_size=DEFAULT_PAGE_SIZE):
+    # All matching rows, newest first, one keyset page at a time
+    key = None
+    returned = 0
+    while True:
+        rows, has_more = fetch_transaction_page(connection, transaction_filter, "below", key, page_size)
+        for row in rows:
+            if limit is not None and returned >= limit:
+                return
+            yield row
+            returned += 1
+        if not has_more:
+            return
+        key = (rows[-1][5], rows[-1][0])
+
+
+def apply_rollup_deltas(cursor, account_id, deltas):
+    # deltas: {(day, type, category): [cents, count]} within one account;
+    # negative counts come from bulk edits and deletes, and emptied groups
+    # are removed
+    cursor.executemany("""
+        INSERT INTO transaction_rollup (account_id, day, type, category, total_cents, count)
+        VALUES (%s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE total_cents = total_cents + VALUES(total_cents), count = count + VALUES(count)
+    """, [(account_id,) + key + tuple(values) for key, values in deltas.items()])
+    
+    emptied = [(account_id,) + key for key, (total, count) in deltas.items() if count < 0]
+    if emptied:
+        cursor.executemany("""
+            DELETE FROM transaction_rollup
+            WHERE account_id = %s AND day = %s AND type = %s AND category = %s AND count <= 0
+        """, emptied)
+    
+    balance_deltas = {}
+    for (day, trans_type, category), (total, count) in deltas.items():
+        balance_deltas[day] = balance_deltas.get(day, 0) + (total if trans_type == "income" else -total)
+    apply_balance_deltas(cursor, account_id, balance_deltas)
+    apply_spending_deltas(cursor, account_id, deltas)
+
+
+def apply_rollup_delta(cursor, account_id, day, trans_type, category, total, count):
+    cursor.execute("""
+        INSERT INTO transaction_rollup (account_id, day, type, category, total_cents, count)
+        VALUES (%s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE total_cents = total_cents + VALUES(total_cents), count = count + VALUES(count)
+    """, (account_id, day, trans_type, category, total, count))
+    
+    if count < 0:
+        cursor.execute("""
+            DELETE FROM transaction_rollup
+            WHERE account_id = %s AND day = %s AND type = %s AND category = %s AND count <= 0
+        """, (account_id, day, trans_type, category))
+    
+    apply_balance_deltas(cursor, account_id, {day: total if trans_type == "income" else -total})
+    apply_spending_deltas(cursor, account_id, {(day, trans_type, category): (total, count)})
+
+
+def archived_years(cursor, account_id, years=None):
+    # Sorted years of the account that are archived, among years if given
+    query = "SELECT year FROM archived_years WHERE account_id = %s"
+    params = [account_id]
+    if years is not None:
+        years = sorted(set(years))
+        if not years:
+            return []
+        query += " AND year IN (" + ", ".join(["%s"] * len(years)) + ")"
+        params.extend(years)
+    cursor.execute(query + " ORDER BY year", params)
+    return [row[0] for row in cursor.fetchall()]
+
+
+def check_years_open(cursor, account_id, years):
+    # Archived years are closed: each year's rows are either all in
+    # transactions or all in transactions_archive, see archive.py
+    closed = archived_years(cursor, account_id, years)
+    if closed:
+        raise ValidationError(f"{closed[0]} is archived; restore it before changing its transactions")
+
+
+# Writes go through these helpers so the rollup, the balance checkpoints
+# and the budget spending counters are updated in the same database
+# transaction as the row itself
+
+def insert_transaction(connection, account_id, trans_type, category, amount, description, date):
+    cursor = connection.cursor()
+    try:
+        check_years_open(cursor, account_id, [to_date(date).year])
+    except ValidationError:
+        cursor.close()
+        raise
+    cursor.execute("""
+        INSERT INTO transactions (account_id, type, category, amount_cents, description, date)
+        VALUES (%s, %s, %s, %s, %s, %s)
+    """, (account_id, trans_type, category, amount, description, date))
+    transaction_id = cursor.lastrowid
+    
+    apply_rollup_delta(cursor, account_id, date, trans_type, category, amount, 1)
+    
+    connection.commit()
+    cursor.close()
+    return transaction_id
+
+
+def update_transaction(connection, account_id, trans_id, trans_type, category, amount, description, date):
+    # Rows of other accounts are left alone, as if they did not exist
+    cursor = connection.cursor()
+    try:
+        check_years_open(cursor, account_id, [to_date(date).year])
+    except ValidationError:
+        cursor.close()
+        raise
+    cursor.execute("""
+        SELECT type, category, amount_cents, date FROM transactions
+        WHERE id = %s AND account_id = %s
+        FOR UPDATE
+    """, (trans_id, account_id))
+    old = cursor.fetchone()
+    
+    cursor.execute("""
+        UPDATE transactions 
+        SET type = %s, category = %s, amount_cents = %s, description = %s, date = %s
+        WHERE id = %s AND account_id = %s
+    """, (trans_type, category, amount, description, date, trans_id, account_id))
+    
+    if old is not None:
+        old_type, old_category, old_amount, old_date = old
+        apply_rollup_delta(cursor, account_id, old_date, old_type, old_category, -old_amount, -1)
+        apply_rollup_delta(cursor, account_id, date, trans_type, category, amount, 1)
+    
+    connection.commit()
+    cursor.close()
+
+
+def remove_transaction(connection, account_id, trans_id):
+    cursor = connection.cursor()
+    cursor.execute("""
+        SELECT type, category, amount_cents, date FROM transactions
+        WHERE id = %s AND account_id = %s
+        FOR UPDATE
+    """, (trans_id, account_id))
+    old = cursor.fetchone()
+    
+    cursor.execute("DELETE FROM transactions WHERE id = %s AND account_id = %s", (trans_id, account_id))
+    
+    if old is not None:
+        old_type, old_category, old_amount, old_date = old
+        apply_rollup_delta(cursor, account_id, old_date, old_type, old_category, -old_amount, -1)
+    
+    connection.commit()
+    cursor.close()
+
+
+# Bulk operations act on a list of ids or on every row matching a
+# transaction filter, as one set-based statement in one transaction. The
+# rollup is adjusted from a grouped read of the affected rows.
+
+def bulk_target(account_id, ids=None, transaction_filter=None):
+    # (where clause, params) for the rows a bulk operation applies to: the
+    # ids within the account, or the rows matching a filter built for it
+    if ids is not None:
+        if not ids:
+            raise ValidationError("No transactions selected")
+        return "account_id = %s AND id IN (" + ", ".join(["%s"] * len(ids)) + ")", [account_id] + list(ids)
+    
+    conditions, params = transaction_filter or build_transaction_filter(account_id)
+    return " AND ".join(conditions), list(params)
+
+
+def read_affected_groups(cursor, where, params):
+    # Locks the affected rows and returns their totals per rollup group
+    cursor.execute(f"""
+        SELECT date, type, category, SUM(amount_cents), COUNT(*)
+        FROM transactions
+        WHERE {where}
+        GROUP BY date, type, category
+        FOR UPDATE
+    """, params)
+    return [(day, trans_type, category, int(total), count) for day, trans_type, category, total, count in cursor.fetchall()]
+
+
+def validate_bulk_changes(changes):
+    # changes: {"type", "category", "date"} -> new value; amounts and
+    # descriptions differ per row and stay single-row edits
+    unknown = set(changes) - {"type", "category", "date"}
+    if unknown or not changes:
+        raise ValidationError("Choose a type, category or date to change")
+    if "type" in changes and changes["type"] not in TRANSACTION_TYPES:
+        raise ValidationError("Transaction type must be income or expense")
+    # Categories belong to a type, so the old ones cannot stay
+    if "type" in changes and "category" not in changes:
+        raise ValidationError("Choose a category of the new type as well")
+    if "category" in changes and not changes["category"]:
+        raise ValidationError("Please select a category")
+    if "date" in changes:
+        validate_date(changes["date"])
+
+
+def check_category_types(cursor, account_id, category, types):
+    # The account has category for each of types; a name can exist for
+    # income and for expenses
+    cursor.execute("SELECT type FROM categories WHERE account_id = %s AND name = %s", (account_id, category))
+    missing = set(types) - {row[0] for row in cursor.fetchall()}
+    if missing:
+        raise ValidationError(f"'{category}' is not an {min(missing)} category")
+
+
+def update_transactions(connection, account_id, changes, ids=None, transaction_filter=None):
+    validate_bulk_changes(changes)
+    where, params = bulk_target(account_id, ids, transaction_filter)
+    
+    cursor = connection.cursor()
+    try:
+        if "date" in changes:
+            check_years_open(cursor, account_id, [to_date(changes["date"]).year])
+        groups = read_affected_groups(cursor, where, params)
+        if "category" in changes:
+            # Every changed row has to end up with a category of its type
+            check_category_types(
+                cursor, account_id, changes["category"],
+                {changes.get("type", trans_type) for day, trans_type, category, total, count in groups}
+            )
+    except ValidationError:
+        cursor.close()
+        connection.rollback()
+        raise
+    
+    columns = [column for column in ("type", "category", "date") if column in changes]
+    assignments = ", ".join(f"{column} = %s" for column in columns)
+    cursor.execute(
+        f"UPDATE transactions SET {assignments} WHERE {where}",
+        [changes[column] for column in columns] + params
+    )
+    updated = cursor.rowcount
+    
+    # Each group moves as a whole to its new (date, type, category)
+    new_day = to_date(changes["date"]) if "date" in changes else None
+    deltas = {}
+    for day, trans_type, category, total, count in groups:
+        old_key = (day, trans_type, category)
+        new_key = (new_day or day, changes.get("type", trans_type), changes.get("category", category))
+        for key, sign in ((old_key, -1), (new_key, 1)):
+            delta = deltas.setdefault(key, [0, 0])
+            delta[0] += sign * total
+            delta[1] += sign * count
+    apply_rollup_deltas(cursor, account_id, deltas)
+    
+    connection.commit()
+    cursor.close()
+    return updated
+
+
+def remove_transactions(connection, account_id, ids=None, transaction_filter=None):
+    where, params = bulk_target(account_id, ids, transaction_filter)
+    
+    cursor = connection.cursor()
+    groups = read_affected_groups(cursor, where, params)
+    
+    cursor.execute(f"DELETE FROM transactions WHERE {where}", params)
+    removed = cursor.rowcount
+    
+    apply_rollup_deltas(cursor, account_id, {
+        (day, trans_type, category): [-total, -count]
+        for day, trans_type, category, total, count in groups
+    })
+    
+    connection.commit()
+    cursor.close()
+    return removed
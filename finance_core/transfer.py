@@ -0,0 +1,235 @@
+import csv
+import threading
+import time
+from datetime import date, datetime
+
+from .dialects import dialect_of
+from .money import MAX_AMOUNT_CENTS, format_amount, to_cents
+from .transactions import apply_rollup_deltas, archived_years, build_transaction_filter
+
+# CSV export: rows pulled from the server per batch
+EXPORT_BATCH_SIZE = 5000
+
+# Bulk import: rows inserted per database transaction
+IMPORT_CHUNK_SIZE = 20000
+ISO_DATE_FORMAT = "%Y-%m-%d"
+
+
+class OperationCancelled(Exception):
+    pass
+
+
+class Progress:
+    # Shared between a long-running worker (export, import) and whoever is
+    # watching it
+    def __init__(self):
+        self.rows = 0
+        self.rate = 0.0  # rows per second
+        self.cancel_requested = threading.Event()
+
+
+def export_transactions(connection, account_id, csvfile, transaction_filter=None, progress=None, metrics=None):
+    # Writes the account's transactions, newest first. transaction_filter
+    # narrows them down and has to come from build_transaction_filter for
+    # the same account.
+    conditions, params = transaction_filter or build_transaction_filter(account_id)
+    if conditions[:1] != ["account_id = %s"] or params[:1] != [account_id]:
+        raise ValueError("The export filter must be built for the exported account")
+    query = "SELECT type, category, amount_cents, description, date FROM transactions"
+    query += " WHERE " + " AND ".join(conditions)
+    query += " ORDER BY date DESC, id DESC"
+    
+    # An unbuffered cursor streams the result from the server, so only one
+    # batch of rows is held in memory at a time
+    cursor = connection.cursor(buffered=False)
+    cursor.execute(query, params)
+    
+    csvwriter = csv.writer(csvfile)
+    
+    # Write header
+    csvwriter.writerow(['Type', 'Category', 'Amount', 'Description', 'Date'])
+    
+    # Write data
+    started = time.monotonic()
+    rows_written = 0
+    write_time = 0.0
+    while True:
+        if progress is not None and progress.cancel_requested.is_set():
+            # Drop the connection instead of draining the rest of the result;
+            # the pool reconnects it on its next checkout
+            connection.disconnect()
+            raise OperationCancelled()
+        
+        rows = cursor.fetchmany(EXPORT_BATCH_SIZE)
+        if not rows:
+            break
+        writing = time.perf_counter()
+        csvwriter.writerows(
+            (trans_type, category, format_amount(cents), description, day)
+            for trans_type, category, cents, description, day in rows
+        )
+        write_time += time.perf_counter() - writing
+        rows_written += len(rows)
+        
+        if progress is not None:
+            elapsed = time.monotonic() - started
+            progress.rows = rows_written
+            progress.rate = rows_written / elapsed if elapsed > 0 else 0.0
+    
+    cursor.close()
+    if metrics is not None:
+        metrics.record("export write_csv", write_time, rows_written)
+    return rows_written
+
+
+class ImportMapping:
+    # Where each field lives in an imported CSV. The defaults read the layout
+    # export_data writes; bank statements usually have no type column, so
+    # the type is taken from the sign of the amount instead (negative means
+    # expense), and rows without a category column get default_category.
+    def __init__(self, type_column="Type", category_column="Category", amount_column="Amount",
+                 description_column="Description", date_column="Date", date_format="%Y-%m-%d",
+                 default_category="Other"):
+        self.type_column = type_column
+        self.category_column = category_column
+        self.amount_column = amount_column
+        self.description_column = description_column
+        self.date_column = date_column
+        self.date_format = date_format
+        self.default_category = default_category
+
+
+class ImportResult:
+    def __init__(self):
+        self.imported = 0
+        self.created_categories = []
+        self.errors = []  # (line number, message) for every skipped row
+
+
+def parse_date(raw_date, date_format):
+    # date.fromisoformat is several times cheaper than strptime and parses
+    # plain zero-padded ISO dates the same way; anything else goes through
+    # strptime
+    if date_format == ISO_DATE_FORMAT and len(raw_date) == 10 and raw_date[4] == raw_date[7] == "-" and raw_date.isascii():
+        return date.fromisoformat(raw_date)
+    return datetime.strptime(raw_date, date_format).date()
+
+
+def parse_import_row(record, mapping):
+    # Returns (type, category, cents, description, date) or raises
+    # ValueError. The date is parsed once, here, and stays a date through
+    # the insert and the rollup deltas.
+    raw_amount = (record.get(mapping.amount_column) or "").strip()
+    raw_amount = raw_amount.replace(",", "").replace("$", "")
+    if not raw_amount:
+        raise ValueError("Missing amount")
+    try:
+        amount = to_cents(raw_amount)
+    except ArithmeticError:
+        raise ValueError(f"Invalid amount '{raw_amount}'")
+    
+    if mapping.type_column:
+        trans_type = (record.get(mapping.type_column) or "").strip().lower()
+        if trans_type not in ("income", "expense"):
+            raise ValueError(f"Invalid type '{trans_type}'")
+    else:
+        trans_type = "expense" if amount < 0 else "income"
+        amount = abs(amount)
+    
+    if amount <= 0:
+        raise ValueError("Amount must be positive")
+    if amount > MAX_AMOUNT_CENTS:
+        raise ValueError(f"Amount must not exceed {format_amount(MAX_AMOUNT_CENTS)}")
+    
+    category = mapping.default_category
+    if mapping.category_column:
+        category = (record.get(mapping.category_column) or "").strip() or mapping.default_category
+    if len(category) > 50:
+        raise ValueError("Category name is longer than 50 characters")
+    
+    description = ""
+    if mapping.description_column:
+        description = (record.get(mapping.description_column) or "").strip()[:255]
+    
+    raw_date = (record.get(mapping.date_column) or "").strip()
+    try:
+        day = parse_date(raw_date, mapping.date_format)
+    except ValueError:
+        raise ValueError(f"Invalid date '{raw_date}'")
+    
+    return trans_type, category, amount, description, day
+
+
+def import_transactions(connection, account_id, csvfile, mapping=None, progress=None):
+    # Validates rows in one streaming pass and inserts them into the account
+    # in chunks, each chunk (rows, rollup deltas and any new categories) in
+    # one transaction
+    mapping = mapping or ImportMapping()
+    result = ImportResult()
+    dialect = dialect_of(connection)
+    
+    cursor = connection.cursor()
+    cursor.execute("SELECT name, type FROM categories WHERE account_id = %s", (account_id,))
+    known_categories = set(cursor.fetchall())
+    closed_years = set(archived_years(cursor, account_id))
+    
+    started = time.monotonic()
+    reader = csv.DictReader(csvfile)
+    chunk = []
+    
+    def flush():
+        # A name is a separate category for income and for expenses
+        new_categories = {(row[1], row[0]) for row in chunk} - known_categories
+        if new_categories:
+            cursor.executemany(
+                "INSERT IGNORE INTO categories (account_id, name, type) VALUES (%s, %s, %s)",
+                [(account_id, name, trans_type) for name, trans_type in sorted(new_categories)]
+            )
+            for name, trans_type in sorted(new_categories):
+                known_categories.add((name, trans_type))
+                result.created_categories.append(name)
+        
+        # In date order, so the date indexes grow in runs instead of at
+        # random places; rows of one date keep their order in the file
+        chunk.sort(key=lambda row: row[4])
+        dialect.insert_transactions(cursor, [(account_id,) + row for row in chunk])
+        
+        deltas = {}
+        for trans_type, category, amount, description, day in chunk:
+            totals = deltas.setdefault((day, trans_type, category), [0, 0])
+            totals[0] += amount
+            totals[1] += 1
+        apply_rollup_deltas(cursor, account_id, deltas)
+        
+        connection.commit()
+        result.imported += len(chunk)
+        chunk.clear()
+        
+        if progress is not None:
+            elapsed = time.monotonic() - started
+            progress.rows = result.imported
+            progress.rate = result.imported / elapsed if elapsed > 0 else 0.0
+    
+    for record in reader:
+        try:
+            row = parse_import_row(record, mapping)
+        except ValueError as err:
+            result.errors.append((reader.line_num, str(err)))
+            continue
+        year = row[4].year
+        if year in closed_years:
+            result.errors.append((reader.line_num, f"{year} is archived"))
+            continue
+        chunk.append(row)
+        
+        if len(chunk) >= IMPORT_CHUNK_SIZE:
+            flush()
+            if progress is not None and progress.cancel_requested.is_set():
+                cursor.close()
+                raise OperationCancelled()
+    
+    if chunk:
+        flush()
+    
+    cursor.close()
+    return result
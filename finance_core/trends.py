@@ -0,0 +1,108 @@
+import math
+
+from .balances import balance_before
+from .dialects import dialect_of
+
+
+class TrendSeries:
+    # Income, expense and running balance in cents per period; periods are
+    # the bucket start dates as "YYYY-MM-DD"
+    def __init__(self, granularity, opening_balance=0):
+        self.granularity = granularity
+        self.opening_balance = opening_balance
+        self.periods = []
+        self.income = []
+        self.expense = []
+        self.balance = []
+
+
+def build_trend_series(granularity, totals, opening_balance):
+    # totals: {period: {"income": cents, "expense": cents}}
+    series = TrendSeries(granularity, opening_balance)
+    balance = opening_balance
+    for period in sorted(totals):
+        income = totals[period].get("income", 0)
+        expense = totals[period].get("expense", 0)
+        balance += income - expense
+        series.periods.append(period)
+        series.income.append(income)
+        series.expense.append(expense)
+        series.balance.append(balance)
+    return series
+
+
+def trend_series(connection, account_id, granularity, date_from=None, date_to=None):
+    # Bucketing happens in SQL, so only one row per (period, type) is sent
+    # back however many transactions the range holds. Weeks start on Monday.
+    bucket = dialect_of(connection).bucket_start(granularity, "day")
+    query = f"SELECT {bucket} AS period, type, SUM(total_cents) FROM transaction_rollup"
+    conditions = ["account_id = %s"]
+    params = [account_id]
+    if date_from:
+        conditions.append("day >= %s")
+        params.append(date_from)
+    if date_to:
+        conditions.append("day <= %s")
+        params.append(date_to)
+    query += " WHERE " + " AND ".join(conditions)
+    query += " GROUP BY period, type"
+    
+    cursor = connection.cursor()
+    cursor.execute(query, params)
+    totals = {}
+    for period, trans_type, total in cursor.fetchall():
+        totals.setdefault(str(period), {})[trans_type] = int(total)
+    
+    # The running balance starts from everything before the range
+    opening_balance = 0
+    if date_from:
+        opening_balance = balance_before(cursor, account_id, date_from)
+    
+    cursor.close()
+    return build_trend_series(granularity, totals, opening_balance)
+
+
+def downsample_lttb(xs, ys, threshold):
+    # Largest-Triangle-Three-Buckets: keeps the first and last points and,
+    # from each bucket in between, the point forming the largest triangle
+    # with the previously kept point and the next bucket's average. Peaks
+    # and troughs survive, which plain striding would drop.
+    count = len(xs)
+    if threshold >= count or threshold < 3:
+        return list(xs), list(ys)
+    
+    sampled_xs = [xs[0]]
+    sampled_ys = [ys[0]]
+    every = (count - 2) / (threshold - 2)
+    previous = 0
+    
+    for bucket in range(threshold - 2):
+        # Average of the next bucket
+        next_start = int(math.floor((bucket + 1) * every)) + 1
+        next_end = min(int(math.floor((bucket + 2) * every)) + 1, count)
+        if next_start >= next_end:
+            next_start, next_end = count - 1, count
+        average_x = sum(xs[next_start:next_end]) / (next_end - next_start)
+        average_y = sum(ys[next_start:next_end]) / (next_end - next_start)
+        
+        # Point of this bucket with the largest triangle
+        start = int(math.floor(bucket * every)) + 1
+        end = int(math.floor((bucket + 1) * every)) + 1
+        largest_area = -1.0
+        chosen = start
+        for index in range(start, end):
+            area = abs(
+                (xs[previous] - average_x) * (ys[index] - ys[previous])
+                - (xs[previous] - xs[index]) * (average_y - ys[previous])
+            )
+            if area > largest_area:
+                largest_area = area
+                chosen = index
+        
+        sampled_xs.append(xs[chosen])
+        sampled_ys.append(ys[chosen])
+        previous = chosen
+    
+    sampled_xs.append(xs[-1])
+    sampled_ys.append(ys[-1])
+    return sampled_xs, sampled_ys
@@ -1,11 +1,222 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-import mysql.connector
-from datetime import datetime
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import csv
+from datetime import date, datetime
 import os
+import queue
+import threading
+import time
+from contextlib import nullcontext
+
+from finance_core import (
+    FREQUENCIES,
+    CategoryCache,
+    ImportMapping,
+    Metrics,
+    OperationCancelled,
+    Progress,
+    ValidationError,
+    add_rule,
+    aggregate_transactions,
+    archive_year,
+    budget_alert,
+    budget_status,
+    build_transaction_filter,
+    create_connection_manager,
+    downsample_lttb,
+    export_transactions,
+    fetch_accounts,
+    fetch_archived_years,
+    fetch_rules,
+    fetch_transaction,
+    fetch_transaction_page,
+    format_amount,
+    import_transactions,
+    insert_transaction,
+    load_db_config,
+    migrate,
+    parse_amount,
+    post_due_occurrences,
+    rebuild_rollup,
+    remove_budget,
+    remove_rule,
+    remove_transaction,
+    remove_transactions,
+    resolve_account,
+    restore_year,
+    running_balances,
+    set_budget,
+    to_units,
+    trend_series,
+    update_transaction,
+    update_transactions,
+    validate_date,
+    validate_transaction
+)
+from finance_core import analytics, db
+
+# Transactions view paging: rows fetched per keyset page and how many pages
+# stay in the Treeview before the ones scrolled away from are dropped
+PAGE_SIZE = 200
+MAX_LOADED_PAGES = 5
+# Fraction of the loaded window from either edge that triggers a prefetch
+PREFETCH_THRESHOLD = 0.2
+# Quiet period after single-row changes before the loaded balances are
+# recomputed, so a burst of edits costs one refresh
+BALANCE_REFRESH_DELAY = 300  # milliseconds
+
+# Background query execution
+QUERY_WORKERS = 2
+RESULT_POLL_INTERVAL = 50  # milliseconds
+
+# How often the export and import progress dialogs refresh
+EXPORT_PROGRESS_INTERVAL = 200  # milliseconds
+
+# Use the in-memory columnar snapshot for reports when NumPy is installed
+USE_ANALYTICS_SNAPSHOT = True
+
+# Time every query and UI step for the diagnostics view
+ENABLE_METRICS = True
+
+
+class QueryTask:
+    def __init__(self, work, on_success, on_error, key):
+        self.work = work
+        self.on_success = on_success
+        self.on_error = on_error
+        self.key = key
+        self.cancelled = False
+        self.connection = None  # Set while a worker is running the task
+        # Guards connection, so the task is only ever interrupted on the
+        # connection it is running on
+        self.lock = threading.Lock()
+
+
+class QueryExecutor:
+    # Runs database work on a pool of worker threads, each checking out its
+    # own pooled connection, and hands the results back to the Tk thread by
+    # polling a result queue with root.after. Work submitted under a key
+    # cancels the previous task with the same key, so a stale query never
+    # reaches the UI.
+    def __init__(self, root, connections, workers=QUERY_WORKERS, on_busy_changed=None):
+        self.root = root
+        self.connections = connections
+        self.on_busy_changed = on_busy_changed
+        self.tasks = queue.Queue()
+        self.results = queue.Queue()
+        self.latest = {}
+        self.pending = 0
+        self.running = True
+        
+        self.workers = []
+        for _ in range(workers):
+            worker = threading.Thread(target=self.worker_loop, daemon=True)
+            worker.start()
+            self.workers.append(worker)
+        
+        self.root.after(RESULT_POLL_INTERVAL, self.poll_results)
+    
+    def submit(self, work, on_success=None, on_error=None, key=None):
+        # work(connection) runs on a worker thread; the callbacks run on the
+        # Tk thread with its return value or the raised exception
+        task = QueryTask(work, on_success, on_error, key)
+        if key is not None:
+            self.cancel(key)
+            self.latest[key] = task
+        
+        self.pending += 1
+        if self.pending == 1 and self.on_busy_changed:
+            self.on_busy_changed(True)
+        
+        self.tasks.put(task)
+        return task
+    
+    def cancel(self, key):
+        task = self.latest.pop(key, None)
+        if task is None or task.cancelled:
+            return
+        
+        task.cancelled = True
+        # Abort the statement if a worker is already running it
+        if task.connection is not None:
+            threading.Thread(target=self.interrupt, args=(task,), daemon=True).start()
+    
+    def interrupt(self, task):
+        # The worker clears task.connection under task.lock before it
+        # releases the connection, so while the lock is held here the
+        # connection cannot have moved on to another task
+        with task.lock:
+            if task.connection is not None:
+                self.connections.interrupt(task.connection)
+    
+    def worker_loop(self):
+        while self.running:
+            task = self.tasks.get()
+            if task is None:
+                break
+            
+            result = None
+            error = None
+            if not task.cancelled:
+                connection = None
+                started = time.perf_counter()
+                try:
+                    connection = self.connections.get_connection()
+                    with task.lock:
+                        task.connection = connection
+                    # Cancelled while waiting for the connection
+                    if not task.cancelled:
+                        result = task.work(connection)
+                except Exception as err:
+                    error = err
+                    if connection is not None:
+                        try:
+                            connection.rollback()
+                        except db.DatabaseError:
+                            pass
+                finally:
+                    with task.lock:
+                        task.connection = None
+                    if connection is not None:
+                        self.connections.release(connection)
+                    if self.connections.metrics is not None:
+                        self.connections.metrics.record(f"task {task.key or 'write'}", time.perf_counter() - started)
+            
+            self.results.put((task, result, error))
+    
+    def poll_results(self):
+        if not self.running:
+            return
+        
+        while True:
+            try:
+                task, result, error = self.results.get_nowait()
+            except queue.Empty:
+                break
+            
+            self.pending -= 1
+            if self.pending == 0 and self.on_busy_changed:
+                self.on_busy_changed(False)
+            
+            if task.cancelled:
+                continue
+            if task.key is not None and self.latest.get(task.key) is task:
+                del self.latest[task.key]
+            
+            if error is not None:
+                if task.on_error:
+                    task.on_error(error)
+                else:
+                    messagebox.showerror("Database Error", str(error))
+            elif task.on_success:
+                task.on_success(result)
+        
+        self.root.after(RESULT_POLL_INTERVAL, self.poll_results)
+    
+    def shutdown(self):
+        self.running = False
+        for _ in self.workers:
+            self.tasks.put(None)
+
 
 class PersonalFinanceManager:
     def __init__(self, root):
@@ -14,12 +225,23 @@ class PersonalFinanceManager:
         self.root.geometry("1200x800")
         self.root.configure(bg='#f0f0f0')
         
-        # Database connection
-        self.db_connection = None
-        self.connect_to_database()
+        # Query and UI timings for the diagnostics view
+        self.metrics = Metrics() if ENABLE_METRICS else None
+        
+        # Database connection pool
+        self.config = load_db_config()
+        if not self.connect_to_database():
+            return
         
         # Create tables if they don't exist
-        self.create_tables()
+        if not self.create_tables():
+            return
+        
+        # The configured account, which the configured user has to be a member of
+        account_id = self.resolve_configured_account()
+        if account_id is None:
+            self.root.destroy()
+            return
         
         # Style configuration
         self.style = ttk.Style()
@@ -38,90 +260,151 @@ class PersonalFinanceManager:
         
         ttk.Label(self.header_frame, text="Personal Finance Manager", style='Header.TLabel').pack(side=tk.LEFT)
         
+        # Account selector, listing the accounts the configured user may open
+        ttk.Label(self.header_frame, text="Account:").pack(side=tk.LEFT, padx=(20, 5))
+        self.account_name = tk.StringVar(value=self.config["account"])
+        self.account_combo = ttk.Combobox(self.header_frame, textvariable=self.account_name, state="readonly", width=20)
+        self.account_combo.pack(side=tk.LEFT)
+        self.account_combo.bind("<<ComboboxSelected>>", self.on_account_selected)
+        self.account_ids = {}
+        
+        # In-progress indicator, shown while background queries are running
+        self.busy_label = ttk.Label(self.header_frame, text="Working...")
+        self.busy_indicator = ttk.Progressbar(self.header_frame, mode="indeterminate", length=120)
+        
         # Navigation buttons
         self.nav_frame = ttk.Frame(self.main_frame)
         self.nav_frame.pack(fill=tk.X, pady=(0, 10))
         
         ttk.Button(self.nav_frame, text="Add Transaction", command=self.show_add_transaction).pack(side=tk.LEFT, padx=5)
         ttk.Button(self.nav_frame, text="View Transactions", command=self.show_transactions).pack(side=tk.LEFT, padx=5)
+        ttk.Button(self.nav_frame, text="Recurring", command=self.show_recurring).pack(side=tk.LEFT, padx=5)
         ttk.Button(self.nav_frame, text="View Reports", command=self.show_reports).pack(side=tk.LEFT, padx=5)
         ttk.Button(self.nav_frame, text="Export Data", command=self.export_data).pack(side=tk.LEFT, padx=5)
+        ttk.Button(self.nav_frame, text="Import Data", command=self.import_data).pack(side=tk.LEFT, padx=5)
+        if self.metrics is not None:
+            ttk.Button(self.nav_frame, text="Diagnostics", command=self.show_diagnostics).pack(side=tk.LEFT, padx=5)
         
         # Content frame
         self.content_frame = ttk.Frame(self.main_frame)
         self.content_frame.pack(fill=tk.BOTH, expand=True)
         
+        self.set_account(account_id)
+        
+        # Background query workers, each with its own pooled connection
+        self.executor = QueryExecutor(self.root, self.connections, on_busy_changed=self.set_busy)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.load_accounts()
+        
+        # Catch up on recurring transactions that fell due while closed
+        self.post_recurring()
+        
         # Default view
         self.show_transactions()
     
     def connect_to_database(self):
+        # False, with the window closed, when there is no database to use
         try:
-            self.db_connection = mysql.connector.connect(
-                host="localhost",
-                user="root",
-                password=""
-            )
-        except mysql.connector.Error as err:
-            messagebox.showerror("Database Error", f"Error connecting to MySQL: {err}")
+            # Raises BackendUnavailable when the MySQL driver is missing
+            self.connections = create_connection_manager(self.config, self.metrics)
+            self.connections.ensure_database()
+            self.connections.create_pool()
+        except db.DatabaseError as err:
+            messagebox.showerror("Database Error", f"Error connecting to the database: {err}")
             self.root.destroy()
+            return False
+        return True
+    
+    def ui_timer(self, name):
+        if self.metrics is None:
+            return nullcontext({"rows": 0})
+        return self.metrics.timer(name)
+    
+    def set_busy(self, busy):
+        if busy:
+            self.busy_indicator.pack(side=tk.RIGHT, padx=5)
+            self.busy_label.pack(side=tk.RIGHT)
+            self.busy_indicator.start(10)
+        else:
+            self.busy_indicator.stop()
+            self.busy_indicator.pack_forget()
+            self.busy_label.pack_forget()
+    
+    def on_close(self):
+        self.executor.shutdown()
+        self.root.destroy()
     
     def create_tables(self):
+        # False, with the window closed, when the schema cannot be migrated
         try:
-            cursor = self.db_connection.cursor()
-
-            cursor.execute("CREATE DATABASE IF NOT EXISTS finance_manager")
-            cursor.execute("USE finance_manager")
-            
-            # Create transactions table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS transactions (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    type VARCHAR(10) NOT NULL,
-                    category VARCHAR(50) NOT NULL,
-                    amount DECIMAL(10, 2) NOT NULL,
-                    description VARCHAR(255),
-                    date DATE NOT NULL
-                )
-            """)
-            
-            # Create categories table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS categories (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    name VARCHAR(50) NOT NULL UNIQUE,
-                    type VARCHAR(10) NOT NULL
-                )
-            """)
-            
-            # Insert default categories if they don't exist
-            default_categories = [
-                ('Salary', 'income'),
-                ('Freelance', 'income'),
-                ('Investments', 'income'),
-                ('Gifts', 'income'),
-                ('Food', 'expense'),
-                ('Transport', 'expense'),
-                ('Housing', 'expense'),
-                ('Utilities', 'expense'),
-                ('Entertainment', 'expense'),
-                ('Healthcare', 'expense'),
-                ('Education', 'expense'),
-                ('Shopping', 'expense'),
-                ('Other', 'income'),
-                ('Other', 'expense')
-            ]
-            
-            for category in default_categories:
-                try:
-                    cursor.execute("INSERT INTO categories (name, type) VALUES (%s, %s)", category)
-                except mysql.connector.IntegrityError:
-                    # Category already exists
-                    pass
-            
-            self.db_connection.commit()
-            cursor.close()
-        except mysql.connector.Error as err:
+            with self.connections.connection() as connection:
+                migrate(connection)
+                self.connections.detect_search_index(connection)
+        except db.DatabaseError as err:
             messagebox.showerror("Database Error", f"Error creating tables: {err}")
+            self.root.destroy()
+            return False
+        return True
+    
+    def resolve_configured_account(self):
+        try:
+            with self.connections.connection() as connection:
+                return resolve_account(connection, self.config["account"], self.config["account_user"] or None)
+        except ValidationError as err:
+            messagebox.showerror("Error", f"Cannot open the account: {err}")
+        except db.DatabaseError as err:
+            messagebox.showerror("Database Error", f"Error opening the account: {err}")
+        return None
+    
+    def set_account(self, account_id):
+        # Everything cached belongs to one account
+        self.account_id = account_id
+        
+        # Category names shared by the forms and the reports
+        self.category_cache = CategoryCache(account_id)
+        
+        # Columnar snapshot for the reports, when NumPy is available
+        self.analytics = None
+        if analytics.available() and USE_ANALYTICS_SNAPSHOT:
+            self.analytics = analytics.ColumnarSnapshot(account_id)
+    
+    def load_accounts(self):
+        def apply_accounts(accounts):
+            self.account_ids = {name: account_id for account_id, name in accounts}
+            self.account_combo['values'] = [name for account_id, name in accounts]
+        
+        self.executor.submit(
+            lambda connection: fetch_accounts(connection, self.config["account_user"] or None),
+            apply_accounts,
+            lambda err: messagebox.showerror("Database Error", f"Error loading accounts: {err}"),
+            key="accounts"
+        )
+    
+    def on_account_selected(self, event=None):
+        account_id = self.account_ids.get(self.account_name.get())
+        if account_id is None or account_id == self.account_id:
+            return
+        self.set_account(account_id)
+        self.post_recurring()
+        self.show_transactions()
+    
+    def post_recurring(self):
+        def on_posted(posted):
+            if not posted:
+                return
+            self.notify_transactions_changed(inserted_only=True)
+            if hasattr(self, "transactions_tree") and self.transactions_tree.winfo_exists():
+                self.load_transactions()
+            if hasattr(self, "recurring_tree") and self.recurring_tree.winfo_exists():
+                self.load_recurring_rules()
+            messagebox.showinfo("Recurring Transactions", f"{posted} recurring transactions posted")
+        
+        account_id = self.account_id
+        self.executor.submit(
+            lambda connection: post_due_occurrences(connection, account_id),
+            on_posted,
+            lambda err: messagebox.showerror("Database Error", f"Error posting recurring transactions: {err}")
+        )
     
     def clear_content_frame(self):
         for widget in self.content_frame.winfo_children():
@@ -151,7 +434,8 @@ class PersonalFinanceManager:
         
         # Amount
         ttk.Label(form_frame, text="Amount:").grid(row=2, column=0, padx=5, pady=5, sticky=tk.E)
-        self.amount = tk.DoubleVar()
+        # Read as text and parsed to cents, never through a float
+        self.amount = tk.StringVar()
         ttk.Entry(form_frame, textvariable=self.amount).grid(row=2, column=1, columnspan=2, padx=5, pady=5, sticky=tk.W)
         
         # Description
@@ -173,16 +457,29 @@ class PersonalFinanceManager:
     
     def update_categories(self, *args):
         trans_type = self.trans_type.get()
-        try:
-            cursor = self.db_connection.cursor()
-            cursor.execute("SELECT name FROM categories WHERE type = %s ORDER BY name", (trans_type,))
-            categories = [row[0] for row in cursor.fetchall()]
+        
+        def apply_categories(categories):
+            if not self.category_combo.winfo_exists():
+                return
             self.category_combo['values'] = categories
             if categories:
                 self.category.set(categories[0])
-            cursor.close()
-        except mysql.connector.Error as err:
-            messagebox.showerror("Database Error", f"Error loading categories: {err}")
+        
+        self.with_categories(trans_type, apply_categories, key="categories")
+    
+    def with_categories(self, trans_type, apply_categories, key):
+        # Served from the shared cache; only a cold cache costs a query
+        categories = self.category_cache.get(trans_type)
+        if categories is not None:
+            apply_categories(categories)
+            return
+        
+        self.executor.submit(
+            lambda connection: self.category_cache.load(connection).get(trans_type, []),
+            apply_categories,
+            lambda err: messagebox.showerror("Database Error", f"Error loading categories: {err}"),
+            key=key
+        )
     
     def show_add_category(self):
         add_category_window = tk.Toplevel(self.root)
@@ -200,67 +497,79 @@ class PersonalFinanceManager:
         
         def save_category():
             name = category_name.get().strip()
+            trans_type = category_type.get()
             if not name:
                 messagebox.showerror("Error", "Category name cannot be empty")
                 return
             
-            try:
-                cursor = self.db_connection.cursor()
-                cursor.execute("INSERT INTO categories (name, type) VALUES (%s, %s)", (name, category_type.get()))
-                self.db_connection.commit()
+            account_id = self.account_id
+            
+            def insert_category(connection):
+                cursor = connection.cursor()
+                cursor.execute(
+                    "INSERT INTO categories (account_id, name, type) VALUES (%s, %s, %s)",
+                    (account_id, name, trans_type)
+                )
+                connection.commit()
                 cursor.close()
-                
+            
+            def on_saved(result):
+                self.category_cache.invalidate()
                 messagebox.showinfo("Success", "Category added successfully")
                 add_category_window.destroy()
                 self.update_categories()  # Refresh the category list
-            except mysql.connector.IntegrityError:
-                messagebox.showerror("Error", "Category already exists")
-            except mysql.connector.Error as err:
-                messagebox.showerror("Database Error", f"Error adding category: {err}")
+            
+            def on_error(err):
+                if isinstance(err, db.IntegrityError):
+                    messagebox.showerror("Error", "Category already exists")
+                else:
+                    messagebox.showerror("Database Error", f"Error adding category: {err}")
+            
+            self.executor.submit(insert_category, on_saved, on_error)
         
         ttk.Button(add_category_window, text="Save", command=save_category).pack(pady=10)
     
     def add_transaction(self):
         trans_type = self.trans_type.get()
         category = self.category.get()
-        amount = self.amount.get()
         description = self.description.get()
         date = self.date.get()
         
         # Validation
-        if not category:
-            messagebox.showerror("Error", "Please select a category")
-            return
-        
-        if amount <= 0:
-            messagebox.showerror("Error", "Amount must be positive")
-            return
-        
         try:
-            datetime.strptime(date, '%Y-%m-%d')
-        except ValueError:
-            messagebox.showerror("Error", "Invalid date format. Use YYYY-MM-DD")
+            amount = parse_amount(self.amount.get())
+            validate_transaction(trans_type, category, amount, date)
+        except ValueError as err:
+            messagebox.showerror("Error", str(err))
             return
         
-        try:
-            cursor = self.db_connection.cursor()
-            cursor.execute("""
-                INSERT INTO transactions (type, category, amount, description, date)
-                VALUES (%s, %s, %s, %s, %s)
-            """, (trans_type, category, amount, description, date))
-            
-            self.db_connection.commit()
-            cursor.close()
-            
+        def on_added(alert):
+            # The add form replaced the transactions view, which loads its
+            # pages afresh when it is opened again; only the snapshot needs
+            # to hear about the new row
+            self.notify_transactions_changed(inserted_only=True)
             messagebox.showinfo("Success", "Transaction added successfully")
+            self.show_budget_alert(alert)
             
             # Clear form
-            self.amount.set(0)
+            self.amount.set("")
             self.description.set("")
             self.date.set(datetime.now().strftime('%Y-%m-%d'))
-            
-        except mysql.connector.Error as err:
-            messagebox.showerror("Database Error", f"Error adding transaction: {err}")
+        
+        account_id = self.account_id
+        
+        def insert_and_check_budget(connection):
+            insert_transaction(connection, account_id, trans_type, category, amount, description, date)
+            return budget_alert(connection, account_id, category, date) if trans_type == "expense" else None
+        
+        def on_error(err):
+            # Dates in an archived year are refused by the core
+            if isinstance(err, ValidationError):
+                messagebox.showerror("Error", str(err))
+            else:
+                messagebox.showerror("Database Error", f"Error adding transaction: {err}")
+        
+        self.executor.submit(insert_and_check_budget, on_added, on_error)
     
     def show_transactions(self):
         self.clear_content_frame()
@@ -284,15 +593,21 @@ class PersonalFinanceManager:
         self.filter_to = tk.StringVar()
         ttk.Entry(filter_frame, textvariable=self.filter_to, width=10).pack(side=tk.LEFT, padx=5)
         
+        ttk.Label(filter_frame, text="Search:").pack(side=tk.LEFT, padx=5)
+        self.filter_search = tk.StringVar()
+        search_entry = ttk.Entry(filter_frame, textvariable=self.filter_search, width=20)
+        search_entry.pack(side=tk.LEFT, padx=5)
+        search_entry.bind("<Return>", lambda event: self.load_transactions())
+        
         ttk.Button(filter_frame, text="Apply", command=self.load_transactions).pack(side=tk.LEFT, padx=10)
         
         # Transactions treeview
         tree_frame = ttk.Frame(self.content_frame)
         tree_frame.pack(fill=tk.BOTH, expand=True)
         
-        columns = ("id", "type", "category", "amount", "description", "date")
+        columns = ("id", "type", "category", "amount", "description", "date", "balance")
         self.transactions_tree = ttk.Treeview(
-            tree_frame, columns=columns, show="headings", selectmode="browse"
+            tree_frame, columns=columns, show="headings", selectmode="extended"
         )
         
         # Configure columns
@@ -302,6 +617,7 @@ class PersonalFinanceManager:
         self.transactions_tree.heading("amount", text="Amount")
         self.transactions_tree.heading("description", text="Description")
         self.transactions_tree.heading("date", text="Date")
+        self.transactions_tree.heading("balance", text="Balance")
         
         self.transactions_tree.column("id", width=50, anchor=tk.CENTER)
         self.transactions_tree.column("type", width=80, anchor=tk.CENTER)
@@ -309,11 +625,12 @@ class PersonalFinanceManager:
         self.transactions_tree.column("amount", width=100, anchor=tk.CENTER)
         self.transactions_tree.column("description", width=200)
         self.transactions_tree.column("date", width=100, anchor=tk.CENTER)
+        self.transactions_tree.column("balance", width=100, anchor=tk.E)
         
         # Add scrollbar
-        scrollbar = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.transactions_tree.yview)
-        self.transactions_tree.configure(yscroll=scrollbar.set)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.transactions_scrollbar = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.transactions_tree.yview)
+        self.transactions_tree.configure(yscroll=self.on_transactions_scroll)
+        self.transactions_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         self.transactions_tree.pack(fill=tk.BOTH, expand=True)
         
         # Action buttons
@@ -324,65 +641,166 @@ class PersonalFinanceManager:
         ttk.Button(button_frame, text="Edit", command=self.edit_transaction).pack(side=tk.LEFT, padx=5)
         ttk.Button(button_frame, text="Delete", command=self.delete_transaction).pack(side=tk.LEFT, padx=5)
         
+        # Edit and Delete act on every selected row, or on everything the
+        # filter matches including rows that are not loaded
+        self.select_all_matching = tk.BooleanVar(value=False)
+        ttk.Checkbutton(button_frame, text="All matching filter", variable=self.select_all_matching).pack(side=tk.LEFT, padx=5)
+        
         # Load initial data
+        self.loaded_pages = []
+        self.page_loading = False
+        self.balance_refresh = None
         self.load_transactions()
     
     def load_transactions(self):
-        # Clear existing data
-        for item in self.transactions_tree.get_children():
-            self.transactions_tree.delete(item)
-        
-        # Build query based on filters
-        query = "SELECT id, type, category, amount, description, date FROM transactions"
-        conditions = []
-        params = []
-        
-        filter_type = self.filter_type.get()
-        if filter_type != "all":
-            conditions.append("type = %s")
-            params.append(filter_type)
-        
-        date_from = self.filter_from.get()
-        if date_from:
-            try:
-                datetime.strptime(date_from, '%Y-%m-%d')
-                conditions.append("date >= %s")
-                params.append(date_from)
-            except ValueError:
-                messagebox.showerror("Error", "Invalid 'From' date format. Use YYYY-MM-DD")
-                return
-        
-        date_to = self.filter_to.get()
-        if date_to:
-            try:
-                datetime.strptime(date_to, '%Y-%m-%d')
-                conditions.append("date <= %s")
-                params.append(date_to)
-            except ValueError:
-                messagebox.showerror("Error", "Invalid 'To' date format. Use YYYY-MM-DD")
-                return
+        # Validate filters before touching the current view
+        transaction_filter = self.build_transaction_filter()
+        if transaction_filter is None:
+            return
         
-        if conditions:
-            query += " WHERE " + " AND ".join(conditions)
+        # Reset the paging window and start again from the newest row
+        self.transaction_filter = transaction_filter
+        self.loaded_pages = []
+        self.has_more_above = False
+        self.has_more_below = True
+        self.transactions_tree.delete(*self.transactions_tree.get_children())
+        self.page_loading = True
+        self.load_page("below")
+    
+    def build_transaction_filter(self):
+        try:
+            return build_transaction_filter(
+                self.account_id, self.filter_type.get(), self.filter_from.get(), self.filter_to.get(),
+                self.filter_search.get(), self.connections.dialect
+            )
+        except ValidationError as err:
+            messagebox.showerror("Error", str(err))
+            return None
+    
+    def load_page(self, direction):
+        # Runs with self.page_loading set; clears it when nothing is fetched
+        key = None
+        if direction == "below":
+            can_load = self.has_more_below
+            if self.loaded_pages:
+                last_row = self.loaded_pages[-1][-1]
+                key = (last_row[5], last_row[0])
+        else:
+            can_load = self.has_more_above and self.loaded_pages
+            if can_load:
+                first_row = self.loaded_pages[0][0]
+                key = (first_row[5], first_row[0])
+        
+        if not can_load or not self.transactions_tree.winfo_exists():
+            self.page_loading = False
+            return
         
-        query += " ORDER BY date DESC"
+        account_id = self.account_id
+        transaction_filter = self.transaction_filter
+        self.executor.submit(
+            lambda connection: self.fetch_page_with_balances(connection, account_id, transaction_filter, direction, key),
+            lambda result: self.apply_page(direction, *result),
+            self.on_page_error,
+            key="transactions"
+        )
+    
+    def fetch_page_with_balances(self, connection, account_id, transaction_filter, direction, key):
+        # Runs on a worker; each row gets the ledger balance after it appended
+        rows, has_more = fetch_transaction_page(connection, transaction_filter, direction, key, PAGE_SIZE)
+        balances = running_balances(connection, account_id, rows)
+        return [row + (balance,) for row, balance in zip(rows, balances)], has_more
+    
+    def on_page_error(self, err):
+        self.page_loading = False
+        messagebox.showerror("Database Error", f"Error loading transactions: {err}")
+    
+    def apply_page(self, direction, rows, has_more):
+        self.page_loading = False
+        if not self.transactions_tree.winfo_exists():
+            return
         
-        try:
-            cursor = self.db_connection.cursor()
-            cursor.execute(query, params)
+        if direction == "below":
+            self.has_more_below = has_more
+            if not rows:
+                return
+            
+            self.loaded_pages.append(rows)
+            with self.ui_timer("ui populate_transactions") as timing:
+                for row in rows:
+                    self.insert_transaction_row(tk.END, row)
+                timing["rows"] = len(rows)
             
-            for row in cursor.fetchall():
-                # Format amount with 2 decimal places
-                formatted_row = list(row)
-                formatted_row[3] = f"{row[3]:.2f}"
-                self.transactions_tree.insert("", tk.END, values=formatted_row)
+            # Drop the page furthest above the viewport once the window is full
+            if len(self.loaded_pages) > MAX_LOADED_PAGES:
+                self.drop_page("above")
+        else:
+            self.has_more_above = has_more
+            if not rows:
+                return
             
-            cursor.close()
-        except mysql.connector.Error as err:
-            messagebox.showerror("Database Error", f"Error loading transactions: {err}")
+            first_visible = self.first_visible_index()
+            self.loaded_pages.insert(0, rows)
+            with self.ui_timer("ui populate_transactions") as timing:
+                for index, row in enumerate(rows):
+                    self.insert_transaction_row(index, row)
+                timing["rows"] = len(rows)
+            self.restore_first_visible(first_visible + len(rows))
+            
+            if len(self.loaded_pages) > MAX_LOADED_PAGES:
+                self.drop_page("below")
+    
+    def drop_page(self, side):
+        if side == "above":
+            page = self.loaded_pages.pop(0)
+            first_visible = self.first_visible_index()
+            self.transactions_tree.delete(*[str(row[0]) for row in page])
+            self.restore_first_visible(first_visible - len(page))
+            self.has_more_above = True
+        else:
+            page = self.loaded_pages.pop()
+            self.transactions_tree.delete(*[str(row[0]) for row in page])
+            self.has_more_below = True
+    
+    def insert_transaction_row(self, index, row):
+        # Amount and balance come in cents; index None updates the
+        # existing item
+        formatted_row = list(row)
+        formatted_row[3] = format_amount(row[3])
+        formatted_row[6] = format_amount(row[6])
+        if index is None:
+            self.transactions_tree.item(str(row[0]), values=formatted_row)
+        else:
+            self.transactions_tree.insert("", index, iid=str(row[0]), values=formatted_row)
+    
+    def first_visible_index(self):
+        total = len(self.transactions_tree.get_children())
+        return int(round(self.transactions_tree.yview()[0] * total))
+    
+    def restore_first_visible(self, index):
+        # Keep the same rows on screen after items are added or removed above them
+        total = len(self.transactions_tree.get_children())
+        if total:
+            self.transactions_tree.yview_moveto(max(index, 0) / total)
+    
+    def on_transactions_scroll(self, first, last):
+        self.transactions_scrollbar.set(first, last)
+        
+        # Prefetch outside the scroll callback so the Treeview is not
+        # modified while it is still updating its own view
+        if self.page_loading:
+            return
+        if float(last) >= 1 - PREFETCH_THRESHOLD and self.has_more_below:
+            self.page_loading = True
+            self.root.after_idle(self.load_page, "below")
+        elif float(first) <= PREFETCH_THRESHOLD and self.has_more_above:
+            self.page_loading = True
+            self.root.after_idle(self.load_page, "above")
     
     def edit_transaction(self):
         selected_item = self.transactions_tree.selection()
+        if self.select_all_matching.get() or len(selected_item) > 1:
+            self.bulk_edit_transactions()
+            return
         if not selected_item:
             messagebox.showerror("Error", "Please select a transaction to edit")
             return
@@ -413,23 +831,22 @@ class PersonalFinanceManager:
         # Update categories based on transaction type
         def update_edit_categories(*args):
             current_type = trans_type.get()
-            try:
-                cursor = self.db_connection.cursor()
-                cursor.execute("SELECT name FROM categories WHERE type = %s ORDER BY name", (current_type,))
-                categories = [row[0] for row in cursor.fetchall()]
+            
+            def apply_categories(categories):
+                if not category_combo.winfo_exists():
+                    return
                 category_combo['values'] = categories
                 if categories:
                     category.set(item_data[2] if item_data[2] in categories else categories[0])
-                cursor.close()
-            except mysql.connector.Error as err:
-                messagebox.showerror("Database Error", f"Error loading categories: {err}")
+            
+            self.with_categories(current_type, apply_categories, key="edit_categories")
         
         trans_type.trace('w', update_edit_categories)
         update_edit_categories()
         
         # Amount
         ttk.Label(edit_window, text="Amount:").pack(pady=5)
-        amount = tk.DoubleVar(value=float(item_data[3]))
+        amount = tk.StringVar(value=str(item_data[3]))
         ttk.Entry(edit_window, textvariable=amount).pack()
         
         # Description
@@ -444,41 +861,54 @@ class PersonalFinanceManager:
         
         def save_changes():
             # Validation
-            if not category.get():
-                messagebox.showerror("Error", "Please select a category")
+            try:
+                values = (trans_type.get(), category.get(), parse_amount(amount.get()), description.get(), date.get())
+                validate_transaction(values[0], values[1], values[2], values[4])
+            except ValueError as err:
+                messagebox.showerror("Error", str(err))
                 return
             
-            if amount.get() <= 0:
-                messagebox.showerror("Error", "Amount must be positive")
-                return
+            account_id = self.account_id
+            transaction_filter = self.transaction_filter
             
-            try:
-                datetime.strptime(date.get(), '%Y-%m-%d')
-            except ValueError:
-                messagebox.showerror("Error", "Invalid date format. Use YYYY-MM-DD")
-                return
+            def update_and_fetch(connection):
+                update_transaction(connection, account_id, trans_id, *values)
+                alert = budget_alert(connection, account_id, values[1], values[4]) if values[0] == "expense" else None
+                return self.fetch_view_row(connection, account_id, trans_id, transaction_filter), alert
             
-            try:
-                cursor = self.db_connection.cursor()
-                cursor.execute("""
-                    UPDATE transactions 
-                    SET type = %s, category = %s, amount = %s, description = %s, date = %s
-                    WHERE id = %s
-                """, (trans_type.get(), category.get(), amount.get(), description.get(), date.get(), trans_id))
-                
-                self.db_connection.commit()
-                cursor.close()
-                
+            def on_updated(result):
+                row, alert = result
+                self.notify_transactions_changed()
+                if self.transactions_tree.winfo_exists():
+                    self.patch_transaction_row(trans_id, row, transaction_filter)
                 messagebox.showinfo("Success", "Transaction updated successfully")
                 edit_window.destroy()
-                self.load_transactions()  # Refresh the transactions list
-            except mysql.connector.Error as err:
-                messagebox.showerror("Database Error", f"Error updating transaction: {err}")
+                self.show_budget_alert(alert)
+            
+            def on_error(err):
+                if isinstance(err, ValidationError):
+                    messagebox.showerror("Error", str(err))
+                else:
+                    messagebox.showerror("Database Error", f"Error updating transaction: {err}")
+            
+            self.executor.submit(update_and_fetch, on_updated, on_error)
         
         ttk.Button(edit_window, text="Save", command=save_changes).pack(pady=10)
     
+    def show_budget_alert(self, status):
+        if status is None:
+            return
+        messagebox.showwarning(
+            "Over Budget",
+            f"{status.category} is over budget for {status.month:%Y-%m}: "
+            f"${format_amount(status.spent)} spent of ${format_amount(status.budget)}"
+        )
+    
     def delete_transaction(self):
         selected_item = self.transactions_tree.selection()
+        if self.select_all_matching.get() or len(selected_item) > 1:
+            self.bulk_delete_transactions()
+            return
         if not selected_item:
             messagebox.showerror("Error", "Please select a transaction to delete")
             return
@@ -488,17 +918,379 @@ class PersonalFinanceManager:
         if not messagebox.askyesno("Confirm", f"Delete transaction #{item_data[0]} - {item_data[2]} ({item_data[3]})?"):
             return
         
-        try:
-            cursor = self.db_connection.cursor()
-            cursor.execute("DELETE FROM transactions WHERE id = %s", (item_data[0],))
+        account_id = self.account_id
+        transaction_filter = self.transaction_filter
+        
+        def on_deleted(result):
+            self.notify_transactions_changed()
+            if self.transactions_tree.winfo_exists():
+                self.patch_transaction_row(item_data[0], None, transaction_filter)
+            messagebox.showinfo("Success", "Transaction deleted successfully")
+        
+        self.executor.submit(
+            lambda connection: remove_transaction(connection, account_id, item_data[0]),
+            on_deleted,
+            lambda err: messagebox.showerror("Database Error", f"Error deleting transaction: {err}")
+        )
+    
+    def fetch_view_row(self, connection, account_id, trans_id, transaction_filter):
+        # Runs on a worker; the row as the transactions view shows it, or
+        # None when it no longer matches the filter
+        row = fetch_transaction(connection, trans_id, transaction_filter)
+        if row is None:
+            return None
+        return row + (running_balances(connection, account_id, [row])[0],)
+    
+    def patch_transaction_row(self, trans_id, row, transaction_filter):
+        # Applies one written row to the loaded window instead of reloading
+        # it: row None removes the item, otherwise the item is updated in
+        # place or moved to its sorted position. Rows outside the loaded
+        # window are left to paging.
+        if transaction_filter is not self.transaction_filter:
+            return  # The view has been reloaded with another filter since
+        
+        location = self.find_loaded_row(trans_id)
+        if location is not None:
+            page_index, row_index = location
+            old_row = self.loaded_pages[page_index][row_index]
+            if row is not None and (row[5], row[0]) == (old_row[5], old_row[0]):
+                # Same position: update the item so selection and focus stay
+                self.loaded_pages[page_index][row_index] = row
+                self.insert_transaction_row(None, row)
+                self.schedule_balance_refresh()
+                return
             
-            self.db_connection.commit()
-            cursor.close()
+            del self.loaded_pages[page_index][row_index]
+            if not self.loaded_pages[page_index]:
+                del self.loaded_pages[page_index]
+            self.transactions_tree.delete(str(trans_id))
+        
+        if row is not None:
+            self.place_transaction_row(row)
+        self.schedule_balance_refresh()
+    
+    def find_loaded_row(self, trans_id):
+        for page_index, page in enumerate(self.loaded_pages):
+            for row_index, row in enumerate(page):
+                if row[0] == trans_id:
+                    return page_index, row_index
+        return None
+    
+    def place_transaction_row(self, row):
+        # Rows are loaded newest first by (date, id)
+        key = (row[5], row[0])
+        if not self.loaded_pages:
+            if not self.has_more_above and not self.has_more_below:
+                self.loaded_pages.append([row])
+                self.insert_transaction_row(tk.END, row)
+            return
+        
+        first_row = self.loaded_pages[0][0]
+        last_row = self.loaded_pages[-1][-1]
+        if key > (first_row[5], first_row[0]) and self.has_more_above:
+            return
+        if key < (last_row[5], last_row[0]) and self.has_more_below:
+            return
+        
+        index = 0
+        for page in self.loaded_pages:
+            for row_index, loaded_row in enumerate(page):
+                if (loaded_row[5], loaded_row[0]) < key:
+                    page.insert(row_index, row)
+                    self.insert_transaction_row(index, row)
+                    return
+                index += 1
+        self.loaded_pages[-1].append(row)
+        self.insert_transaction_row(tk.END, row)
+    
+    def schedule_balance_refresh(self):
+        # Every later row's balance moves with a single-row change; restart
+        # the timer so a burst of changes is refreshed once
+        if self.balance_refresh is not None:
+            self.root.after_cancel(self.balance_refresh)
+        self.balance_refresh = self.root.after(BALANCE_REFRESH_DELAY, self.refresh_balances)
+    
+    def refresh_balances(self):
+        self.balance_refresh = None
+        if not self.transactions_tree.winfo_exists() or not self.loaded_pages:
+            return
+        
+        account_id = self.account_id
+        pages = [list(page) for page in self.loaded_pages]
+        
+        def apply_balances(page_balances):
+            if not self.transactions_tree.winfo_exists():
+                return
+            for page, balances in zip(pages, page_balances):
+                for row, balance in zip(page, balances):
+                    if self.transactions_tree.exists(str(row[0])):
+                        self.transactions_tree.set(str(row[0]), "balance", format_amount(balance))
+        
+        self.executor.submit(
+            lambda connection: [running_balances(connection, account_id, page) for page in pages],
+            apply_balances,
+            lambda err: messagebox.showerror("Database Error", f"Error loading balances: {err}"),
+            key="balances"
+        )
+    
+    def bulk_scope(self):
+        # (ids, transaction_filter, description) for a bulk action, or None
+        if self.select_all_matching.get():
+            return None, self.transaction_filter, "all transactions matching the current filter"
+        
+        ids = [int(item) for item in self.transactions_tree.selection()]
+        if not ids:
+            messagebox.showerror("Error", "Please select the transactions to change")
+            return None
+        return ids, None, f"{len(ids)} selected transactions"
+    
+    def bulk_edit_transactions(self):
+        scope = self.bulk_scope()
+        if scope is None:
+            return
+        ids, transaction_filter, description = scope
+        account_id = self.account_id
+        
+        edit_window = tk.Toplevel(self.root)
+        edit_window.title("Edit Transactions")
+        edit_window.geometry("400x300")
+        
+        ttk.Label(edit_window, text=f"Change {description}").pack(pady=5)
+        ttk.Label(edit_window, text="Leave a field empty to keep it unchanged").pack()
+        
+        # Transaction type
+        ttk.Label(edit_window, text="Transaction Type:").pack(pady=5)
+        trans_type = tk.StringVar()
+        ttk.Combobox(edit_window, textvariable=trans_type, values=["", "income", "expense"], state="readonly").pack()
+        
+        # Category, from either type since the type may change as well
+        ttk.Label(edit_window, text="Category:").pack(pady=5)
+        category = tk.StringVar()
+        category_combo = ttk.Combobox(edit_window, textvariable=category, state="readonly")
+        category_combo.pack()
+        
+        def update_bulk_categories(*args):
+            def apply_categories(categories):
+                if category_combo.winfo_exists():
+                    category_combo['values'] = [""] + sorted(set(categories))
             
-            messagebox.showinfo("Success", "Transaction deleted successfully")
-            self.load_transactions()  # Refresh the transactions list
-        except mysql.connector.Error as err:
-            messagebox.showerror("Database Error", f"Error deleting transaction: {err}")
+            if trans_type.get():
+                self.with_categories(trans_type.get(), apply_categories, key="edit_categories")
+            else:
+                self.with_categories("income", lambda income: self.with_categories(
+                    "expense", lambda expense: apply_categories(income + expense), key="edit_categories"
+                ), key="edit_categories")
+        
+        trans_type.trace('w', update_bulk_categories)
+        update_bulk_categories()
+        
+        # Date
+        ttk.Label(edit_window, text="Date:").pack(pady=5)
+        date = tk.StringVar()
+        ttk.Entry(edit_window, textvariable=date).pack()
+        
+        def save_changes():
+            changes = {}
+            for name, variable in (("type", trans_type), ("category", category), ("date", date)):
+                if variable.get().strip():
+                    changes[name] = variable.get().strip()
+            
+            if not changes:
+                messagebox.showerror("Error", "Choose a type, category or date to change")
+                return
+            if "type" in changes and "category" not in changes:
+                messagebox.showerror("Error", "Choose a category of the new type as well")
+                return
+            if not messagebox.askyesno("Confirm", f"Apply these changes to {description}?", parent=edit_window):
+                return
+            
+            def on_updated(count):
+                self.notify_transactions_changed()
+                edit_window.destroy()
+                messagebox.showinfo("Success", f"{count} transactions updated successfully")
+                if self.transactions_tree.winfo_exists():
+                    self.load_transactions()  # Refresh the transactions list
+            
+            def on_error(err):
+                if isinstance(err, ValidationError):
+                    messagebox.showerror("Error", str(err))
+                else:
+                    messagebox.showerror("Database Error", f"Error updating transactions: {err}")
+            
+            self.executor.submit(
+                lambda connection: update_transactions(connection, account_id, changes, ids, transaction_filter),
+                on_updated,
+                on_error
+            )
+        
+        ttk.Button(edit_window, text="Save", command=save_changes).pack(pady=10)
+    
+    def bulk_delete_transactions(self):
+        scope = self.bulk_scope()
+        if scope is None:
+            return
+        ids, transaction_filter, description = scope
+        account_id = self.account_id
+        
+        if not messagebox.askyesno("Confirm", f"Delete {description}?"):
+            return
+        
+        def on_deleted(count):
+            self.notify_transactions_changed()
+            messagebox.showinfo("Success", f"{count} transactions deleted successfully")
+            if self.transactions_tree.winfo_exists():
+                self.load_transactions()  # Refresh the transactions list
+        
+        self.executor.submit(
+            lambda connection: remove_transactions(connection, account_id, ids, transaction_filter),
+            on_deleted,
+            lambda err: messagebox.showerror("Database Error", f"Error deleting transactions: {err}")
+        )
+    
+    def show_recurring(self):
+        self.clear_content_frame()
+        
+        form_frame = ttk.Frame(self.content_frame)
+        form_frame.pack(pady=10)
+        
+        # Transaction type
+        ttk.Label(form_frame, text="Transaction Type:").grid(row=0, column=0, padx=5, pady=5, sticky=tk.E)
+        trans_type = tk.StringVar(value="expense")
+        ttk.Radiobutton(form_frame, text="Income", variable=trans_type, value="income").grid(row=0, column=1, padx=5, pady=5, sticky=tk.W)
+        ttk.Radiobutton(form_frame, text="Expense", variable=trans_type, value="expense").grid(row=0, column=2, padx=5, pady=5, sticky=tk.W)
+        
+        # Category
+        ttk.Label(form_frame, text="Category:").grid(row=1, column=0, padx=5, pady=5, sticky=tk.E)
+        category = tk.StringVar()
+        category_combo = ttk.Combobox(form_frame, textvariable=category, state="readonly")
+        category_combo.grid(row=1, column=1, columnspan=2, padx=5, pady=5, sticky=tk.W)
+        
+        def update_rule_categories(*args):
+            def apply_categories(categories):
+                if not category_combo.winfo_exists():
+                    return
+                category_combo['values'] = categories
+                if categories:
+                    category.set(categories[0])
+            
+            self.with_categories(trans_type.get(), apply_categories, key="recurring_categories")
+        
+        trans_type.trace('w', update_rule_categories)
+        update_rule_categories()
+        
+        # Amount
+        ttk.Label(form_frame, text="Amount:").grid(row=2, column=0, padx=5, pady=5, sticky=tk.E)
+        amount = tk.StringVar()
+        ttk.Entry(form_frame, textvariable=amount).grid(row=2, column=1, columnspan=2, padx=5, pady=5, sticky=tk.W)
+        
+        # Description
+        ttk.Label(form_frame, text="Description:").grid(row=3, column=0, padx=5, pady=5, sticky=tk.E)
+        description = tk.StringVar()
+        ttk.Entry(form_frame, textvariable=description).grid(row=3, column=1, columnspan=2, padx=5, pady=5, sticky=tk.W)
+        
+        # Every N periods
+        ttk.Label(form_frame, text="Every:").grid(row=0, column=3, padx=5, pady=5, sticky=tk.E)
+        interval = tk.StringVar(value="1")
+        ttk.Spinbox(form_frame, from_=1, to=99, textvariable=interval, width=5).grid(row=0, column=4, padx=5, pady=5, sticky=tk.W)
+        frequency = tk.StringVar(value="monthly")
+        ttk.Combobox(form_frame, textvariable=frequency, values=FREQUENCIES, state="readonly", width=10).grid(row=0, column=5, padx=5, pady=5, sticky=tk.W)
+        
+        # First and last dates
+        ttk.Label(form_frame, text="Start Date:").grid(row=1, column=3, padx=5, pady=5, sticky=tk.E)
+        start_date = tk.StringVar(value=datetime.now().strftime('%Y-%m-%d'))
+        ttk.Entry(form_frame, textvariable=start_date).grid(row=1, column=4, columnspan=2, padx=5, pady=5, sticky=tk.W)
+        
+        ttk.Label(form_frame, text="End Date (optional):").grid(row=2, column=3, padx=5, pady=5, sticky=tk.E)
+        end_date = tk.StringVar()
+        ttk.Entry(form_frame, textvariable=end_date).grid(row=2, column=4, columnspan=2, padx=5, pady=5, sticky=tk.W)
+        
+        def save_rule():
+            try:
+                values = (
+                    trans_type.get(), category.get(), parse_amount(amount.get()), description.get(),
+                    start_date.get(), frequency.get(), int(interval.get()), end_date.get().strip() or None
+                )
+            except ValueError as err:
+                messagebox.showerror("Error", str(err))
+                return
+            
+            account_id = self.account_id
+            
+            def add_and_post(connection):
+                add_rule(connection, account_id, *values)
+                return post_due_occurrences(connection, account_id)
+            
+            def on_added(posted):
+                if posted:
+                    self.notify_transactions_changed(inserted_only=True)
+                messagebox.showinfo("Success", f"Recurring transaction added, {posted} occurrences posted")
+                amount.set("")
+                description.set("")
+                self.load_recurring_rules()
+            
+            def on_error(err):
+                if isinstance(err, ValidationError):
+                    messagebox.showerror("Error", str(err))
+                else:
+                    messagebox.showerror("Database Error", f"Error adding recurring transaction: {err}")
+            
+            self.executor.submit(add_and_post, on_added, on_error)
+        
+        button_frame = ttk.Frame(self.content_frame)
+        button_frame.pack(pady=5)
+        ttk.Button(button_frame, text="Add Recurring Transaction", command=save_rule).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Stop Selected", command=self.delete_recurring_rule).pack(side=tk.LEFT, padx=5)
+        
+        # Rules
+        columns = ("id", "type", "category", "amount", "every", "start", "end", "next", "description")
+        self.recurring_tree = ttk.Treeview(self.content_frame, columns=columns, show="headings", height=15)
+        for column, heading, width in (
+            ("id", "ID", 50), ("type", "Type", 80), ("category", "Category", 120), ("amount", "Amount", 100),
+            ("every", "Every", 120), ("start", "Start", 100), ("end", "End", 100), ("next", "Next", 100),
+            ("description", "Description", 200)
+        ):
+            self.recurring_tree.heading(column, text=heading)
+            self.recurring_tree.column(column, width=width, anchor=tk.W if column == "description" else tk.CENTER)
+        self.recurring_tree.pack(fill=tk.BOTH, expand=True)
+        
+        self.load_recurring_rules()
+    
+    def load_recurring_rules(self):
+        def apply_rules(rules):
+            if not self.recurring_tree.winfo_exists():
+                return
+            self.recurring_tree.delete(*self.recurring_tree.get_children())
+            for rule_id, trans_type, category, amount, description, frequency, interval, start, end, next_date in rules:
+                every = frequency if interval == 1 else f"{interval} x {frequency}"
+                self.recurring_tree.insert("", tk.END, iid=str(rule_id), values=(
+                    rule_id, trans_type, category, format_amount(amount), every,
+                    start, end or "", next_date or "ended", description or ""
+                ))
+        
+        account_id = self.account_id
+        self.executor.submit(
+            lambda connection: fetch_rules(connection, account_id),
+            apply_rules,
+            lambda err: messagebox.showerror("Database Error", f"Error loading recurring transactions: {err}"),
+            key="recurring"
+        )
+    
+    def delete_recurring_rule(self):
+        selected_item = self.recurring_tree.selection()
+        if not selected_item:
+            messagebox.showerror("Error", "Please select a recurring transaction to stop")
+            return
+        
+        rule_id = int(selected_item[0])
+        if not messagebox.askyesno("Confirm", f"Stop recurring transaction #{rule_id}? Transactions it already posted are kept."):
+            return
+        
+        account_id = self.account_id
+        self.executor.submit(
+            lambda connection: remove_rule(connection, account_id, rule_id),
+            lambda removed: self.load_recurring_rules(),
+            lambda err: messagebox.showerror("Database Error", f"Error stopping recurring transaction: {err}")
+        )
     
     def show_reports(self):
         self.clear_content_frame()
@@ -513,6 +1305,11 @@ class PersonalFinanceManager:
         ttk.Radiobutton(report_frame, text="Summary", variable=self.report_type, value="summary").pack(side=tk.LEFT, padx=5)
         ttk.Radiobutton(report_frame, text="Income by Category", variable=self.report_type, value="income_categories").pack(side=tk.LEFT, padx=5)
         ttk.Radiobutton(report_frame, text="Expenses by Category", variable=self.report_type, value="expense_categories").pack(side=tk.LEFT, padx=5)
+        ttk.Radiobutton(report_frame, text="Trend", variable=self.report_type, value="trend").pack(side=tk.LEFT, padx=5)
+        ttk.Radiobutton(report_frame, text="Budget", variable=self.report_type, value="budget").pack(side=tk.LEFT, padx=5)
+        
+        self.trend_granularity = tk.StringVar(value="monthly")
+        ttk.Combobox(report_frame, textvariable=self.trend_granularity, values=["daily", "weekly", "monthly"], state="readonly", width=8).pack(side=tk.LEFT, padx=5)
         
         ttk.Label(report_frame, text="From:").pack(side=tk.LEFT, padx=5)
         self.report_from = tk.StringVar()
@@ -523,25 +1320,68 @@ class PersonalFinanceManager:
         ttk.Entry(report_frame, textvariable=self.report_to, width=10).pack(side=tk.LEFT, padx=5)
         
         ttk.Button(report_frame, text="Generate", command=self.generate_report).pack(side=tk.LEFT, padx=10)
+        ttk.Button(report_frame, text="Rebuild Totals", command=self.rebuild_report_totals).pack(side=tk.LEFT, padx=5)
+        ttk.Button(report_frame, text="Budgets", command=self.show_budgets).pack(side=tk.LEFT, padx=5)
+        ttk.Button(report_frame, text="Archive", command=self.show_archive).pack(side=tk.LEFT, padx=5)
+        
+        # Chart frame; matplotlib is only loaded once the reports are opened
+        from finance_charts import ChartView
         
-        # Chart frame
         self.chart_frame = ttk.Frame(self.content_frame)
         self.chart_frame.pack(fill=tk.BOTH, expand=True)
+        self.chart = ChartView(self.chart_frame, metrics=self.metrics)
+        self.chart.widget.pack(fill=tk.BOTH, expand=True)
         
         # Summary statistics
         self.summary_frame = ttk.Frame(self.content_frame)
+        ttk.Label(self.summary_frame, text="Financial Summary", font=('Arial', 12, 'bold')).pack(pady=5)
+        self.summary_label = ttk.Label(self.summary_frame)
+        self.summary_label.pack()
         
         # Generate initial report
         self.generate_report()
     
-    def generate_report(self):
-        # Clear previous content
-        for widget in self.chart_frame.winfo_children():
-            widget.destroy()
+    def notify_transactions_changed(self, inserted_only=False):
+        if self.analytics is None:
+            return
+        if inserted_only:
+            self.analytics.mark_inserted()
+        else:
+            self.analytics.invalidate()
+    
+    def report_source(self):
+        # (account id, snapshot) a report is computed from, taken when it is
+        # requested: the worker runs it later, possibly after the account
+        # has been switched
+        return self.account_id, self.analytics
+    
+    def report_aggregate(self, connection, source, date_from, date_to, trans_type=None):
+        # Runs on a worker; the snapshot answers from memory once it is
+        # current, unless the range reaches into an archived year
+        account_id, snapshot = source
+        if snapshot is not None:
+            snapshot.ensure_current(connection)
+            if snapshot.covers(date_from, date_to):
+                return snapshot.aggregate(date_from, date_to, trans_type)
+        return aggregate_transactions(connection, account_id, date_from, date_to, trans_type)
+    
+    def rebuild_report_totals(self):
+        if not messagebox.askyesno("Confirm", "Recompute the report totals from all transactions?"):
+            return
         
-        for widget in self.summary_frame.winfo_children():
-            widget.destroy()
+        def on_rebuilt(result):
+            self.notify_transactions_changed()
+            messagebox.showinfo("Success", "Report totals rebuilt successfully")
+            if self.chart_frame.winfo_exists():
+                self.generate_report()
         
+        self.executor.submit(
+            rebuild_rollup,
+            on_rebuilt,
+            lambda err: messagebox.showerror("Database Error", f"Error rebuilding report totals: {err}")
+        )
+    
+    def generate_report(self):
         report_type = self.report_type.get()
         date_from = self.report_from.get()
         date_to = self.report_to.get()
@@ -549,11 +1389,11 @@ class PersonalFinanceManager:
         # Validate dates
         try:
             if date_from:
-                datetime.strptime(date_from, '%Y-%m-%d')
+                validate_date(date_from)
             if date_to:
-                datetime.strptime(date_to, '%Y-%m-%d')
-        except ValueError:
-            messagebox.showerror("Error", "Invalid date format. Use YYYY-MM-DD")
+                validate_date(date_to)
+        except ValidationError as err:
+            messagebox.showerror("Error", str(err))
             return
         
         if report_type == "summary":
@@ -562,131 +1402,301 @@ class PersonalFinanceManager:
             self.generate_category_report("income", date_from, date_to)
         elif report_type == "expense_categories":
             self.generate_category_report("expense", date_from, date_to)
+        elif report_type == "trend":
+            self.generate_trend_report(self.trend_granularity.get(), date_from, date_to)
+        elif report_type == "budget":
+            self.generate_budget_report(date_from)
     
     def generate_summary_report(self, date_from, date_to):
-        try:
-            cursor = self.db_connection.cursor()
-            
-            # Build query with date filters
-            income_query = "SELECT SUM(amount) FROM transactions WHERE type = 'income'"
-            expense_query = "SELECT SUM(amount) FROM transactions WHERE type = 'expense'"
-            params = []
-            
-            conditions = []
-            if date_from:
-                conditions.append("date >= %s")
-                params.append(date_from)
-            if date_to:
-                conditions.append("date <= %s")
-                params.append(date_to)
-            
-            if conditions:
-                where_clause = " WHERE " + " AND ".join(conditions)
-                income_query += where_clause
-                expense_query += where_clause
-            
-            # Get total income
-            cursor.execute(income_query, params)
-            total_income = cursor.fetchone()[0] or 0
-            
-            # Get total expenses
-            cursor.execute(expense_query, params)
-            total_expenses = cursor.fetchone()[0] or 0
-            
-            # Calculate balance
-            balance = total_income - total_expenses
-            
-            # Display summary
-            self.summary_frame.pack(fill=tk.X, pady=10)
-            
-            ttk.Label(self.summary_frame, text="Financial Summary", font=('Arial', 12, 'bold')).pack(pady=5)
-            
-            summary_text = f"Total Income: ${total_income:.2f}\n"
-            summary_text += f"Total Expenses: ${total_expenses:.2f}\n"
-            summary_text += f"Balance: ${balance:.2f}"
-            
-            ttk.Label(self.summary_frame, text=summary_text).pack()
-            
-            # Create pie chart for income vs expenses
-            fig, ax = plt.subplots(figsize=(6, 4))
-            
-            if total_income > 0 or total_expenses > 0:
-                labels = ['Income', 'Expenses']
-                sizes = [total_income, total_expenses]
-                colors = ['#4CAF50', '#F44336']
-                
-                ax.pie(sizes, labels=labels, colors=colors, autopct='%1.1f%%', startangle=90)
-                ax.axis('equal')  # Equal aspect ratio ensures pie is drawn as a circle
-                ax.set_title('Income vs Expenses')
-                
-                canvas = FigureCanvasTkAgg(fig, master=self.chart_frame)
-                canvas.draw()
-                canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
-            else:
-                ttk.Label(self.chart_frame, text="No data available for the selected period").pack()
-            
-            cursor.close()
-        except mysql.connector.Error as err:
-            messagebox.showerror("Database Error", f"Error generating summary report: {err}")
+        source = self.report_source()
+        self.executor.submit(
+            lambda connection: self.report_aggregate(connection, source, date_from, date_to),
+            self.show_summary_report,
+            lambda err: messagebox.showerror("Database Error", f"Error generating summary report: {err}"),
+            key="report"
+        )
+    
+    def show_summary_report(self, aggregate):
+        if not self.chart_frame.winfo_exists():
+            return
+        
+        total_income = aggregate.income
+        total_expenses = aggregate.expense
+        balance = aggregate.balance
+        
+        # Display summary
+        summary_text = f"Total Income: ${format_amount(total_income)}\n"
+        summary_text += f"Total Expenses: ${format_amount(total_expenses)}\n"
+        summary_text += f"Balance: ${format_amount(balance)}\n"
+        summary_text += f"Transactions: {aggregate.count}"
+        
+        self.summary_label.configure(text=summary_text)
+        self.summary_frame.pack(fill=tk.X, pady=10)
+        
+        # Pie chart for income vs expenses
+        if total_income > 0 or total_expenses > 0:
+            self.chart.show_pie(
+                [to_units(total_income), to_units(total_expenses)],
+                ['Income', 'Expenses'],
+                ['#4CAF50', '#F44336'],
+                'Income vs Expenses'
+            )
+        else:
+            self.chart.show_message("No data available for the selected period")
     
     def generate_category_report(self, trans_type, date_from, date_to):
-        try:
-            cursor = self.db_connection.cursor()
-            
-            # Build query with date filters
-            query = """
-                SELECT category, SUM(amount) 
-                FROM transactions 
-                WHERE type = %s
-            """
-            params = [trans_type]
-            
-            conditions = []
-            if date_from:
-                conditions.append("date >= %s")
-                params.append(date_from)
-            if date_to:
-                conditions.append("date <= %s")
-                params.append(date_to)
-            
-            if conditions:
-                query += " AND " + " AND ".join(conditions)
-            
-            query += " GROUP BY category ORDER BY SUM(amount) DESC"
-            
-            cursor.execute(query, params)
-            results = cursor.fetchall()
-            
-            if not results:
-                ttk.Label(self.chart_frame, text=f"No {trans_type} data available for the selected period").pack()
+        source = self.report_source()
+        self.executor.submit(
+            lambda connection: self.report_aggregate(connection, source, date_from, date_to, trans_type),
+            lambda aggregate: self.show_category_report(trans_type, aggregate.categories(trans_type)),
+            lambda err: messagebox.showerror("Database Error", f"Error generating category report: {err}"),
+            key="report"
+        )
+    
+    def show_category_report(self, trans_type, results):
+        if not self.chart_frame.winfo_exists():
+            return
+        
+        self.summary_frame.pack_forget()
+        
+        if not results:
+            self.chart.show_message(f"No {trans_type} data available for the selected period")
+            return
+        
+        # Bar chart of the category totals
+        categories = [row[0] for row in results]
+        amounts = [to_units(row[1]) for row in results]
+        
+        color = '#4CAF50' if trans_type == 'income' else '#F44336'
+        self.chart.show_bars(categories, amounts, color, f'{trans_type.capitalize()} by Category', 'Category', 'Amount ($)')
+    
+    def generate_budget_report(self, date_from):
+        # Budgets are monthly: the month of the From date, or this month
+        account_id = self.account_id
+        self.executor.submit(
+            lambda connection: budget_status(connection, account_id, date_from or None),
+            self.show_budget_report,
+            lambda err: messagebox.showerror("Database Error", f"Error generating budget report: {err}"),
+            key="report"
+        )
+    
+    def show_budget_report(self, statuses):
+        if not self.chart_frame.winfo_exists():
+            return
+        
+        if not statuses:
+            self.summary_frame.pack_forget()
+            self.chart.show_message("No budgets set. Use Budgets to add one.")
+            return
+        
+        month = statuses[0].month
+        self.chart.show_budget(
+            [status.category for status in statuses],
+            [to_units(status.budget) for status in statuses],
+            [to_units(status.spent) for status in statuses],
+            f'Budget vs Spending, {month:%Y-%m}'
+        )
+        
+        over = [status for status in statuses if status.over]
+        if over:
+            summary_text = "Over budget:\n" + "\n".join(
+                f"{status.category}: ${format_amount(-status.remaining)} over "
+                f"(${format_amount(status.spent)} of ${format_amount(status.budget)})"
+                for status in over
+            )
+        else:
+            summary_text = "All categories are within budget"
+        self.summary_label.config(text=summary_text)
+        self.summary_frame.pack(fill=tk.X, pady=10)
+    
+    def show_budgets(self):
+        budget_window = tk.Toplevel(self.root)
+        budget_window.title("Monthly Budgets")
+        budget_window.geometry("400x220")
+        
+        ttk.Label(budget_window, text="Expense Category:").pack(pady=5)
+        category = tk.StringVar()
+        category_combo = ttk.Combobox(budget_window, textvariable=category, state="readonly")
+        category_combo.pack(pady=5)
+        
+        def apply_categories(categories):
+            if not category_combo.winfo_exists():
+                return
+            category_combo['values'] = categories
+            if categories:
+                category.set(categories[0])
+        
+        self.with_categories("expense", apply_categories, key="budget_categories")
+        account_id = self.account_id
+        
+        ttk.Label(budget_window, text="Monthly Budget:").pack(pady=5)
+        amount = tk.StringVar()
+        ttk.Entry(budget_window, textvariable=amount).pack(pady=5)
+        
+        def on_changed(result):
+            if self.chart_frame.winfo_exists() and self.report_type.get() == "budget":
+                self.generate_report()
+        
+        def save_budget():
+            try:
+                cents = parse_amount(amount.get())
+            except ValueError as err:
+                messagebox.showerror("Error", str(err))
                 return
             
-            # Prepare data for chart
-            categories = [row[0] for row in results]
-            amounts = [float(row[1]) for row in results]
-            
-            # Create bar chart
-            fig, ax = plt.subplots(figsize=(8, 5))
-            
-            color = '#4CAF50' if trans_type == 'income' else '#F44336'
-            ax.bar(categories, amounts, color=color)
-            
-            ax.set_xlabel('Category')
-            ax.set_ylabel('Amount ($)')
-            ax.set_title(f'{trans_type.capitalize()} by Category')
-            plt.xticks(rotation=45, ha='right')
+            def on_error(err):
+                if isinstance(err, ValidationError):
+                    messagebox.showerror("Error", str(err))
+                else:
+                    messagebox.showerror("Database Error", f"Error saving budget: {err}")
             
-            # Add data labels
-            for i, v in enumerate(amounts):
-                ax.text(i, v, f"${v:.2f}", ha='center', va='bottom')
+            self.executor.submit(
+                lambda connection: set_budget(connection, account_id, category.get(), cents),
+                on_changed,
+                on_error
+            )
+            amount.set("")
+        
+        def delete_budget():
+            name = category.get()
+            if not name or not messagebox.askyesno("Confirm", f"Remove the budget for {name}?", parent=budget_window):
+                return
             
-            canvas = FigureCanvasTkAgg(fig, master=self.chart_frame)
-            canvas.draw()
-            canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+            self.executor.submit(
+                lambda connection: remove_budget(connection, account_id, name),
+                on_changed,
+                lambda err: messagebox.showerror("Database Error", f"Error removing budget: {err}")
+            )
+        
+        button_frame = ttk.Frame(budget_window)
+        button_frame.pack(pady=10)
+        ttk.Button(button_frame, text="Save", command=save_budget).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Remove", command=delete_budget).pack(side=tk.LEFT, padx=5)
+    
+    def show_archive(self):
+        archive_window = tk.Toplevel(self.root)
+        archive_window.title("Archived Years")
+        archive_window.geometry("500x350")
+        account_id = self.account_id
+        
+        ttk.Label(
+            archive_window,
+            text="Archived years leave the transaction list and search but stay in the reports."
+        ).pack(pady=5)
+        
+        columns = ("year", "count", "income", "expense")
+        years_tree = ttk.Treeview(archive_window, columns=columns, show="headings", height=8)
+        for column, heading in (("year", "Year"), ("count", "Transactions"), ("income", "Income"), ("expense", "Expenses")):
+            years_tree.heading(column, text=heading)
+            years_tree.column(column, width=100, anchor=tk.CENTER)
+        years_tree.pack(fill=tk.BOTH, expand=True, padx=10)
+        
+        def load_years():
+            def apply_years(years):
+                if not years_tree.winfo_exists():
+                    return
+                years_tree.delete(*years_tree.get_children())
+                for archived in years:
+                    years_tree.insert("", tk.END, iid=str(archived.year), values=(
+                        archived.year, f"{archived.count:,}", format_amount(archived.income), format_amount(archived.expense)
+                    ))
             
-            cursor.close()
-        except mysql.connector.Error as err:
-            messagebox.showerror("Database Error", f"Error generating category report: {err}")
+            self.executor.submit(
+                lambda connection: fetch_archived_years(connection, account_id),
+                apply_years,
+                lambda err: messagebox.showerror("Database Error", f"Error loading archived years: {err}"),
+                key="archive"
+            )
+        
+        year_frame = ttk.Frame(archive_window)
+        year_frame.pack(pady=10)
+        ttk.Label(year_frame, text="Year:").pack(side=tk.LEFT, padx=5)
+        year = tk.StringVar(value=str(date.today().year - 2))
+        ttk.Entry(year_frame, textvariable=year, width=6).pack(side=tk.LEFT, padx=5)
+        
+        def on_changed(count, verb):
+            self.notify_transactions_changed()
+            messagebox.showinfo("Success", f"{count:,} transactions {verb}", parent=archive_window)
+            load_years()
+            if hasattr(self, "transactions_tree") and self.transactions_tree.winfo_exists():
+                self.load_transactions()
+        
+        def on_error(err):
+            if isinstance(err, ValidationError):
+                messagebox.showerror("Error", str(err), parent=archive_window)
+            else:
+                messagebox.showerror("Database Error", f"Error archiving: {err}", parent=archive_window)
+        
+        def run(action, verb):
+            selected = years_tree.selection()
+            if action is restore_year and selected:
+                year.set(selected[0])
+            try:
+                chosen = int(year.get())
+            except ValueError:
+                messagebox.showerror("Error", "Enter a year such as 2019", parent=archive_window)
+                return
+            self.executor.submit(
+                lambda connection: action(connection, account_id, chosen),
+                lambda count: on_changed(count, verb),
+                on_error
+            )
+        
+        ttk.Button(year_frame, text="Archive Year", command=lambda: run(archive_year, "archived")).pack(side=tk.LEFT, padx=5)
+        ttk.Button(year_frame, text="Restore Year", command=lambda: run(restore_year, "restored")).pack(side=tk.LEFT, padx=5)
+        
+        load_years()
+    
+    def report_trend(self, connection, source, granularity, date_from, date_to):
+        # Runs on a worker; buckets come from the snapshot or from SQL
+        account_id, snapshot = source
+        if snapshot is not None:
+            snapshot.ensure_current(connection)
+            if snapshot.covers(date_from, date_to):
+                return snapshot.trend_series(granularity, date_from, date_to)
+        return trend_series(connection, account_id, granularity, date_from, date_to)
+    
+    def generate_trend_report(self, granularity, date_from, date_to):
+        source = self.report_source()
+        self.executor.submit(
+            lambda connection: self.report_trend(connection, source, granularity, date_from, date_to),
+            self.show_trend_report,
+            lambda err: messagebox.showerror("Database Error", f"Error generating trend report: {err}"),
+            key="report"
+        )
+    
+    def show_trend_report(self, series):
+        if not self.chart_frame.winfo_exists():
+            return
+        
+        if not series.periods:
+            self.summary_frame.pack_forget()
+            self.chart.show_message("No data available for the selected period")
+            return
+        
+        closing_balance = series.balance[-1]
+        summary_text = f"Opening Balance: ${format_amount(series.opening_balance)}\n"
+        summary_text += f"Closing Balance: ${format_amount(closing_balance)}\n"
+        summary_text += f"Net Change: ${format_amount(closing_balance - series.opening_balance)}\n"
+        summary_text += f"Periods: {len(series.periods)}"
+        self.summary_label.configure(text=summary_text)
+        self.summary_frame.pack(fill=tk.X, pady=10)
+        
+        # A long daily history has far more points than the chart has pixels;
+        # keep about one point per pixel column
+        days = [date.fromisoformat(period).toordinal() for period in series.periods]
+        width = max(self.chart.widget.winfo_width(), 100)
+        
+        lines = []
+        for label, values, color in (
+            ('Income', series.income, '#4CAF50'),
+            ('Expenses', series.expense, '#F44336'),
+            ('Balance', series.balance, '#2196F3')
+        ):
+            sampled_days, sampled_values = downsample_lttb(days, [to_units(value) for value in values], width)
+            lines.append((label, [date.fromordinal(day) for day in sampled_days], sampled_values, color))
+        
+        self.chart.show_lines(lines, f'{series.granularity.capitalize()} Trend', 'Amount ($)')
     
     def export_data(self):
         # Ask user for file location
@@ -696,31 +1706,248 @@ class PersonalFinanceManager:
             title="Save Transactions As"
         )
         
+        if not file_path:
+            return  # User cancelled
+        
+        # Export what the transactions view is currently filtered to
+        account_id = self.account_id
+        transaction_filter = build_transaction_filter(account_id)
+        if hasattr(self, "transactions_tree") and self.transactions_tree.winfo_exists():
+            transaction_filter = self.transaction_filter
+        
+        progress = Progress()
+        progress_window = self.show_progress_window("Exporting", "exported", progress)
+        
+        def write_export(connection):
+            try:
+                with open(file_path, 'w', newline='', encoding='utf-8') as csvfile:
+                    return export_transactions(connection, account_id, csvfile, transaction_filter, progress, self.metrics)
+            except OperationCancelled:
+                os.remove(file_path)
+                raise
+        
+        def on_exported(rows_written):
+            progress_window.destroy()
+            messagebox.showinfo("Success", f"{rows_written:,} transactions exported successfully to {os.path.basename(file_path)}")
+        
+        def on_error(err):
+            progress_window.destroy()
+            if isinstance(err, OperationCancelled):
+                messagebox.showinfo("Cancelled", "Export cancelled")
+            else:
+                messagebox.showerror("Error", f"Error exporting data: {err}")
+        
+        self.executor.submit(write_export, on_exported, on_error)
+    
+    def show_progress_window(self, title, verb, progress):
+        progress_window = tk.Toplevel(self.root)
+        progress_window.title(title)
+        progress_window.geometry("350x120")
+        progress_window.protocol("WM_DELETE_WINDOW", progress.cancel_requested.set)
+        
+        status = tk.StringVar(value="Starting...")
+        ttk.Label(progress_window, textvariable=status).pack(pady=15)
+        ttk.Button(progress_window, text="Cancel", command=progress.cancel_requested.set).pack(pady=5)
+        
+        def update_progress():
+            if not progress_window.winfo_exists():
+                return
+            status.set(f"{progress.rows:,} rows {verb} ({progress.rate:,.0f} rows/s)")
+            progress_window.after(EXPORT_PROGRESS_INTERVAL, update_progress)
+        
+        update_progress()
+        return progress_window
+    
+    def import_data(self):
+        file_path = filedialog.askopenfilename(
+            filetypes=[("CSV Files", "*.csv"), ("All Files", "*.*")],
+            title="Import Transactions"
+        )
+        
+        if not file_path:
+            return  # User cancelled
+        
+        mapping_window = tk.Toplevel(self.root)
+        mapping_window.title("Import Format")
+        mapping_window.geometry("420x360")
+        
+        import_format = tk.StringVar(value="export")
+        ttk.Radiobutton(mapping_window, text="Finance Manager export", variable=import_format, value="export").pack(anchor=tk.W, padx=10, pady=2)
+        ttk.Radiobutton(mapping_window, text="Bank statement (negative amounts are expenses)", variable=import_format, value="bank").pack(anchor=tk.W, padx=10, pady=2)
+        
+        # Column names used for bank statements
+        columns_frame = ttk.Frame(mapping_window)
+        columns_frame.pack(pady=10)
+        
+        fields = [
+            ("Date column:", "Date"),
+            ("Date format:", "%Y-%m-%d"),
+            ("Amount column:", "Amount"),
+            ("Description column:", "Description"),
+            ("Category column (optional):", ""),
+            ("Default category:", "Other")
+        ]
+        field_vars = []
+        for row, (label, default) in enumerate(fields):
+            ttk.Label(columns_frame, text=label).grid(row=row, column=0, padx=5, pady=3, sticky=tk.E)
+            value = tk.StringVar(value=default)
+            ttk.Entry(columns_frame, textvariable=value).grid(row=row, column=1, padx=5, pady=3, sticky=tk.W)
+            field_vars.append(value)
+        
+        def start_import():
+            if import_format.get() == "export":
+                mapping = ImportMapping()
+            else:
+                date_column, date_format, amount_column, description_column, category_column, default_category = [
+                    value.get().strip() for value in field_vars
+                ]
+                mapping = ImportMapping(
+                    type_column=None,
+                    category_column=category_column or None,
+                    amount_column=amount_column,
+                    description_column=description_column or None,
+                    date_column=date_column,
+                    date_format=date_format,
+                    default_category=default_category or "Other"
+                )
+            mapping_window.destroy()
+            self.run_import(file_path, mapping)
+        
+        ttk.Button(mapping_window, text="Import", command=start_import).pack(pady=10)
+    
+    def run_import(self, file_path, mapping):
+        progress = Progress()
+        progress_window = self.show_progress_window("Importing", "imported", progress)
+        account_id = self.account_id
+        
+        def read_import(connection):
+            with open(file_path, newline='', encoding='utf-8-sig') as csvfile:
+                return import_transactions(connection, account_id, csvfile, mapping, progress)
+        
+        def on_imported(result):
+            if result.created_categories:
+                self.category_cache.invalidate()
+            self.notify_transactions_changed(inserted_only=True)
+            progress_window.destroy()
+            message = f"{result.imported:,} transactions imported"
+            if result.created_categories:
+                message += f"\nNew categories: {', '.join(result.created_categories)}"
+            if result.errors:
+                message += f"\n{len(result.errors):,} rows skipped, for example:"
+                for line_number, error in result.errors[:5]:
+                    message += f"\n  line {line_number}: {error}"
+            messagebox.showinfo("Import Complete", message)
+            if hasattr(self, "transactions_tree") and self.transactions_tree.winfo_exists():
+                self.load_transactions()
+        
+        def on_error(err):
+            progress_window.destroy()
+            # Chunks committed before the failure are already in the table
+            self.notify_transactions_changed(inserted_only=True)
+            self.category_cache.invalidate()
+            if isinstance(err, OperationCancelled):
+                messagebox.showinfo("Cancelled", f"Import cancelled after {progress.rows:,} rows")
+            else:
+                messagebox.showerror("Error", f"Error importing data: {err}")
+        
+        self.executor.submit(read_import, on_imported, on_error)
+    
+    def show_diagnostics(self):
+        self.clear_content_frame()
+        
+        # Controls
+        control_frame = ttk.Frame(self.content_frame)
+        control_frame.pack(fill=tk.X, pady=10)
+        
+        ttk.Button(control_frame, text="Refresh", command=self.refresh_diagnostics).pack(side=tk.LEFT, padx=5)
+        ttk.Button(control_frame, text="Reset", command=self.reset_diagnostics).pack(side=tk.LEFT, padx=5)
+        ttk.Button(control_frame, text="Export", command=self.export_diagnostics).pack(side=tk.LEFT, padx=5)
+        
+        self.explain_slow = tk.BooleanVar(value=self.metrics.explain_slow)
+        ttk.Checkbutton(
+            control_frame, text="EXPLAIN slow queries", variable=self.explain_slow,
+            command=lambda: setattr(self.metrics, "explain_slow", self.explain_slow.get())
+        ).pack(side=tk.LEFT, padx=10)
+        
+        self.diagnostics_since = ttk.Label(control_frame)
+        self.diagnostics_since.pack(side=tk.LEFT, padx=10)
+        
+        # Latency per operation
+        columns = ("operation", "count", "mean", "p50", "p95", "max", "rows")
+        self.diagnostics_tree = ttk.Treeview(self.content_frame, columns=columns, show="headings", height=15)
+        
+        self.diagnostics_tree.heading("operation", text="Operation")
+        self.diagnostics_tree.heading("count", text="Count")
+        self.diagnostics_tree.heading("mean", text="Mean (ms)")
+        self.diagnostics_tree.heading("p50", text="p50 (ms)")
+        self.diagnostics_tree.heading("p95", text="p95 (ms)")
+        self.diagnostics_tree.heading("max", text="Max (ms)")
+        self.diagnostics_tree.heading("rows", text="Rows")
+        
+        self.diagnostics_tree.column("operation", width=300)
+        for column in columns[1:]:
+            self.diagnostics_tree.column(column, width=90, anchor=tk.E)
+        self.diagnostics_tree.pack(fill=tk.BOTH, expand=True)
+        
+        # Slow operations, newest first, with their query plans
+        ttk.Label(self.content_frame, text="Slow Operations", font=('Arial', 12, 'bold')).pack(pady=5)
+        self.slow_log_text = tk.Text(self.content_frame, height=12, wrap=tk.NONE, font=('Courier', 9))
+        self.slow_log_text.pack(fill=tk.BOTH, expand=True)
+        
+        self.refresh_diagnostics()
+    
+    def refresh_diagnostics(self):
+        if not self.diagnostics_tree.winfo_exists():
+            return
+        snapshot = self.metrics.snapshot()
+        
+        self.diagnostics_since.configure(text=f"Since {snapshot['since']}")
+        self.diagnostics_tree.delete(*self.diagnostics_tree.get_children())
+        
+        # Most total time first
+        operations = sorted(snapshot["operations"].items(), key=lambda item: item[1]["total_ms"], reverse=True)
+        for name, stats in operations:
+            self.diagnostics_tree.insert("", tk.END, values=(
+                name,
+                stats["count"],
+                f"{stats['mean_ms']:.1f}",
+                f"{stats['p50_ms']:.0f}",
+                f"{stats['p95_ms']:.0f}",
+                f"{stats['max_ms']:.1f}",
+                stats["rows"]
+            ))
+        
+        self.slow_log_text.delete("1.0", tk.END)
+        for entry in reversed(snapshot["slow_log"]):
+            self.slow_log_text.insert(tk.END, f"{entry['at']}  {entry['ms']:.1f} ms  {entry['rows']} rows  {entry['operation']}\n")
+            if entry["statement"]:
+                self.slow_log_text.insert(tk.END, f"    {entry['statement']}\n")
+            if isinstance(entry["explain"], list):
+                for step in entry["explain"]:
+                    plan = ", ".join(f"{key}={value}" for key, value in step.items() if value != "None")
+                    self.slow_log_text.insert(tk.END, f"    EXPLAIN {plan}\n")
+            elif entry["explain"]:
+                self.slow_log_text.insert(tk.END, f"    {entry['explain']}\n")
+    
+    def reset_diagnostics(self):
+        self.metrics.reset()
+        self.refresh_diagnostics()
+    
+    def export_diagnostics(self):
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".json",
+            filetypes=[("JSON Files", "*.json"), ("All Files", "*.*")],
+            title="Save Diagnostics As"
+        )
+        
         if not file_path:
             return  # User cancelled
         
         try:
-            cursor = self.db_connection.cursor()
-            cursor.execute("""
-                SELECT type, category, amount, description, date 
-                FROM transactions 
-                ORDER BY date DESC
-            """)
-            
-            with open(file_path, 'w', newline='', encoding='utf-8') as csvfile:
-                csvwriter = csv.writer(csvfile)
-                
-                # Write header
-                csvwriter.writerow(['Type', 'Category', 'Amount', 'Description', 'Date'])
-                
-                # Write data
-                for row in cursor.fetchall():
-                    csvwriter.writerow(row)
-            
-            cursor.close()
-            messagebox.showinfo("Success", f"Data exported successfully to {os.path.basename(file_path)}")
-        except (mysql.connector.Error, IOError) as err:
-            messagebox.showerror("Error", f"Error exporting data: {err}")
+            self.metrics.export(file_path)
+            messagebox.showinfo("Success", f"Diagnostics exported to {file_path}")
+        except OSError as err:
+            messagebox.showerror("Error", f"Error exporting diagnostics: {err}")
 
 if __name__ == "__main__":
     root = tk.Tk()
@@ -0,0 +1,60 @@
+import pytest
+
+from finance_core import open_database, rebuild_rollup
+from finance_core.config import DEFAULT_DB_CONFIG
+from finance_core.schema import DEFAULT_ACCOUNT_ID
+
+# The core runs against a fresh SQLite file per test; the MySQL-only paths
+# (partitioning, FULLTEXT) are not covered here.
+
+
+def sqlite_config(path):
+    config = dict(DEFAULT_DB_CONFIG)
+    config.update(backend="sqlite", path=str(path), port=3306, pool_size=4)
+    return config
+
+
+@pytest.fixture
+def connections(tmp_path):
+    connections = open_database(sqlite_config(tmp_path / "finance.db"))
+    yield connections
+    connections.drop_database()
+
+
+@pytest.fixture
+def connection(connections):
+    with connections.connection() as connection:
+        yield connection
+
+
+@pytest.fixture
+def account_id():
+    return DEFAULT_ACCOUNT_ID
+
+
+def derived_tables(connection):
+    # Contents of the tables every write keeps in step with transactions
+    cursor = connection.cursor()
+    tables = {}
+    for table, columns in (
+        ("transaction_rollup", "account_id, day, type, category, total_cents, count"),
+        ("balance_checkpoints", "account_id, month, balance_cents"),
+        ("monthly_spending", "account_id, month, category, spent_cents")
+    ):
+        cursor.execute(f"SELECT {columns} FROM {table} ORDER BY {columns}")
+        tables[table] = [tuple(str(value) for value in row) for row in cursor.fetchall()]
+    cursor.close()
+    # A counter that went back to zero means the same as a missing one
+    tables["monthly_spending"] = [row for row in tables["monthly_spending"] if row[3] != "0"]
+    return tables
+
+
+@pytest.fixture
+def assert_consistent(connection):
+    # Checks that the incrementally maintained totals equal a rebuild from
+    # the rows
+    def check():
+        incremental = derived_tables(connection)
+        rebuild_rollup(connection)
+        assert incremental == derived_tables(connection)
+    return check
@@ -0,0 +1,56 @@
+import pytest
+
+from finance_core import (
+    DEFAULT_ACCOUNT,
+    ValidationError,
+    add_account,
+    add_user,
+    aggregate_transactions,
+    fetch_accounts,
+    grant_access,
+    insert_transaction,
+    resolve_account,
+    set_budget
+)
+
+
+def test_membership(connection):
+    add_user(connection, "alex")
+    add_user(connection, "sam")
+    household = add_account(connection, "Household", owner="alex")
+    grant_access(connection, "Household", "sam")
+    grant_access(connection, "Household", "sam")
+    
+    assert resolve_account(connection, "Household", "sam") == household
+    assert fetch_accounts(connection, "sam") == [(household, "Household")]
+    with pytest.raises(ValidationError, match="not a member"):
+        resolve_account(connection, DEFAULT_ACCOUNT, "sam")
+    with pytest.raises(ValidationError, match="Unknown user"):
+        resolve_account(connection, "Household", "kim")
+    with pytest.raises(ValidationError, match="Unknown account"):
+        resolve_account(connection, "Holiday")
+
+
+def test_names_are_unique_and_bounded(connection):
+    add_user(connection, "alex")
+    with pytest.raises(ValidationError, match="already exists"):
+        add_user(connection, "alex")
+    add_account(connection, "Savings")
+    with pytest.raises(ValidationError, match="already exists"):
+        add_account(connection, "Savings")
+    with pytest.raises(ValidationError, match="cannot be empty"):
+        add_account(connection, "  ")
+    with pytest.raises(ValidationError, match="longer than"):
+        add_user(connection, "x" * 51)
+
+
+def test_accounts_keep_separate_ledgers(connection, account_id, assert_consistent):
+    savings = add_account(connection, "Savings")
+    insert_transaction(connection, account_id, "expense", "Food", 2500, "", "2024-02-02")
+    insert_transaction(connection, savings, "income", "Other", 100000, "", "2024-02-02")
+    # Each account has its own copy of the default categories
+    set_budget(connection, savings, "Food", 5000)
+    
+    assert aggregate_transactions(connection, account_id).by_category == {("expense", "Food"): {"total": 2500, "count": 1}}
+    assert aggregate_transactions(connection, savings).by_category == {("income", "Other"): {"total": 100000, "count": 1}}
+    assert_consistent()
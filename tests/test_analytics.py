@@ -0,0 +1,86 @@
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from finance_core import aggregate_transactions, insert_transaction, trend_series, update_transaction
+from finance_core import analytics
+from finance_core.analytics import ColumnarSnapshot
+
+pytestmark = pytest.mark.skipif(not analytics.available(), reason="NumPy is not installed")
+
+
+def totals(aggregate):
+    return aggregate.income, aggregate.expense, aggregate.count, aggregate.by_month, aggregate.by_category
+
+
+@pytest.fixture
+def ledger(connection, account_id):
+    insert_transaction(connection, account_id, "income", "Salary", 10000, "", "2024-01-05")
+    insert_transaction(connection, account_id, "expense", "Food", 2000, "", "2024-01-10")
+    insert_transaction(connection, account_id, "expense", "Housing", 75050, "", "2024-03-01")
+    return connection
+
+
+def test_snapshot_matches_sql(ledger, account_id):
+    snapshot = ColumnarSnapshot(account_id)
+    snapshot.ensure_current(ledger)
+    
+    for date_from, date_to, trans_type in ((None, None, None), ("2024-01-06", None, None), (None, "2024-02-01", "expense")):
+        assert totals(snapshot.aggregate(date_from, date_to, trans_type)) == totals(
+            aggregate_transactions(ledger, account_id, date_from, date_to, trans_type)
+        )
+    for granularity in ("daily", "weekly", "monthly"):
+        expected = trend_series(ledger, account_id, granularity, "2024-01-08", "2024-03-31")
+        assert vars(snapshot.trend_series(granularity, "2024-01-08", "2024-03-31")) == vars(expected)
+
+
+def test_edit_by_another_connection_reloads_snapshot(connections, ledger, account_id, monkeypatch):
+    monkeypatch.setattr(analytics, "SNAPSHOT_MAX_AGE", 0)
+    snapshot = ColumnarSnapshot(account_id)
+    snapshot.ensure_current(ledger)
+    
+    # Same count and same total cents, different type, category and month
+    with connections.connection() as other:
+        update_transaction(other, account_id, 1, "expense", "Food", 10000, "", "2024-02-05")
+    
+    snapshot.ensure_current(ledger)
+    aggregate = snapshot.aggregate()
+    assert (aggregate.income, aggregate.expense) == (0, 87050)
+    assert totals(aggregate) == totals(aggregate_transactions(ledger, account_id))
+
+
+def test_move_within_a_month_reloads_snapshot(connections, ledger, account_id, monkeypatch):
+    monkeypatch.setattr(analytics, "SNAPSHOT_MAX_AGE", 0)
+    snapshot = ColumnarSnapshot(account_id)
+    snapshot.ensure_current(ledger)
+    
+    with connections.connection() as other:
+        update_transaction(other, account_id, 2, "expense", "Food", 2000, "", "2024-01-20")
+    
+    snapshot.ensure_current(ledger)
+    assert snapshot.group_by(("day",)) == {("2024-01-05",): (10000, 1), ("2024-01-20",): (2000, 1), ("2024-03-01",): (75050, 1)}
+
+
+def test_random_ledger_matches_sql(connection, account_id):
+    generator = random.Random(7)
+    categories = {"income": ["Salary", "Other"], "expense": ["Food", "Housing", "Other"]}
+    for _ in range(300):
+        trans_type = generator.choice(("income", "expense"))
+        day = date(2023, 11, 1) + timedelta(days=generator.randrange(200))
+        insert_transaction(connection, account_id, trans_type, generator.choice(categories[trans_type]),
+                           generator.randrange(1, 500000), "", day.isoformat())
+    snapshot = ColumnarSnapshot(account_id)
+    snapshot.ensure_current(connection)
+    assert snapshot.matches_rollup(connection)
+    
+    for _ in range(20):
+        first, last = sorted(date(2023, 10, 15) + timedelta(days=generator.randrange(230)) for _ in range(2))
+        trans_type = generator.choice((None, "income", "expense"))
+        assert totals(snapshot.aggregate(first.isoformat(), last.isoformat(), trans_type)) == totals(
+            aggregate_transactions(connection, account_id, first.isoformat(), last.isoformat(), trans_type)
+        )
+        granularity = generator.choice(("daily", "weekly", "monthly"))
+        assert vars(snapshot.trend_series(granularity, first.isoformat(), last.isoformat())) == vars(
+            trend_series(connection, account_id, granularity, first.isoformat(), last.isoformat())
+        )
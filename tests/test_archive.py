@@ -0,0 +1,108 @@
+import io
+from datetime import date
+
+import pytest
+
+from finance_core import (
+    ValidationError,
+    add_rule,
+    aggregate_transactions,
+    archive_year,
+    balance_as_of,
+    build_transaction_filter,
+    export_transactions,
+    fetch_archived_years,
+    import_transactions,
+    insert_transaction,
+    iter_transactions,
+    restore_year,
+    update_transaction,
+    update_transactions
+)
+from finance_core import analytics
+from finance_core.analytics import ColumnarSnapshot
+
+TODAY = date(2025, 6, 1)
+
+
+@pytest.fixture
+def ledger(connection, account_id):
+    insert_transaction(connection, account_id, "income", "Salary", 300000, "", "2023-01-31")
+    insert_transaction(connection, account_id, "expense", "Food", 4550, "", "2023-07-14")
+    insert_transaction(connection, account_id, "expense", "Housing", 90000, "", "2023-12-31")
+    insert_transaction(connection, account_id, "expense", "Food", 1299, "", "2024-01-01")
+    return connection
+
+
+def test_archive_and_restore_keep_totals(ledger, account_id, assert_consistent):
+    before = aggregate_transactions(ledger, account_id)
+    balance = balance_as_of(ledger, account_id, "2024-06-30")
+    
+    assert archive_year(ledger, account_id, 2023, TODAY) == 3
+    [summary] = fetch_archived_years(ledger, account_id)
+    assert (summary.year, summary.count, summary.income, summary.expense) == (2023, 3, 300000, 94550)
+    assert summary.balance == 205450
+    # Reports and balances read the rollup and checkpoints, which keep the year
+    assert vars(aggregate_transactions(ledger, account_id)) == vars(before)
+    assert balance_as_of(ledger, account_id, "2024-06-30") == balance
+    assert_consistent()
+    
+    assert restore_year(ledger, account_id, 2023) == 3
+    assert fetch_archived_years(ledger, account_id) == []
+    assert vars(aggregate_transactions(ledger, account_id)) == vars(before)
+    assert_consistent()
+
+
+def test_only_closed_years_archive_once(ledger, account_id):
+    with pytest.raises(ValidationError, match="before 2025"):
+        archive_year(ledger, account_id, 2025, TODAY)
+    archive_year(ledger, account_id, 2023, TODAY)
+    with pytest.raises(ValidationError, match="already archived"):
+        archive_year(ledger, account_id, 2023, TODAY)
+    with pytest.raises(ValidationError, match="not archived"):
+        restore_year(ledger, account_id, 2022)
+
+
+def test_archived_year_refuses_writes(ledger, account_id, assert_consistent):
+    archive_year(ledger, account_id, 2023, TODAY)
+    
+    with pytest.raises(ValidationError, match="2023 is archived"):
+        insert_transaction(ledger, account_id, "expense", "Food", 100, "", "2023-05-05")
+    # Moving a live row into the closed year
+    with pytest.raises(ValidationError, match="2023 is archived"):
+        update_transaction(ledger, account_id, 4, "expense", "Food", 1299, "", "2023-12-30")
+    with pytest.raises(ValidationError, match="2023 is archived"):
+        update_transactions(ledger, account_id, {"date": "2023-03-03"}, ids=[4])
+    with pytest.raises(ValidationError, match="2023 is archived"):
+        add_rule(ledger, account_id, "expense", "Housing", 90000, "Rent", "2023-11-01", "monthly")
+    
+    result = import_transactions(ledger, account_id, io.StringIO(
+        "Type,Category,Amount,Description,Date\nexpense,Food,1,,2023-02-02\nexpense,Food,2,,2024-02-02\n"
+    ))
+    assert result.imported == 1
+    assert result.errors == [(2, "2023 is archived")]
+    assert aggregate_transactions(ledger, account_id).count == 5
+    assert_consistent()
+
+
+def test_listing_and_export_show_live_rows(ledger, account_id):
+    archive_year(ledger, account_id, 2023, TODAY)
+    everything = build_transaction_filter(account_id)
+    assert [row[0] for row in iter_transactions(ledger, everything)] == [4]
+    
+    exported = io.StringIO()
+    export_transactions(ledger, account_id, exported, everything)
+    assert exported.getvalue().splitlines()[1:] == ["expense,Food,12.99,,2024-01-01"]
+
+
+@pytest.mark.skipif(not analytics.available(), reason="NumPy is not installed")
+def test_snapshot_covers_live_years_only(ledger, account_id):
+    archive_year(ledger, account_id, 2023, TODAY)
+    snapshot = ColumnarSnapshot(account_id)
+    snapshot.ensure_current(ledger)
+    
+    assert not snapshot.covers()
+    assert not snapshot.covers("2023-06-01", "2024-06-01")
+    assert snapshot.covers("2024-01-01")
+    assert snapshot.aggregate("2024-01-01").expense == 1299
+    assert snapshot.matches_rollup(ledger)
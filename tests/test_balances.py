@@ -0,0 +1,62 @@
+from datetime import date
+
+from finance_core import (
+    balance_as_of,
+    build_transaction_filter,
+    fetch_transaction_page,
+    insert_transaction,
+    remove_transaction,
+    running_balances
+)
+from finance_core.balances import month_range, next_month
+
+
+def checkpoint_months(connection, account_id):
+    cursor = connection.cursor()
+    cursor.execute("SELECT month FROM balance_checkpoints WHERE account_id = %s ORDER BY month", (account_id,))
+    months = [row[0] for row in cursor.fetchall()]
+    cursor.close()
+    return months
+
+
+def test_month_range():
+    assert next_month(date(2023, 12, 1)) == date(2024, 1, 1)
+    assert list(month_range(date(2023, 11, 1), date(2024, 2, 1))) == [
+        date(2023, 11, 1), date(2023, 12, 1), date(2024, 1, 1)
+    ]
+
+
+def test_checkpoints_cover_empty_months(connection, account_id, assert_consistent):
+    insert_transaction(connection, account_id, "income", "Salary", 100000, "", "2024-01-15")
+    insert_transaction(connection, account_id, "expense", "Food", 2500, "", "2024-06-02")
+    assert checkpoint_months(connection, account_id) == list(month_range(date(2024, 1, 1), date(2024, 7, 1)))
+    assert balance_as_of(connection, account_id, "2024-04-30") == 100000
+    assert balance_as_of(connection, account_id, "2024-06-02") == 97500
+    
+    # Written before the first checkpoint: the months in between are filled back
+    insert_transaction(connection, account_id, "expense", "Food", 1000, "", "2023-10-31")
+    assert checkpoint_months(connection, account_id) == list(month_range(date(2023, 10, 1), date(2024, 7, 1)))
+    assert balance_as_of(connection, account_id, "2023-12-31") == -1000
+    assert balance_as_of(connection, account_id, "2024-07-01") == 96500
+    assert_consistent()
+
+
+def test_checkpoints_outlive_their_transactions(connection, account_id, assert_consistent):
+    insert_transaction(connection, account_id, "income", "Salary", 100000, "", "2024-01-15")
+    last = insert_transaction(connection, account_id, "expense", "Food", 2500, "", "2024-03-02")
+    remove_transaction(connection, account_id, last)
+    
+    assert checkpoint_months(connection, account_id)[-1] == date(2024, 3, 1)
+    assert balance_as_of(connection, account_id, "2024-12-31") == 100000
+    assert_consistent()
+
+
+def test_running_balances_ignore_the_filter(connection, account_id):
+    insert_transaction(connection, account_id, "income", "Salary", 100000, "", "2024-01-15")
+    insert_transaction(connection, account_id, "expense", "Food", 2500, "", "2024-01-15")
+    insert_transaction(connection, account_id, "expense", "Housing", 50000, "", "2024-03-01")
+    
+    page, has_more = fetch_transaction_page(connection, build_transaction_filter(account_id, trans_type="expense"))
+    # Newest first; balances are over the whole ledger in (date, id) order
+    assert [row[2] for row in page] == ["Housing", "Food"]
+    assert running_balances(connection, account_id, page) == [47500, 97500]
@@ -0,0 +1,30 @@
+import pytest
+
+from finance_core import ValidationError, budget_alert, budget_status, insert_transaction, remove_budget, set_budget
+
+
+def test_budget_needs_an_expense_category(connection, account_id):
+    with pytest.raises(ValidationError, match="not an expense category"):
+        set_budget(connection, account_id, "Salary", 10000)
+    with pytest.raises(ValidationError, match="not an expense category"):
+        set_budget(connection, account_id, "Groceries", 10000)
+    # 'Other' exists for both types; the expense one is budgeted
+    set_budget(connection, account_id, "Other", 10000)
+    assert [status.category for status in budget_status(connection, account_id)] == ["Other"]
+
+
+def test_alert_fires_once_spending_passes_the_budget(connection, account_id, assert_consistent):
+    set_budget(connection, account_id, "Food", 10000)
+    insert_transaction(connection, account_id, "expense", "Food", 6000, "", "2024-05-02")
+    assert budget_alert(connection, account_id, "Food", "2024-05-02") is None
+    
+    insert_transaction(connection, account_id, "expense", "Food", 5000, "", "2024-05-20")
+    insert_transaction(connection, account_id, "income", "Other", 90000, "", "2024-05-21")
+    alert = budget_alert(connection, account_id, "Food", "2024-05-20")
+    assert (alert.spent, alert.budget, alert.remaining) == (11000, 10000, -1000)
+    # Other months have their own spending
+    assert budget_alert(connection, account_id, "Food", "2024-06-01") is None
+    assert_consistent()
+    
+    assert remove_budget(connection, account_id, "Food") == 1
+    assert budget_alert(connection, account_id, "Food", "2024-05-20") is None
@@ -0,0 +1,56 @@
+import json
+
+import pytest
+
+from finance_core import DEFAULT_ACCOUNT
+from finance_core.cli import main
+
+
+@pytest.fixture
+def run(tmp_path, monkeypatch, capsys):
+    # Runs the command line against a scratch SQLite database; returns
+    # (exit code, stdout, stderr)
+    monkeypatch.setenv("FINANCE_DB_BACKEND", "sqlite")
+    monkeypatch.setenv("FINANCE_DB_PATH", str(tmp_path / "cli.db"))
+    monkeypatch.setenv("FINANCE_DB_ACCOUNT", DEFAULT_ACCOUNT)
+    monkeypatch.setenv("FINANCE_DB_ACCOUNT_USER", "")
+    
+    def run(*argv):
+        code = main(list(argv))
+        captured = capsys.readouterr()
+        return code, captured.out, captured.err
+    return run
+
+
+def test_add_list_and_report(run):
+    assert run("add", "income", "Salary", "2500", "--date", "2024-01-31")[0] == 0
+    code, out, err = run("add", "expense", "Food", "12.50", "--description", "Lunch", "--date", "2024-02-01")
+    assert (code, out) == (0, "Added transaction #2\n")
+    
+    code, out, err = run("list", "--type", "expense")
+    assert out == "2\t2024-02-01\texpense\tFood\t12.50\tLunch\n"
+    
+    code, out, err = run("report", "summary", "--json")
+    assert json.loads(out) == {"income": "2500.00", "expense": "12.50", "balance": "2487.50", "count": 2}
+    
+    code, out, err = run("balance", "--date", "2024-01-31")
+    assert out == "Balance as of 2024-01-31: 2500.00\n"
+
+
+def test_errors_exit_non_zero(run):
+    code, out, err = run("add", "expense", "Food", "10", "--date", "2024-02-30")
+    assert code == 2 and err.startswith("Error: ")
+    code, out, err = run("--account", "Holiday", "list")
+    assert (code, err) == (2, "Error: Unknown account 'Holiday'\n")
+    with pytest.raises(SystemExit):
+        run("add", "expense", "Food", "ten")
+
+
+def test_export_then_import(run, tmp_path):
+    run("add", "expense", "Food", "3.20", "--description", "Coffee", "--date", "2024-03-05")
+    path = tmp_path / "out.csv"
+    assert run("export", str(path))[0] == 0
+    
+    code, out, err = run("import", str(path))
+    assert (code, out) == (0, "Imported 1 transactions\n")
+    assert run("list", "--search", "coffee")[1].count("Coffee") == 2
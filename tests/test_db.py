@@ -0,0 +1,30 @@
+import subprocess
+import sys
+
+import pytest
+
+import finance_core
+from finance_core import db
+from finance_core.config import DEFAULT_DB_CONFIG
+
+
+def test_sqlite_backend_does_not_load_the_mysql_driver():
+    code = "import sys, finance_core.cli; print('mysql.connector' in sys.modules)"
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    assert output.strip() == "False"
+
+
+def test_missing_mysql_driver_is_reported(monkeypatch):
+    monkeypatch.setattr(db, "mysql", None)
+    monkeypatch.setitem(sys.modules, "mysql", None)
+    monkeypatch.setitem(sys.modules, "mysql.connector", None)
+    with pytest.raises(db.BackendUnavailable, match="not installed"):
+        db.create_connection_manager(dict(DEFAULT_DB_CONFIG, backend="mysql"))
+
+
+def test_error_types_follow_the_loaded_driver():
+    mysql = pytest.importorskip("mysql.connector")
+    db.create_connection_manager(dict(DEFAULT_DB_CONFIG, backend="mysql"))
+    assert issubclass(mysql.IntegrityError, db.IntegrityError)
+    assert finance_core.DatabaseError is db.DatabaseError
+    assert mysql.Error in finance_core.DatabaseError
@@ -0,0 +1,44 @@
+from decimal import Decimal
+
+import pytest
+
+from finance_core import format_amount, parse_amount, to_units
+from finance_core.money import MAX_AMOUNT_CENTS, to_cents
+
+
+@pytest.mark.parametrize("text, cents", [
+    ("12", 1200),
+    ("12.5", 1250),
+    ("1,234.56", 123456),
+    ("$0.01", 1),
+    (" 7.10 ", 710),
+    ("-3.20", -320)
+])
+def test_parse_amount(text, cents):
+    assert parse_amount(text) == cents
+
+
+@pytest.mark.parametrize("text", ["", "abc", "1.234", "NaN", "Infinity", "1e400.5"])
+def test_parse_amount_rejects(text):
+    with pytest.raises(ValueError):
+        parse_amount(text)
+
+
+def test_to_cents_rounds_half_to_even():
+    assert to_cents("0.125") == 12
+    assert to_cents("0.135") == 14
+    assert to_cents(Decimal("19.99")) == 1999
+    assert to_cents(3) == 300
+
+
+def test_format_amount():
+    assert format_amount(0) == "0.00"
+    assert format_amount(5) == "0.05"
+    assert format_amount(-123450) == "-1234.50"
+    assert format_amount(MAX_AMOUNT_CENTS) == "10000000000000.00"
+    assert to_units(1999) == 19.99
+
+
+def test_sums_stay_exact():
+    # 0.10 added a hundred thousand times is exactly 10000.00
+    assert format_amount(sum(parse_amount("0.10") for _ in range(100000))) == "10000.00"
@@ -0,0 +1,57 @@
+from datetime import date
+
+import pytest
+
+from finance_core import (
+    ValidationError,
+    add_rule,
+    aggregate_transactions,
+    build_transaction_filter,
+    fetch_rules,
+    iter_transactions,
+    post_due_occurrences,
+    remove_rule
+)
+from finance_core.recurring import occurrence_date
+
+
+def test_month_end_start_falls_back_to_shorter_months():
+    start = date(2024, 1, 31)
+    assert [occurrence_date(start, "monthly", 1, index) for index in range(4)] == [
+        date(2024, 1, 31), date(2024, 2, 29), date(2024, 3, 31), date(2024, 4, 30)
+    ]
+    assert occurrence_date(date(2024, 2, 29), "yearly", 1, 1) == date(2025, 2, 28)
+    assert occurrence_date(date(2024, 11, 15), "monthly", 3, 1) == date(2025, 2, 15)
+    assert occurrence_date(start, "weekly", 2, 1) == date(2024, 2, 14)
+    assert occurrence_date(start, "daily", 1, 1) == date(2024, 2, 1)
+
+
+def test_rule_validation(connection, account_id):
+    for frequency, interval, end_date in (("hourly", 1, None), ("weekly", 0, None), ("weekly", 1, "2023-12-31")):
+        with pytest.raises(ValidationError):
+            add_rule(connection, account_id, "expense", "Housing", 90000, "", "2024-01-01", frequency, interval, end_date)
+    assert fetch_rules(connection, account_id) == []
+
+
+def test_catch_up_posts_every_missed_occurrence_once(connection, account_id, assert_consistent):
+    rent = add_rule(connection, account_id, "expense", "Housing", 90000, "Rent", "2024-01-31", "monthly")
+    add_rule(connection, account_id, "income", "Salary", 250000, "Pay", "2024-01-05", "weekly", 2, "2024-03-01")
+    
+    # Rent from January to May, pay every other week until the end date
+    assert post_due_occurrences(connection, account_id, "2024-05-31") == 5 + 5
+    assert post_due_occurrences(connection, account_id, "2024-05-31") == 0
+    aggregate = aggregate_transactions(connection, account_id)
+    assert (aggregate.income, aggregate.expense) == (5 * 250000, 5 * 90000)
+    
+    rent_dates = [
+        row[5] for row in iter_transactions(connection, build_transaction_filter(account_id, trans_type="expense"))
+    ]
+    assert rent_dates == [date(2024, 5, 31), date(2024, 4, 30), date(2024, 3, 31), date(2024, 2, 29), date(2024, 1, 31)]
+    # The ended rule has no next date; rent continues
+    assert [rule[9] for rule in fetch_rules(connection, account_id)] == [date(2024, 6, 30), None]
+    assert_consistent()
+    
+    # Removing a rule keeps what it posted
+    assert remove_rule(connection, account_id, rent) == 1
+    assert post_due_occurrences(connection, account_id, "2024-12-31") == 0
+    assert aggregate_transactions(connection, account_id).count == 10
@@ -0,0 +1,104 @@
+from datetime import date
+
+import pytest
+
+from finance_core import aggregate_transactions, balance_as_of, create_connection_manager, migrate
+from finance_core import schema
+from finance_core.schema import DEFAULT_ACCOUNT_ID, MIGRATIONS
+
+from conftest import derived_tables, sqlite_config
+
+# A database as the app created it before schema versioning
+LEGACY_ROWS = [
+    ("income", "Salary", "2500.00", "Pay", date(2023, 11, 30)),
+    ("expense", "Food", "12.34", "Lunch", date(2023, 12, 1)),
+    ("expense", "Housing", "950.00", "Rent", date(2024, 1, 1)),
+    ("expense", "Food", "0.10", "Gum", date(2024, 3, 15))
+]
+
+
+def create_legacy_database(connection):
+    cursor = connection.cursor()
+    cursor.execute("""
+        CREATE TABLE transactions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            type VARCHAR(10) NOT NULL,
+            category VARCHAR(50) NOT NULL,
+            amount DECIMAL(10, 2) NOT NULL,
+            description VARCHAR(255),
+            date DATE NOT NULL
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE categories (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name VARCHAR(50) NOT NULL UNIQUE,
+            type VARCHAR(10) NOT NULL
+        )
+    """)
+    cursor.execute("INSERT INTO categories (name, type) VALUES ('Food', 'expense')")
+    cursor.executemany(
+        "INSERT INTO transactions (type, category, amount, description, date) VALUES (%s, %s, %s, %s, %s)",
+        LEGACY_ROWS
+    )
+    connection.commit()
+    cursor.close()
+
+
+@pytest.fixture
+def unmigrated(tmp_path):
+    connections = create_connection_manager(sqlite_config(tmp_path / "legacy.db"))
+    connections.ensure_database()
+    connections.create_pool()
+    with connections.connection() as connection:
+        yield connection
+    connections.drop_database()
+
+
+def schema_version(connection):
+    cursor = connection.cursor()
+    cursor.execute("SELECT MAX(version) FROM schema_version")
+    version = cursor.fetchone()[0]
+    cursor.close()
+    return version
+
+
+def test_fresh_database_is_fully_migrated(connection, account_id):
+    assert schema_version(connection) == MIGRATIONS[-1][0]
+    cursor = connection.cursor()
+    cursor.execute("SELECT name, type FROM categories WHERE account_id = %s", (account_id,))
+    assert sorted(cursor.fetchall()) == sorted(schema.DEFAULT_CATEGORIES)
+    cursor.close()
+
+
+def test_migrate_twice_is_a_no_op(connection):
+    before = derived_tables(connection)
+    migrate(connection)
+    assert schema_version(connection) == MIGRATIONS[-1][0]
+    assert derived_tables(connection) == before
+
+
+@pytest.mark.parametrize("stop", range(len(MIGRATIONS) + 1))
+def test_upgrade_from_every_version(unmigrated, monkeypatch, stop):
+    # Stopping at any intermediate version and upgrading later ends in the
+    # same state as upgrading in one go
+    create_legacy_database(unmigrated)
+    monkeypatch.setattr(schema, "MIGRATIONS", MIGRATIONS[:stop])
+    migrate(unmigrated)
+    monkeypatch.setattr(schema, "MIGRATIONS", MIGRATIONS)
+    migrate(unmigrated)
+    
+    assert schema_version(unmigrated) == MIGRATIONS[-1][0]
+    aggregate = aggregate_transactions(unmigrated, DEFAULT_ACCOUNT_ID)
+    assert (aggregate.income, aggregate.expense, aggregate.count) == (250000, 96244, 4)
+    assert balance_as_of(unmigrated, DEFAULT_ACCOUNT_ID, "2023-12-31") == 248766
+    assert balance_as_of(unmigrated, DEFAULT_ACCOUNT_ID, "2024-12-31") == 153756
+    
+    cursor = unmigrated.cursor()
+    cursor.execute("SELECT name, type FROM categories WHERE account_id = %s", (DEFAULT_ACCOUNT_ID,))
+    assert sorted(cursor.fetchall()) == sorted(schema.DEFAULT_CATEGORIES)
+    cursor.close()
+    
+    migrated = derived_tables(unmigrated)
+    schema.fill_rollup(unmigrated.cursor())
+    assert derived_tables(unmigrated) == migrated
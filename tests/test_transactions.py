@@ -0,0 +1,146 @@
+from datetime import date
+
+import pytest
+
+from finance_core import (
+    ValidationError,
+    aggregate_transactions,
+    build_transaction_filter,
+    fetch_transaction,
+    fetch_transaction_page,
+    insert_transaction,
+    iter_transactions,
+    remove_transaction,
+    remove_transactions,
+    update_transaction,
+    update_transactions,
+    validate_transaction
+)
+from finance_core.dialects import dialect_of
+
+
+@pytest.fixture
+def ledger(connection, account_id):
+    insert_transaction(connection, account_id, "income", "Salary", 100000, "Pay", "2024-01-31")
+    insert_transaction(connection, account_id, "income", "Other", 500, "Found", "2024-02-01")
+    insert_transaction(connection, account_id, "expense", "Food", 1250, "Lunch", "2024-02-01")
+    insert_transaction(connection, account_id, "expense", "Other", 300, "Fee", "2024-02-03")
+    return connection
+
+
+def by_category(connection, account_id):
+    return {key: values["total"] for key, values in aggregate_transactions(connection, account_id).by_category.items()}
+
+
+def test_bulk_type_change_needs_a_category(ledger, account_id):
+    with pytest.raises(ValidationError):
+        update_transactions(ledger, account_id, {"type": "income"}, ids=[3])
+
+
+def test_bulk_category_must_match_each_rows_type(ledger, account_id, assert_consistent):
+    before = by_category(ledger, account_id)
+    with pytest.raises(ValidationError, match="not an expense category"):
+        update_transactions(ledger, account_id, {"type": "expense", "category": "Salary"}, ids=[1])
+    # Without a type change, mixed rows need the category for both types
+    with pytest.raises(ValidationError, match="not an income category"):
+        update_transactions(ledger, account_id, {"category": "Food"}, ids=[2, 3])
+    assert by_category(ledger, account_id) == before
+    
+    assert update_transactions(ledger, account_id, {"category": "Other"}, ids=[2, 3, 4]) == 3
+    assert by_category(ledger, account_id) == {
+        ("income", "Salary"): 100000, ("income", "Other"): 500, ("expense", "Other"): 1550
+    }
+    assert_consistent()
+
+
+def test_bulk_edit_and_delete_by_filter(ledger, account_id, assert_consistent):
+    february = build_transaction_filter(account_id, trans_type="expense", date_from="2024-02-01")
+    assert update_transactions(ledger, account_id, {"type": "income", "category": "Gifts", "date": "2024-03-01"},
+                               transaction_filter=february) == 2
+    assert by_category(ledger, account_id) == {("income", "Salary"): 100000, ("income", "Other"): 500, ("income", "Gifts"): 1550}
+    assert_consistent()
+    
+    assert remove_transactions(ledger, account_id, transaction_filter=build_transaction_filter(account_id, search="Pay", dialect=dialect_of(ledger))) == 1
+    assert aggregate_transactions(ledger, account_id).income == 2050
+    assert_consistent()
+
+
+def test_validate_transaction():
+    validate_transaction("expense", "Food", 1, "2024-02-29")
+    for values in (("transfer", "Food", 100, "2024-01-01"), ("expense", "", 100, "2024-01-01"),
+                   ("expense", "Food", 0, "2024-01-01"), ("expense", "Food", 1.5, "2024-01-01"),
+                   ("expense", "Food", True, "2024-01-01"), ("expense", "Food", 100, "2023-02-29")):
+        with pytest.raises(ValidationError):
+            validate_transaction(*values)
+
+
+def test_single_row_writes_keep_totals(ledger, account_id, assert_consistent):
+    update_transaction(ledger, account_id, 3, "expense", "Housing", 99999, "Rent", "2023-12-24")
+    remove_transaction(ledger, account_id, 4)
+    # Unknown ids change nothing
+    update_transaction(ledger, account_id, 999, "expense", "Food", 1, "", "2024-01-01")
+    remove_transaction(ledger, account_id, 999)
+    
+    assert by_category(ledger, account_id) == {
+        ("income", "Salary"): 100000, ("income", "Other"): 500, ("expense", "Housing"): 99999
+    }
+    assert fetch_transaction(ledger, 3, build_transaction_filter(account_id))[1:] == (
+        "expense", "Housing", 99999, "Rent", date(2023, 12, 24)
+    )
+    assert_consistent()
+
+
+@pytest.fixture
+def many(connection, account_id):
+    # Several rows per day, so paging has to order by id within a date
+    for index in range(23):
+        trans_type = "income" if index % 4 == 0 else "expense"
+        insert_transaction(connection, account_id, trans_type, "Other", 100 + index, f"row {index}",
+                           f"2024-03-{1 + index // 3:02d}")
+    return connection
+
+
+def walk(connection, transaction_filter, page_size):
+    # Every page from the newest down, then back up from the oldest
+    pages = []
+    key = None
+    while True:
+        rows, has_more = fetch_transaction_page(connection, transaction_filter, "below", key, page_size)
+        pages.append(rows)
+        if not has_more:
+            break
+        key = (rows[-1][5], rows[-1][0])
+    down = [row for page in pages for row in page]
+    
+    up = []
+    key = (down[-1][5], down[-1][0])
+    while True:
+        rows, has_more = fetch_transaction_page(connection, transaction_filter, "above", key, page_size)
+        up = rows + up
+        if not has_more:
+            break
+        key = (rows[0][5], rows[0][0])
+    return down, up
+
+
+def test_keyset_paging_walks_every_row_once(many, account_id):
+    everything = build_transaction_filter(account_id)
+    expected = sorted(iter_transactions(many, everything), key=lambda row: (row[5], row[0]), reverse=True)
+    assert len(expected) == 23
+    
+    for page_size in (1, 4, 23, 50):
+        down, up = walk(many, everything, page_size)
+        assert down == expected
+        # Walking back up ends below the oldest row, which is the key
+        assert up == expected[:-1]
+
+
+def test_keyset_paging_with_filters(many, account_id):
+    expenses = build_transaction_filter(account_id, trans_type="expense", date_from="2024-03-02", date_to="2024-03-06")
+    down, up = walk(many, expenses, 2)
+    assert [row[0] for row in down] == [18, 16, 15, 14, 12, 11, 10, 8, 7, 6, 4]
+    assert all(row[1] == "expense" for row in down)
+    
+    search = build_transaction_filter(account_id, search="row 21", dialect=dialect_of(many))
+    assert sorted(row[4] for row in iter_transactions(many, search)) == ["row 21"]
+    assert [row[0] for row in up] == [18, 16, 15, 14, 12, 11, 10, 8, 7, 6]
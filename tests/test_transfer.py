@@ -0,0 +1,112 @@
+import io
+from datetime import date, datetime
+
+import pytest
+
+from finance_core import ImportMapping, add_account, aggregate_transactions, export_transactions, import_transactions
+from finance_core import build_transaction_filter, insert_transaction, iter_transactions
+from finance_core.dialects import MySQLDialect, dialect_of
+from finance_core.transfer import parse_date
+
+CSV = """Type,Category,Amount,Description,Date
+income,Salary,"1,500.00",Pay,2024-01-31
+expense,Food,12.50,Lunch,2024-02-01
+expense,Pets,40,Vet,2024-02-03
+expense,Food,,No amount,2024-02-04
+expense,Food,-3,Negative,2024-02-05
+transfer,Food,3,Bad type,2024-02-06
+expense,Food,3,Bad date,2024-02-30
+"""
+
+
+def test_import_reports_bad_rows_and_keeps_totals(connection, account_id, assert_consistent):
+    result = import_transactions(connection, account_id, io.StringIO(CSV))
+    
+    assert result.imported == 3
+    assert result.created_categories == ["Pets"]
+    assert [line for line, message in result.errors] == [5, 6, 7, 8]
+    aggregate = aggregate_transactions(connection, account_id)
+    assert (aggregate.income, aggregate.expense) == (150000, 5250)
+    assert_consistent()
+
+
+def test_bank_statement_takes_type_from_sign(connection, account_id, assert_consistent):
+    statement = "When,What,Value\n05/03/2024,Coffee,-3.20\n06/03/2024,Refund,10\n"
+    mapping = ImportMapping(type_column=None, category_column=None, amount_column="Value",
+                            description_column="What", date_column="When", date_format="%d/%m/%Y")
+    result = import_transactions(connection, account_id, io.StringIO(statement), mapping)
+    
+    assert result.imported == 2
+    aggregate = aggregate_transactions(connection, account_id)
+    assert (aggregate.income, aggregate.expense) == (1000, 320)
+    assert set(aggregate.by_month) == {"2024-03"}
+    assert_consistent()
+
+
+def test_export_round_trips(connection, account_id):
+    import_transactions(connection, account_id, io.StringIO(CSV))
+    exported = io.StringIO()
+    export_transactions(connection, account_id, exported)
+    
+    exported.seek(0)
+    assert import_transactions(connection, account_id, exported).imported == 3
+    assert aggregate_transactions(connection, account_id).count == 6
+
+
+@pytest.mark.parametrize("text", ["2024-01-05", "2024-1-5", "2024-02-30", "2024-W01-1", "20240105", "１２３４-01-05", ""])
+def test_iso_fast_path_parses_like_strptime(text):
+    try:
+        expected = datetime.strptime(text, "%Y-%m-%d").date()
+    except ValueError:
+        expected = ValueError
+    try:
+        parsed = parse_date(text, "%Y-%m-%d")
+    except ValueError:
+        parsed = ValueError
+    assert parsed == expected
+    if parsed is not ValueError:
+        assert isinstance(parsed, date)
+
+
+def test_imported_rows_are_searchable(connection, account_id):
+    insert_transaction(connection, account_id, "expense", "Food", 100, "Bakery before", "2024-01-01")
+    import_transactions(connection, account_id, io.StringIO(CSV))
+    # The insert trigger is back after the import
+    insert_transaction(connection, account_id, "expense", "Food", 100, "Bakery after", "2024-03-01")
+    
+    def found(search):
+        transaction_filter = build_transaction_filter(account_id, search=search, dialect=dialect_of(connection))
+        return sorted(row[4] for row in iter_transactions(connection, transaction_filter))
+    
+    assert found("lunch") == ["Lunch"]
+    assert found("vet") == ["Vet"]
+    assert found("bakery") == ["Bakery after", "Bakery before"]
+
+
+class RecordingCursor:
+    def __init__(self):
+        self.statements = []
+    
+    def execute(self, statement, params=()):
+        self.statements.append((statement, params))
+
+
+def test_mysql_inserts_many_rows_per_statement():
+    rows = [(1, "expense", "Food", index + 1, "", date(2024, 1, 1)) for index in range(2500)]
+    cursor = RecordingCursor()
+    MySQLDialect().insert_transactions(cursor, rows)
+    
+    assert [statement.count("%s") for statement, params in cursor.statements] == [6000, 6000, 3000]
+    assert [value for statement, params in cursor.statements for value in params][3::6] == list(range(1, 2501))
+
+
+def test_export_stays_inside_the_account(connection, account_id):
+    savings = add_account(connection, "Savings")
+    insert_transaction(connection, account_id, "expense", "Food", 100, "Mine", "2024-01-01")
+    insert_transaction(connection, savings, "expense", "Food", 200, "Theirs", "2024-01-01")
+    
+    exported = io.StringIO()
+    assert export_transactions(connection, account_id, exported) == 1
+    assert "Theirs" not in exported.getvalue()
+    with pytest.raises(ValueError):
+        export_transactions(connection, account_id, io.StringIO(), build_transaction_filter(savings))